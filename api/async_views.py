@@ -0,0 +1,250 @@
+"""
+API 的异步版本（ASGI 部署，API_ASYNC=True 时由 api.urls 使用）
+
+同步部署时每个 gunicorn worker 同一时刻只能处理一个请求，慢速网络上传大日志、数据库变慢时
+worker 很快被占满。ASGI（uvicorn worker）部署下：
+- 请求体由服务器在事件循环中接收完毕后才交给视图，上传过程不占用线程和数据库连接
+- 查询、序列化、入库等同步代码在线程中执行（sync_to_async），同时执行的数量由
+  API_ASYNC_DB_CONCURRENCY 限制，超出的请求在事件循环中等待，不会耗尽数据库连接
+- 单条查询使用 Django 的异步 ORM；多条查询和序列化合并在一次 sync_to_async 中执行
+  （Django 的异步 ORM 本身也是在线程中执行同步查询，合并可以减少线程切换）
+
+各接口的参数、响应内容和状态码与 api.views 完全相同（共用同一组函数，响应同样由 DRF 的
+JSONRenderer 编码）。入库接口只接受 JSON（批量接口另外支持 NDJSON），其他类型返回 415。
+"""
+import asyncio
+import io
+import time
+import weakref
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET
+from rest_framework import status
+from rest_framework.exceptions import MethodNotAllowed, ParseError, UnsupportedMediaType
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from computers.data_version import current_version
+from computers.models import Computer
+from computers.pagination import InvalidCursor
+from computers.serializers import ComputerSerializer
+from .caching import acached_json_response
+from .parsers import NDJSONParser
+from .views import (
+    _check_change_fields, _parse_fields, _parse_page_size, change_events_page, computer_list_page,
+    detail_version, export_response, export_stream, ingest_batch, ingest_record, parse_rollup_params,
+    rollup_response, rollup_version, search_results,
+)
+
+# 每个事件循环（uvicorn worker 进程中只有一个）一个信号量
+_db_slots = weakref.WeakKeyDictionary()
+
+
+def _slots():
+    """限制同时在线程中执行的数据库操作数"""
+    loop = asyncio.get_running_loop()
+    if loop not in _db_slots:
+        _db_slots[loop] = asyncio.Semaphore(settings.API_ASYNC_DB_CONCURRENCY)
+    return _db_slots[loop]
+
+
+async def run_sync(func, *args):
+    """在线程中执行同步函数（查询、序列化、入库），受 API_ASYNC_DB_CONCURRENCY 限制"""
+    async with _slots():
+        return await sync_to_async(func)(*args)
+
+
+def _json(data, status_code=status.HTTP_200_OK):
+    """与 DRF Response 相同的 JSON 响应"""
+    return HttpResponse(JSONRenderer().render(data), content_type='application/json', status=status_code)
+
+
+def async_api_view(methods):
+    """
+    异步视图的 api_view：免 CSRF 校验，不支持的请求方法返回与 DRF 相同的 405
+
+    GET 接口同时接受 HEAD。
+    """
+    allowed = set(methods) | ({'HEAD'} if 'GET' in methods else set())
+
+    def decorator(view):
+        @csrf_exempt
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in allowed:
+                response = _json({'detail': MethodNotAllowed(request.method).detail}, status.HTTP_405_METHOD_NOT_ALLOWED)
+                response['Allow'] = ', '.join(sorted(allowed))
+                return response
+            return await view(request, *args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def _parse_body(request, parsers):
+    """
+    按 Content-Type 选择解析器解析请求体，返回 (数据, 错误响应)
+
+    与 DRF 的行为一致：没有请求体时返回空字典，不支持的类型返回 415，格式错误返回 400。
+    请求体可能已被服务器写入临时文件，在线程中调用；与 DRF 一样直接读取请求体，
+    不受 DATA_UPLOAD_MAX_MEMORY_SIZE 限制（大小由 nginx 和解压中间件限制）。
+    """
+    body = request.read()
+    if not request.META.get('CONTENT_TYPE') or not body:
+        return {}, None
+    for parser in parsers:
+        if request.content_type == parser.media_type:
+            try:
+                return parser.parse(
+                    io.BytesIO(body), parser.media_type,
+                    {'encoding': request.encoding or settings.DEFAULT_CHARSET},
+                ), None
+            except ParseError as e:
+                return None, _json({'detail': e.detail}, status.HTTP_400_BAD_REQUEST)
+    return None, _json(
+        {'detail': UnsupportedMediaType(request.META['CONTENT_TYPE']).detail}, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+    )
+
+
+def _ingest_one(request, started):
+    data, error = _parse_body(request, [JSONParser()])
+    if error is not None:
+        return error
+    payload, status_code = ingest_record(request, dict(data), started)
+    return _json(payload, status_code)
+
+
+def _ingest_many(request):
+    records, error = _parse_body(request, [JSONParser(), NDJSONParser()])
+    if error is not None:
+        return error
+    payload, status_code = ingest_batch(request, records)
+    return _json(payload, status_code)
+
+
+@async_api_view(['POST'])
+async def create_computer(request):
+    """接收客户端提交的计算机信息（api.views.create_computer 的异步版本）"""
+    started = time.perf_counter()
+    return await run_sync(_ingest_one, request, started)
+
+
+@async_api_view(['POST'])
+async def create_computers_batch(request):
+    """批量接收计算机信息（api.views.create_computers_batch 的异步版本）"""
+    return await run_sync(_ingest_many, request)
+
+
+@async_api_view(['GET'])
+async def computer_list_api(request):
+    """获取计算机列表API（api.views.computer_list_api 的异步版本）"""
+    try:
+        fields = _parse_fields(request.GET.get('fields'))
+        page_size = _parse_page_size(request.GET.get('page_size'))
+    except ValueError as e:
+        return _json({'detail': str(e)}, status.HTTP_400_BAD_REQUEST)
+
+    def build():
+        try:
+            return computer_list_page(request.GET, fields, page_size)
+        except InvalidCursor as e:
+            return _json({'detail': str(e)}, status.HTTP_400_BAD_REQUEST)
+
+    version = await run_sync(current_version)
+    return await acached_json_response(request, version, lambda: run_sync(build))
+
+
+@async_api_view(['GET'])
+async def change_events_api(request):
+    """字段变化事件API（api.views.change_events_api 的异步版本）"""
+    try:
+        page_size = _parse_page_size(request.GET.get('page_size'))
+        _check_change_fields(request.GET.get('field'))
+    except ValueError as e:
+        return _json({'detail': str(e)}, status.HTTP_400_BAD_REQUEST)
+
+    def build():
+        try:
+            return change_events_page(request.GET, page_size)
+        except InvalidCursor as e:
+            return _json({'detail': str(e)}, status.HTTP_400_BAD_REQUEST)
+
+    version = await run_sync(current_version)
+    return await acached_json_response(request, version, lambda: run_sync(build))
+
+
+@async_api_view(['GET'])
+async def search_computers_api(request):
+    """搜索计算机记录API（api.views.search_computers_api 的异步版本）"""
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return _json({'detail': '请提供搜索关键字 q'}, status.HTTP_400_BAD_REQUEST)
+    try:
+        fields = _parse_fields(request.GET.get('fields'))
+        page_size = _parse_page_size(request.GET.get('page_size'))
+    except ValueError as e:
+        return _json({'detail': str(e)}, status.HTTP_400_BAD_REQUEST)
+    return _json(await run_sync(search_results, request.GET, query, fields, page_size))
+
+
+@require_GET
+async def export_computers(request):
+    """
+    流式导出计算机记录（api.views.export_computers 的异步版本）
+
+    同步迭代器在 ASGI 下会被一次读完再发送，这里改为逐块在线程中读取，内存占用仍然恒定；
+    导出期间一直占用一个数据库操作名额（服务器端游标需要在同一个线程中读取）。
+    """
+    export_format = request.GET.get('format', 'ndjson')
+    if export_format not in ('ndjson', 'csv'):
+        return JsonResponse({'detail': f'不支持的导出格式: {export_format}'}, status=400)
+    try:
+        fields = _parse_fields(request.GET.get('fields'))
+    except ValueError as e:
+        return JsonResponse({'detail': str(e)}, status=400)
+
+    async def stream():
+        async with _slots():
+            chunks = await sync_to_async(export_stream)(request.GET, fields, export_format)
+            next_chunk = sync_to_async(next)
+            try:
+                while (chunk := await next_chunk(chunks, None)) is not None:
+                    yield chunk
+            finally:
+                # 客户端中途断开时也要关闭服务器端游标
+                await sync_to_async(chunks.close)()
+
+    return export_response(stream(), export_format)
+
+
+@async_api_view(['GET'])
+async def computer_detail_api(request, pk):
+    """获取计算机详情API（api.views.computer_detail_api 的异步版本）"""
+    async with _slots():
+        last_update = await Computer.objects.filter(pk=pk).values_list('last_update', flat=True).afirst()
+    if last_update is None:
+        return _json({'error': 'Computer not found'}, status.HTTP_404_NOT_FOUND)
+
+    def build():
+        return ComputerSerializer(Computer.objects.get(pk=pk)).data
+
+    return await acached_json_response(request, detail_version(pk, last_update), lambda: run_sync(build))
+
+
+@async_api_view(['GET'])
+async def rollups_api(request):
+    """机队分布汇总API（api.views.rollups_api 的异步版本）"""
+    try:
+        dimensions, day, compare_day = parse_rollup_params(request.GET)
+    except ValueError as e:
+        return _json({'detail': str(e)}, status.HTTP_400_BAD_REQUEST)
+
+    version = await run_sync(current_version)
+    return await acached_json_response(
+        request, rollup_version(version, day, compare_day),
+        lambda: run_sync(rollup_response, dimensions, day, compare_day),
+    )
@@ -0,0 +1,87 @@
+"""
+读接口的条件请求（ETag）和序列化结果缓存
+
+客户端和看板定时轮询列表、详情接口，数据通常没有变化。每个响应都带 ETag，
+客户端带 If-None-Match 再次请求且数据未变化时直接返回 304；没有带条件头的请求
+从缓存中取已经渲染好的 JSON，不再查询和序列化。
+
+响应不带 Last-Modified，也不处理 If-Modified-Since：HTTP 日期只精确到秒，
+同一秒内写入的新记录不会改变它，按它判断会把已经过期的数据当成未修改返回 304。
+
+ETag 由数据版本（见 computers.data_version）和完整的请求路径计算，入库写入新记录后
+数据版本改变，旧的缓存项不再被使用，在 API_RESPONSE_CACHE_TTL 秒后过期。
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.http.response import HttpResponseBase
+from django.utils.cache import get_conditional_response
+from rest_framework.renderers import JSONRenderer
+
+
+def _conditional(request, version):
+    """
+    计算 ETag 和响应头；请求带的条件头匹配时返回 (None, None, 304 响应)
+
+    否则返回 (缓存键, 带响应头的 HttpResponse, None)。
+    """
+    digest = hashlib.md5(f'{version}|{request.get_full_path()}'.encode('utf-8')).hexdigest()
+    headers = HttpResponse()
+    headers['ETag'] = f'"{digest}"'
+    # 客户端每次使用前都要带条件头重新验证
+    headers['Cache-Control'] = 'no-cache'
+    conditional = get_conditional_response(request, etag=headers['ETag'], response=headers)
+    if conditional is not headers:
+        return None, None, conditional
+    return f'api:response:{digest}', headers, None
+
+
+def _render(data):
+    return data if isinstance(data, bytes) else JSONRenderer().render(data)
+
+
+def _json_response(content, headers):
+    response = HttpResponse(content, content_type='application/json')
+    for header in ('ETag', 'Cache-Control'):
+        response[header] = headers[header]
+    return response
+
+
+def cached_json_response(request, version, build):
+    """
+    按数据版本返回 304、缓存的 JSON 或新生成的 JSON
+
+    build() 返回要输出的数据或已编码的 JSON 字节串；返回响应对象时（例如参数错误）原样返回，不缓存。
+    """
+    key, headers, conditional = _conditional(request, version)
+    if conditional is not None:
+        return conditional
+
+    content = cache.get(key) if settings.API_RESPONSE_CACHE_TTL else None
+    if content is None:
+        data = build()
+        if isinstance(data, HttpResponseBase):
+            return data
+        content = _render(data)
+        if settings.API_RESPONSE_CACHE_TTL:
+            cache.set(key, content, settings.API_RESPONSE_CACHE_TTL)
+    return _json_response(content, headers)
+
+
+async def acached_json_response(request, version, build):
+    """cached_json_response 的异步版本（api.async_views 使用）：build 是协程函数，其余行为相同"""
+    key, headers, conditional = _conditional(request, version)
+    if conditional is not None:
+        return conditional
+
+    content = await cache.aget(key) if settings.API_RESPONSE_CACHE_TTL else None
+    if content is None:
+        data = await build()
+        if isinstance(data, HttpResponseBase):
+            return data
+        content = _render(data)
+        if settings.API_RESPONSE_CACHE_TTL:
+            await cache.aset(key, content, settings.API_RESPONSE_CACHE_TTL)
+    return _json_response(content, headers)
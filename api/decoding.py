@@ -0,0 +1,63 @@
+import binascii
+import codecs
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 每次解码的 Base64 字符数（4 的倍数）
+BASE64_CHUNK_SIZE = 256 * 1024
+
+# Base64 文本中允许出现、解码前需要去掉的空白字符
+_WHITESPACE = str.maketrans('', '', ' \t\r\n')
+
+
+def iter_base64_text(encoded, chunk_size=BASE64_CHUNK_SIZE):
+    """
+    分块解码 Base64 编码的 UTF-8 文本，逐块产出解码后的字符串
+
+    每块先按 4 个字符对齐后解码为字节，再交给增量 UTF-8 解码器（多字节字符被
+    块边界截断时会留到下一块），同时移除空字符（\\x00）。解码过程中只有一块
+    Base64 和字节的中间结果，但产出的文本块由调用方保留或拼接。
+    无法解码的 UTF-8 字节被忽略；Base64 格式错误时抛出 ValueError。
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore')
+    carry = ''
+    for start in range(0, len(encoded), chunk_size):
+        chunk = carry + encoded[start:start + chunk_size].translate(_WHITESPACE)
+        aligned = len(chunk) - len(chunk) % 4
+        carry = chunk[aligned:]
+        if aligned:
+            yield decoder.decode(_b64decode(chunk[:aligned])).replace('\x00', '')
+    if carry:
+        yield decoder.decode(_b64decode(carry)).replace('\x00', '')
+    yield decoder.decode(b'', final=True).replace('\x00', '')
+
+
+def _b64decode(chunk):
+    try:
+        return binascii.a2b_base64(chunk)
+    except binascii.Error as e:
+        raise ValueError(str(e))
+
+
+def decode_execution_log(data):
+    """
+    就地解码 Base64 传输的 execution_log
+
+    data 中 execution_log_encoding='base64' 时解码 execution_log 并移除编码标记字段；
+    解码失败时抛出 ValueError。解码后的文本中的空字符（\\x00）会被移除，
+    Django CharField 不允许空字符。
+
+    内存占用：拼接时各文本块和拼接结果同时存在，峰值约为解码后文本的 2 倍，
+    另外调用方的请求数据（request.data）在请求结束前一直引用 Base64 原文。
+    """
+    if data.get('execution_log_encoding') != 'base64':
+        return
+
+    encoded = data.get('execution_log') or ''
+    if not isinstance(encoded, str):
+        raise ValueError('execution_log 必须是字符串')
+    data['execution_log'] = ''.join(iter_base64_text(encoded))
+    logger.debug('execution_log Base64 解码完成: %d -> %d 字符', len(encoded), len(data['execution_log']))
+    # 移除编码标记字段
+    data.pop('execution_log_encoding', None)
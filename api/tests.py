@@ -0,0 +1,134 @@
+"""
+读接口测试（python manage.py test api）
+"""
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils.http import http_date
+from rest_framework.renderers import JSONRenderer
+
+from api import fast_read
+from computers.models import Computer
+from computers.serializers import ComputerSerializer
+
+RECORD = {
+    'asset_code': 'PC-001', 'sn_code': 'SN001', 'model': 'OptiPlex 7090', 'device_type': 'Desktop',
+    'cpu_model': 'Intel i7-11700', 'memory_size': 16, 'os_version': 'Windows 11',
+    'os_internal_version': '22H2', 'user_name': 'zhangsan', 'computer_name': 'PC-ZHANGSAN',
+    'execution_log': 'ok', 'log_size': 2, 'error_log': '', 'has_errors': False, 'uploader': 'script',
+}
+
+
+@override_settings(API_RESPONSE_CACHE_TTL=0)
+class ConditionalRequestTests(TestCase):
+    def ingest(self, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                '/api/computers/create/', json.dumps(dict(RECORD, **fields)), content_type='application/json'
+            )
+        self.assertEqual(response.status_code, 201, response.content)
+
+    def test_unchanged_list_returns_304(self):
+        self.ingest()
+        etag = self.client.get('/api/computers/')['ETag']
+        response = self.client.get('/api/computers/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_ingest_in_same_second_returns_200(self):
+        now = datetime(2026, 10, 17, 8, 0, 0, 100000, tzinfo=dt_timezone.utc)
+        with mock.patch('django.utils.timezone.now', return_value=now):
+            self.ingest(asset_code='PC-001')
+            first = self.client.get('/api/computers/')
+            self.ingest(asset_code='PC-002')
+        self.assertNotIn('Last-Modified', first)
+
+        for headers in (
+            {'HTTP_IF_MODIFIED_SINCE': http_date(now.timestamp())},
+            {'HTTP_IF_NONE_MATCH': first['ETag'], 'HTTP_IF_MODIFIED_SINCE': http_date(now.timestamp())},
+        ):
+            with self.subTest(headers=list(headers)):
+                for path in ('/api/computers/', '/api/changes/'):
+                    response = self.client.get(path, **headers)
+                    self.assertEqual(response.status_code, 200)
+                response = self.client.get('/api/computers/', **headers)
+                self.assertEqual(len(response.json()['results']), 2)
+
+
+class FastReadTests(TestCase):
+    """API_FAST_READ 打开和关闭时，列表接口输出的字节必须相同"""
+
+    @classmethod
+    def setUpTestData(cls):
+        records = [
+            {},
+            # 非 ASCII、U+2028 / U+2029 和需要转义的字符
+            {'asset_code': 'PC-002', 'user_name': '张三\u2028李四', 'computer_name': 'PC-\u2029"\\/\t',
+             'execution_log': '执行完成\u2028第二行\n😀', 'log_size': 30, 'error_log': '错误：磁盘不足\u2029',
+             'has_errors': True},
+            {'asset_code': 'PC-003', 'execution_log': '', 'log_size': 0, 'memory_size': 2 ** 31 - 1},
+        ]
+        for record in records:
+            response = cls.client_class().post(
+                '/api/computers/create/', json.dumps(dict(RECORD, **record)), content_type='application/json'
+            )
+            assert response.status_code == 201, response.content
+        # 没有日志侧表行的记录
+        Computer.objects.create(**{
+            key: value for key, value in RECORD.items() if key not in ('execution_log', 'error_log')
+        } | {'asset_code': 'PC-004'})
+
+        # 带微秒和不带微秒、跨日期的时间
+        base = datetime(2026, 10, 16, 23, 30, 0, tzinfo=dt_timezone.utc)
+        for index, pk in enumerate(Computer.objects.order_by('id').values_list('id', flat=True)):
+            Computer.objects.filter(pk=pk).update(
+                upload_time=base + timedelta(minutes=index * 17, microseconds=index * 250001),
+                last_update=base + timedelta(hours=index),
+            )
+
+    def get_all(self, query):
+        """按游标取完所有页，返回每一页的响应字节"""
+        pages = []
+        cursor = None
+        while True:
+            params = dict(query, page_size=2, **({'cursor': cursor} if cursor else {}))
+            response = self.client.get('/api/computers/', params)
+            self.assertEqual(response.status_code, 200, response.content)
+            pages.append(response.content)
+            cursor = json.loads(response.content)['next_cursor']
+            if not cursor:
+                return pages
+
+    def assert_same_output(self, query):
+        outputs = {}
+        for fast in (True, False):
+            with override_settings(API_FAST_READ=fast, API_RESPONSE_CACHE_TTL=0):
+                outputs[fast] = self.get_all(query)
+        self.assertEqual(outputs[True], outputs[False])
+        self.assertEqual(len(outputs[True]), 2)
+
+    def test_same_bytes(self):
+        queries = {
+            'default': {},
+            'subset': {'fields': 'user_name,id,upload_time'},
+            'without_cursor_columns': {'fields': 'asset_code,memory_size,has_errors'},
+            'logs': {'fields': 'id,execution_log,error_log,log_size,log_stored_size'},
+            'all': {'fields': ','.join(ComputerSerializer.Meta.fields)},
+        }
+        for time_zone in ('Asia/Shanghai', 'UTC'):
+            for name, query in queries.items():
+                with self.subTest(time_zone=time_zone, query=name), override_settings(TIME_ZONE=time_zone):
+                    self.assert_same_output(query)
+
+    def test_same_bytes_without_orjson(self):
+        with mock.patch.object(fast_read, 'orjson', None):
+            self.assert_same_output({'fields': ','.join(ComputerSerializer.Meta.fields)})
+
+    def test_null_datetimes(self):
+        # 表中的时间列不能为空，直接对比两种转换对空值的处理
+        fields = ['id', 'user_name', 'upload_time', 'last_update']
+        computer = Computer(id=1, user_name='张三', upload_time=None, last_update=None)
+        expected = JSONRenderer().render(ComputerSerializer([computer], many=True, fields=fields).data)
+        rows = [(computer.id, computer.user_name, None, None)]
+        self.assertEqual(fast_read.render_json(fast_read.serialize_rows(rows, fields)), expected)
@@ -1,10 +1,19 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views as sync_views
+
+# ASGI 部署使用异步版本的视图，URL 和响应完全相同
+views = async_views if settings.API_ASYNC else sync_views
 
 app_name = 'api'
 
 urlpatterns = [
     path('computers/', views.computer_list_api, name='computer_list_api'),  # GET for list
     path('computers/create/', views.create_computer, name='create_computer'),  # POST for create
+    path('computers/batch/', views.create_computers_batch, name='create_computers_batch'),  # POST for batch create
+    path('computers/search/', views.search_computers_api, name='search_computers_api'),  # GET for ranked search
+    path('computers/export/', views.export_computers, name='export_computers'),  # GET for streaming export
     path('computers/<int:pk>/', views.computer_detail_api, name='computer_detail_api'),
+    path('changes/', views.change_events_api, name='change_events_api'),  # GET for field-level change events
+    path('rollups/', views.rollups_api, name='rollups_api'),  # GET for fleet distribution rollups
 ]
@@ -1,15 +1,153 @@
-import base64
+import csv
+import json
 import logging
+import random
+import time
+from datetime import datetime, timedelta
 
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.views.decorators.http import require_GET
 from rest_framework import status
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, parser_classes
+from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
-from computers.models import Computer
-from computers.serializers import ComputerCreateSerializer, ComputerSerializer
+from computers import metrics
+from computers.data_version import current_version
+from computers.changes import CHANGE_FIELDS
+from computers.filters import filter_changes, filter_computers
+from computers.ingest import save_records
+from computers.logstore import LOG_COLUMNS
+from computers.models import ChangeEvent, Computer
+from computers.pagination import InvalidCursor, encode_cursor, keyset_page
+from computers.rollups import ROLLUP_DIMENSIONS, rollup_report
+from computers.search import search_computers
+from computers.spool import enqueue
+from computers.serializers import (
+    LIST_DEFAULT_FIELDS, ChangeEventSerializer, ComputerCreateSerializer, ComputerSerializer,
+)
+from .caching import cached_json_response
+from .decoding import decode_execution_log
+from .fast_read import DATETIME_FIELDS, computer_page, iter_rows, query_columns, render_json
+from .parsers import NDJSONParser
 
 logger = logging.getLogger(__name__)
 
 
+def _parse_fields(value):
+    """解析 ?fields= 参数，未指定时返回默认字段（不含日志）"""
+    if not value:
+        return list(LIST_DEFAULT_FIELDS)
+    fields = [f.strip() for f in value.split(',') if f.strip()]
+    unknown = [f for f in fields if f not in ComputerSerializer.Meta.fields]
+    if unknown:
+        raise ValueError(f'未知字段: {", ".join(unknown)}')
+    return fields
+
+
+def _parse_page_size(value):
+    """解析 ?page_size= 参数，超过上限时按上限处理"""
+    if not value:
+        return settings.API_PAGE_SIZE
+    try:
+        page_size = int(value)
+    except ValueError:
+        raise ValueError(f'page_size 必须是整数: {value}')
+    if page_size < 1:
+        raise ValueError('page_size 必须大于 0')
+    return min(page_size, settings.API_MAX_PAGE_SIZE)
+
+
+def _load_only(computers, fields):
+    """只加载 fields 需要的列；请求了日志字段时一并连接日志侧表读取，避免逐行查询"""
+    columns = {'id', 'upload_time'}
+    for field in fields:
+        columns.update(LOG_COLUMNS.get(field, (field,)))
+    if 'execution_log' in fields:
+        computers = computers.select_related('log__execution_log_blob')
+    elif 'error_log' in fields:
+        computers = computers.select_related('log')
+    return computers.only(*columns)
+
+
+def _log_ingest(request, started, status_code, asset_code, **detail):
+    """
+    每个入库请求记录一行摘要日志（key=value 格式）
+
+    使用 % 延迟格式化，日志级别关闭时不会产生格式化开销；失败的请求记为 WARNING。
+    """
+    level = logging.INFO if status_code < 400 else logging.WARNING
+    if not logger.isEnabledFor(level):
+        return
+    logger.log(
+        level,
+        'ingest status=%d asset_code=%s ip=%s duration_ms=%.1f%s',
+        status_code, asset_code, request.META.get('REMOTE_ADDR', '-'),
+        (time.perf_counter() - started) * 1000,
+        ''.join(f' {key}={value}' for key, value in detail.items()),
+    )
+
+
+def _count_ingest(outcome, records=(), errors=()):
+    """
+    更新入库指标
+
+    成功时 records 为写入（或暂存）的 validated_data 列表；失败时 errors 为出错的字段，
+    每次调用计一条失败记录。
+    """
+    metrics.inc('ingest_records_total', len(records) or 1, outcome=outcome)
+    log_bytes = sum(len(record.get('execution_log', '').encode('utf-8')) for record in records)
+    if log_bytes:
+        metrics.inc('ingest_log_bytes_total', log_bytes)
+    for field in errors:
+        metrics.inc('ingest_validation_failures_total', field=field)
+
+
+def _log_request_detail(request, data):
+    """按 INGEST_LOG_SAMPLE_RATE 抽样记录请求的逐字段详情（DEBUG 级别）"""
+    if not logger.isEnabledFor(logging.DEBUG) or random.random() >= settings.INGEST_LOG_SAMPLE_RATE:
+        return
+    logger.debug(
+        'ingest detail asset_code=%s computer_name=%s user_agent=%r content_type=%s fields=%s os_version=%r',
+        data.get('asset_code'), data.get('computer_name'),
+        request.META.get('HTTP_USER_AGENT', ''), request.META.get('CONTENT_TYPE', ''),
+        ','.join(data), data.get('os_version', ''),
+    )
+
+
+def _export_rows(computers, fields):
+    """
+    按 fields 的顺序逐行产出导出的字段值
+
+    日志字段从日志侧表读取（执行日志从 LogBlob 解压），时间字段转换为本地时区的 ISO 8601 格式；
+    需要转换的列事先确定，不再逐个值判断类型。
+    """
+    rows = computers.values_list(*query_columns(fields)).iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+    datetime_indexes = [index for index, field in enumerate(fields) if field in DATETIME_FIELDS]
+    for row in iter_rows(rows, fields):
+        if datetime_indexes:
+            row = list(row)
+            for index in datetime_indexes:
+                row[index] = _export_value(row[index])
+        yield row
+
+
+class _Echo:
+    """供 csv.writer 使用的伪文件对象，write() 直接返回写入的内容"""
+    
+    def write(self, value):
+        return value
+
+
+def _export_value(value):
+    """导出时的字段值转换：时间统一转为本地时区的 ISO 8601 格式"""
+    if isinstance(value, datetime):
+        return timezone.localtime(value).isoformat()
+    return value
+
+
 @api_view(['POST'])
 def create_computer(request):
     """接收客户端提交的计算机信息
@@ -17,82 +155,434 @@ def create_computer(request):
     支持 execution_log 的 Base64 编码传输：
     - 如果请求中包含 execution_log_encoding='base64'，则自动解码
     - 解码后移除 execution_log_encoding 字段
+    
+    INGEST_MODE=spool 时校验通过后只写入暂存区并返回 202，由后台进程入库。
+    与该计算机上一次状态相同的提交不创建新记录，返回 200 和已有的最新记录。
     """
-    # 记录请求基本信息
-    logger.info(f"收到 API 请求 - User-Agent: {request.META.get('HTTP_USER_AGENT', 'Unknown')}")
-    logger.info(f"请求来源 IP: {request.META.get('REMOTE_ADDR', 'Unknown')}")
-    logger.info(f"Content-Type: {request.META.get('CONTENT_TYPE', 'Unknown')}")
+    started = time.perf_counter()
     
     # 创建可变的字典副本
-    data = dict(request.data)
-    
-    # 记录关键字段
-    logger.info(f"接收到数据 - asset_code: {data.get('asset_code')}, computer_name: {data.get('computer_name')}")
-    logger.info(f"数据字段: {list(data.keys())}")
-    logger.info(f"os_version 原始值: {repr(data.get('os_version', ''))}")
-    logger.info(f"os_version 显示值: {data.get('os_version', '')}")
+    payload, status_code = ingest_record(request, dict(request.data), started)
+    return Response(payload, status=status_code)
+
+
+def ingest_record(request, data, started):
+    """
+    解码、校验并保存（或暂存）一条提交的记录，返回 (响应数据, 状态码)
+
+    create_computer 和 api.async_views 中的异步版本共用。
+    """
+    asset_code = data.get('asset_code')
+    _log_request_detail(request, data)
     
     # 检查是否使用 Base64 编码传输日志
-    if data.get('execution_log_encoding') == 'base64':
-        logger.info("检测到 execution_log_encoding=base64，开始解码...")
-        try:
-            execution_log_base64 = data.get('execution_log', '')
-            if execution_log_base64:
-                # Base64 解码
-                execution_log_bytes = base64.b64decode(execution_log_base64)
-                # 转换为 UTF-8 字符串，忽略无法解码的字符
-                decoded_log = execution_log_bytes.decode('utf-8', errors='ignore')
-                # ⭐ 关键修复：移除空字符（\x00），Django CharField 不允许空字符
-                data['execution_log'] = decoded_log.replace('\x00', '')
-                logger.info(f"成功解码 Base64 日志，原始大小: {len(execution_log_base64)}, 解码后大小: {len(data['execution_log'])}")
-                # 检查是否包含其他控制字符
-                null_count = decoded_log.count('\x00')
-                if null_count > 0:
-                    logger.warning(f"日志中包含 {null_count} 个空字符（已移除）")
-            else:
-                logger.warning("execution_log 为空字符串")
-                data['execution_log'] = ''
-            # 移除编码标记字段
-            data.pop('execution_log_encoding', None)
-        except Exception as e:
-            logger.error(f"Base64 日志解码失败: {e}")
-            return Response(
-                {'detail': f'日志解码失败: {str(e)}'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-    else:
-        logger.info(f"未使用 Base64 编码，execution_log 长度: {len(data.get('execution_log', ''))}")
+    try:
+        decode_execution_log(data)
+    except ValueError as e:
+        _count_ingest('invalid', errors=['execution_log'])
+        _log_ingest(request, started, status.HTTP_400_BAD_REQUEST, asset_code, error='base64', reason=e)
+        return {'detail': f'日志解码失败: {str(e)}'}, status.HTTP_400_BAD_REQUEST
     
     serializer = ComputerCreateSerializer(data=data)
     
     if serializer.is_valid():
-        logger.info("数据验证通过，正在保存...")
+        if settings.INGEST_MODE == 'spool':
+            spool_id = enqueue(serializer.validated_data)
+            _count_ingest('queued', [serializer.validated_data])
+            _log_ingest(request, started, status.HTTP_202_ACCEPTED, asset_code, spool_id=spool_id)
+            return (
+                {'status': 'queued', 'spool_id': spool_id, 'asset_code': serializer.validated_data['asset_code']},
+                status.HTTP_202_ACCEPTED,
+            )
+        
         computer = serializer.save()
-        logger.info(f"记录已创建 - ID: {computer.id}, asset_code: {computer.asset_code}")
+        if getattr(computer, 'deduplicated', False):
+            _count_ingest('unchanged', [serializer.validated_data])
+            _log_ingest(request, started, status.HTTP_200_OK, asset_code, id=computer.id, unchanged=True)
+            return ComputerSerializer(computer).data, status.HTTP_200_OK
+        _count_ingest('created', [serializer.validated_data])
+        _log_ingest(request, started, status.HTTP_201_CREATED, asset_code, id=computer.id, log_size=computer.log_size)
         response_serializer = ComputerSerializer(computer)
-        return Response(response_serializer.data, status=status.HTTP_201_CREATED)
+        return response_serializer.data, status.HTTP_201_CREATED
     
-    # 验证失败，记录详细错误
-    logger.error(f"数据验证失败: {serializer.errors}")
-    logger.error(f"提交的数据摘要: asset_code={data.get('asset_code')}, sn_code={data.get('sn_code')}, model={data.get('model')}")
+    # 验证失败：摘要行中记录出错的字段，完整错误信息返回给客户端
+    _count_ingest('invalid', errors=serializer.errors)
+    _log_ingest(
+        request, started, status.HTTP_400_BAD_REQUEST, asset_code,
+        error='validation', fields=','.join(serializer.errors),
+    )
+    return serializer.errors, status.HTTP_400_BAD_REQUEST
+
+
+@api_view(['POST'])
+@parser_classes([JSONParser, NDJSONParser])
+def create_computers_batch(request):
+    """批量接收计算机信息（采集中转节点、离线站点补传使用）
+
+    请求体支持两种格式：
+    - application/json: 记录数组，或 {"records": [...]}
+    - application/x-ndjson: 每行一条记录
     
-    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    每条记录的格式与 create_computer 相同。校验通过的记录在一个事务内用
+    bulk_create 分块写入，校验失败的记录不会写入，逐条返回处理结果。
+    与该计算机上一次状态相同的记录不创建新记录，状态为 unchanged，id 为已有的最新记录。
+    """
+    payload, status_code = ingest_batch(request, request.data)
+    return Response(payload, status=status_code)
+
+
+def ingest_batch(request, records):
+    """
+    处理一批解析后的记录，返回 (响应数据, 状态码)
+
+    create_computers_batch 和 api.async_views 中的异步版本共用。
+    """
+    if isinstance(records, dict):
+        records = records.get('records')
+    if not isinstance(records, list):
+        return {'detail': '请求体必须是记录数组、{"records": [...]} 或 NDJSON'}, status.HTTP_400_BAD_REQUEST
+    if len(records) > settings.API_BATCH_MAX_RECORDS:
+        return (
+            {'detail': f'单次最多提交 {settings.API_BATCH_MAX_RECORDS} 条记录，实际 {len(records)} 条'},
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        )
+    
+    started = time.perf_counter()
+    results = [None] * len(records)
+    valid_indexes = []
+    valid_records = []
+    for index, item in enumerate(records):
+        if not isinstance(item, dict):
+            results[index] = {'index': index, 'status': 'error', 'errors': {'non_field_errors': ['记录必须是 JSON 对象']}}
+            _count_ingest('invalid', errors=['non_field_errors'])
+            continue
+        data = dict(item)
+        try:
+            decode_execution_log(data)
+        except ValueError as e:
+            results[index] = {'index': index, 'status': 'error', 'errors': {'execution_log': [f'日志解码失败: {e}']}}
+            _count_ingest('invalid', errors=['execution_log'])
+            continue
+        serializer = ComputerCreateSerializer(data=data)
+        if serializer.is_valid():
+            valid_indexes.append(index)
+            valid_records.append(serializer.validated_data)
+        else:
+            results[index] = {'index': index, 'status': 'error', 'errors': serializer.errors}
+            _count_ingest('invalid', errors=serializer.errors)
+    
+    computers = save_records(valid_records)
+    saved = {'created': [], 'unchanged': []}
+    for index, record, computer in zip(valid_indexes, valid_records, computers):
+        outcome = 'unchanged' if getattr(computer, 'deduplicated', False) else 'created'
+        saved[outcome].append(record)
+        results[index] = {'index': index, 'status': outcome, 'id': computer.id, 'asset_code': computer.asset_code}
+    for outcome, outcome_records in saved.items():
+        if outcome_records:
+            _count_ingest(outcome, outcome_records)
+    
+    created = len(saved['created'])
+    unchanged = len(saved['unchanged'])
+    failed = len(records) - len(computers)
+    
+    if failed == 0:
+        response_status = status.HTTP_201_CREATED
+    elif not computers:
+        response_status = status.HTTP_400_BAD_REQUEST
+    else:
+        response_status = status.HTTP_207_MULTI_STATUS
+    _log_ingest(
+        request, started, response_status, '-',
+        batch=len(records), created=created, unchanged=unchanged, failed=failed,
+    )
+    return {'created': created, 'unchanged': unchanged, 'failed': failed, 'results': results}, response_status
 
 
 @api_view(['GET'])
 def computer_list_api(request):
-    """获取计算机列表API"""
-    computers = Computer.objects.all()
-    serializer = ComputerSerializer(computers, many=True)
-    return Response(serializer.data)
+    """获取计算机列表API（游标分页）
+
+    查询参数：
+    - cursor: 上一页响应中的 next_cursor，不传则从最新记录开始
+    - page_size: 每页条数，默认 API_PAGE_SIZE，超过 API_MAX_PAGE_SIZE 按上限处理
+    - fields: 逗号分隔的返回字段，默认不包含 execution_log 和 error_log
+    - asset_code: 按资产编码精确过滤
+    - scope / search / device_type / has_errors / upload_from / upload_to: 与计算机列表页相同的筛选条件，
+      scope=current 时只返回每台计算机的最新记录；指定上传日期范围时分区表只扫描相关分区
+    
+    支持 ETag 条件请求，数据没有变化时返回 304（见 api.caching）。
+    """
+    try:
+        fields = _parse_fields(request.query_params.get('fields'))
+        page_size = _parse_page_size(request.query_params.get('page_size'))
+    except ValueError as e:
+        return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    def build():
+        try:
+            return computer_list_page(request.query_params, fields, page_size)
+        except InvalidCursor as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    # 数据未变化时返回 304 或缓存的响应，不再查询和序列化
+    version = current_version()
+    return cached_json_response(request, version, build)
+
+
+def computer_list_page(params, fields, page_size):
+    """列表接口的一页（字典或已编码的 JSON），游标无效时抛出 InvalidCursor"""
+    computers = filter_computers(Computer.objects.all(), params)
+    
+    asset_code = params.get('asset_code')
+    if asset_code:
+        computers = computers.filter(asset_code=asset_code)
+    
+    cursor = params.get('cursor')
+    if settings.API_FAST_READ:
+        # 直接由查询结果生成字典，输出与 ComputerSerializer 逐字节相同（见 api.fast_read）
+        results, next_cursor = computer_page(computers, fields, cursor, page_size)
+    else:
+        # 只加载需要的列，日志等大字段不会从数据库读出
+        rows, next_cursor = keyset_page(_load_only(computers, fields), cursor, page_size)
+        results = ComputerSerializer(rows, many=True, fields=fields).data
+    
+    data = {
+        'results': results,
+        'next_cursor': next_cursor,
+        'page_size': page_size,
+    }
+    return render_json(data) if settings.API_FAST_READ else data
 
 
 @api_view(['GET'])
-def computer_detail_api(request, pk):
-    """获取计算机详情API"""
+def change_events_api(request):
+    """字段变化事件API（游标分页，按变化时间倒序）
+
+    查询参数：
+    - field: 逗号分隔的字段名，例如 memory_size,cpu_model,user_name，不传则返回全部字段的变化
+    - asset_code: 按资产编码精确过滤
+    - changed_from / changed_to: 变化日期范围（YYYY-MM-DD，包含两端）
+    - cursor / page_size: 与列表接口相同
+    
+    每条变化事件包含原值、新值（均为字符串）和变化后记录的 id（computer）。
+    支持 ETag 条件请求（见 api.caching）。
+    """
+    try:
+        page_size = _parse_page_size(request.query_params.get('page_size'))
+        _check_change_fields(request.query_params.get('field'))
+    except ValueError as e:
+        return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    def build():
+        try:
+            return change_events_page(request.query_params, page_size)
+        except InvalidCursor as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    # 变化事件与记录在同一事务内写入和删除，沿用记录的数据版本
+    version = current_version()
+    return cached_json_response(request, version, build)
+
+
+def _check_change_fields(value):
+    """检查 ?field= 参数中的字段名，有不支持的字段时抛出 ValueError"""
+    fields = [f.strip() for f in (value or '').split(',') if f.strip()]
+    unknown = [f for f in fields if f not in CHANGE_FIELDS]
+    if unknown:
+        raise ValueError(f'不支持的字段: {", ".join(unknown)}，可选: {", ".join(CHANGE_FIELDS)}')
+
+
+def change_events_page(params, page_size):
+    """变化事件接口的一页，游标无效时抛出 InvalidCursor"""
+    events = filter_changes(ChangeEvent.objects.all(), params)
+    rows, next_cursor = keyset_page(
+        events, params.get('cursor'), page_size,
+        row_cursor=lambda event: encode_cursor(event.changed_at, event.id), time_field='changed_at',
+    )
+    return {
+        'results': ChangeEventSerializer(rows, many=True).data,
+        'next_cursor': next_cursor,
+        'page_size': page_size,
+    }
+
+
+@api_view(['GET'])
+def search_computers_api(request):
+    """搜索计算机记录API（按相关度排序）
+
+    查询参数：
+    - q: 搜索关键字（必填），在资产编码、用户名、计算机名、型号、SN码中匹配
+    - page_size: 返回条数，默认 API_PAGE_SIZE，超过 API_MAX_PAGE_SIZE 按上限处理
+    - fields: 与列表接口相同
+    - scope / device_type / has_errors: 与计算机列表页相同的筛选条件
+    
+    每条结果附带 rank（相关度，越大越相关）。
+    """
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response({'detail': '请提供搜索关键字 q'}, status=status.HTTP_400_BAD_REQUEST)
     try:
-        computer = Computer.objects.get(pk=pk)
-        serializer = ComputerSerializer(computer)
-        return Response(serializer.data)
-    except Computer.DoesNotExist:
+        fields = _parse_fields(request.query_params.get('fields'))
+        page_size = _parse_page_size(request.query_params.get('page_size'))
+    except ValueError as e:
+        return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response(search_results(request.query_params, query, fields, page_size))
+
+
+def search_results(params, query, fields, page_size):
+    """搜索接口的响应数据"""
+    computers = filter_computers(_load_only(Computer.objects.all(), fields), params)
+    rows = list(search_computers(computers, query)[:page_size])
+    
+    results = ComputerSerializer(rows, many=True, fields=fields).data
+    for item, computer in zip(results, rows):
+        item['rank'] = computer.rank
+    return {'query': query, 'results': results}
+
+
+@require_GET
+def export_computers(request):
+    """流式导出计算机记录（NDJSON / CSV）
+
+    查询参数：
+    - format: ndjson（默认）或 csv
+    - fields: 逗号分隔的导出字段，默认不包含 execution_log 和 error_log
+    - scope / search / device_type / has_errors / upload_from / upload_to: 与计算机列表页相同的筛选条件
+    
+    通过数据库游标分块读取并边读边发送，导出全部历史记录时 Web 进程内存占用恒定。
+    """
+    export_format = request.GET.get('format', 'ndjson')
+    if export_format not in ('ndjson', 'csv'):
+        return JsonResponse({'detail': f'不支持的导出格式: {export_format}'}, status=400)
+    try:
+        fields = _parse_fields(request.GET.get('fields'))
+    except ValueError as e:
+        return JsonResponse({'detail': str(e)}, status=400)
+    
+    return export_response(export_stream(request.GET, fields, export_format), export_format)
+
+
+def export_stream(params, fields, export_format):
+    """逐块产出导出内容（字符串）"""
+    computers = filter_computers(Computer.objects.all(), params)
+    rows = _export_rows(computers.order_by('-upload_time', '-id'), fields)
+    
+    def stream_csv():
+        writer = csv.writer(_Echo())
+        # UTF-8 BOM，保证 Excel 打开时中文不乱码
+        yield '\ufeff' + writer.writerow(fields)
+        buffer = []
+        for row in rows:
+            buffer.append(writer.writerow(row))
+            if len(buffer) >= settings.EXPORT_CHUNK_SIZE:
+                yield ''.join(buffer)
+                buffer = []
+        if buffer:
+            yield ''.join(buffer)
+    
+    def stream_ndjson():
+        buffer = []
+        for row in rows:
+            record = dict(zip(fields, row))
+            buffer.append(json.dumps(record, ensure_ascii=False) + '\n')
+            if len(buffer) >= settings.EXPORT_CHUNK_SIZE:
+                yield ''.join(buffer)
+                buffer = []
+        if buffer:
+            yield ''.join(buffer)
+    
+    return stream_csv() if export_format == 'csv' else stream_ndjson()
+
+
+def export_response(content, export_format):
+    """导出的流式响应；content 可以是同步或异步迭代器"""
+    if export_format == 'csv':
+        response = StreamingHttpResponse(content, content_type='text/csv; charset=utf-8')
+    else:
+        response = StreamingHttpResponse(content, content_type='application/x-ndjson; charset=utf-8')
+    filename = f'computers-{timezone.localtime():%Y%m%d-%H%M%S}.{export_format}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@api_view(['GET'])
+def computer_detail_api(request, pk):
+    """获取计算机详情API
+    
+    支持 ETag 条件请求：只按主键读取 last_update，记录未修改时返回 304。
+    """
+    last_update = Computer.objects.filter(pk=pk).values_list('last_update', flat=True).first()
+    if last_update is None:
         return Response({'error': 'Computer not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    def build():
+        return ComputerSerializer(Computer.objects.get(pk=pk)).data
+    
+    return cached_json_response(request, detail_version(pk, last_update), build)
+
+
+def detail_version(pk, last_update):
+    return f'{pk}:{last_update.isoformat()}'
+
+
+@api_view(['GET'])
+def rollups_api(request):
+    """机队分布汇总API（每台计算机按其最新记录计入，读取每日汇总表）
+    
+    查询参数：
+    - dimension: 逗号分隔的维度，可选 os_internal_version、cpu_model、memory_size、model，不传则返回全部
+    - date: 统计日期（YYYY-MM-DD），默认今天，返回这一天结束时的分布
+    - compare: 对比日期，默认 date 的 7 天前；每个取值的 change 为与对比日期相比的台数变化
+    
+    每个取值包含台数、占比、有错误的台数和错误率（有错误的台数 / 台数）。
+    支持 ETag 条件请求（见 api.caching）。
+    """
+    try:
+        dimensions, day, compare_day = parse_rollup_params(request.query_params)
+    except ValueError as e:
+        return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    version = current_version()
+    return cached_json_response(
+        request, rollup_version(version, day, compare_day),
+        lambda: rollup_response(dimensions, day, compare_day),
+    )
+
+
+def _parse_day_param(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is None:
+        raise ValueError(f'{name} 不是有效的日期（YYYY-MM-DD）: {value}')
+    return day
+
+
+def parse_rollup_params(params):
+    """解析汇总接口的参数，返回 (维度列表, 统计日期, 对比日期)，参数无效时抛出 ValueError"""
+    dimensions = [d.strip() for d in (params.get('dimension') or '').split(',') if d.strip()]
+    unknown = [d for d in dimensions if d not in ROLLUP_DIMENSIONS]
+    if unknown:
+        raise ValueError(f'不支持的维度: {", ".join(unknown)}，可选: {", ".join(ROLLUP_DIMENSIONS)}')
+    day = _parse_day_param(params, 'date') or timezone.localdate()
+    compare_day = _parse_day_param(params, 'compare') or day - timedelta(days=7)
+    return dimensions or list(ROLLUP_DIMENSIONS), day, compare_day
+
+
+def rollup_version(version, day, compare_day):
+    # 不带 date 参数时统计日期随时间变化，ETag 和缓存键需要包含实际的日期
+    return f'{version}:{day.isoformat()}:{compare_day.isoformat()}'
+
+
+def rollup_response(dimensions, day, compare_day):
+    """汇总接口的响应数据"""
+    return {
+        'date': day.isoformat(),
+        'compare': compare_day.isoformat(),
+        'dimensions': rollup_report(dimensions, day, compare_day),
+    }
@@ -0,0 +1,77 @@
+"""
+对比两次基准测试的结果（loadgen.py 输出的 JSON）
+
+    python benchmarks/compare.py benchmarks/results/旧版本.json benchmarks/results/新版本.json --threshold 10
+
+吞吐量下降或 p95 / p99 延迟上升超过 --threshold 百分比时以状态码 1 退出，可以在 CI 中使用。
+"""
+import argparse
+import json
+import sys
+
+
+def change(old, new):
+    """相对变化（百分比），无法计算时返回 None"""
+    if not old or new is None:
+        return None
+    return (new - old) / old * 100
+
+
+def main():
+    parser = argparse.ArgumentParser(description='对比两次基准测试的结果')
+    parser.add_argument('baseline', help='基准结果 JSON')
+    parser.add_argument('candidate', help='新结果 JSON')
+    parser.add_argument('--threshold', type=float, default=10.0, help='判定为性能回退的变化百分比（默认 10）')
+    args = parser.parse_args()
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(args.candidate, encoding='utf-8') as f:
+        candidate = json.load(f)
+
+    metrics = [
+        ('吞吐(次/秒)', lambda s: s['throughput_rps'], -1),
+        ('p50(ms)', lambda s: s['latency_ms']['p50'], 1),
+        ('p95(ms)', lambda s: s['latency_ms']['p95'], 1),
+        ('p99(ms)', lambda s: s['latency_ms']['p99'], 1),
+        ('错误数', lambda s: s['errors'], 1),
+    ]
+    regressions = []
+    print(f'{"阶段":<8}{"指标":<12}{"基准":>12}{"新结果":>12}{"变化":>12}')
+    for phase in candidate['phases']:
+        if phase not in baseline['phases']:
+            continue
+        old_summary, new_summary = baseline['phases'][phase], candidate['phases'][phase]
+        for label, get, direction in metrics:
+            old, new = get(old_summary), get(new_summary)
+            delta = change(old, new)
+            text = f'{delta:+.1f}%' if delta is not None else '-'
+            # direction: 1 表示越小越好，-1 表示越大越好；p50 只展示，不参与判定，错误数增加即为回退
+            if label == '错误数':
+                regressed = (new or 0) > (old or 0)
+            else:
+                regressed = delta is not None and label != 'p50(ms)' and delta * direction > args.threshold
+            if regressed:
+                regressions.append(f'{phase} {label} {text}')
+                text += ' ⚠️'
+            print(f'{phase:<10}{label:<14}{old if old is not None else "-":>12}{new if new is not None else "-":>12}{text:>12}')
+
+    old_growth, new_growth = baseline.get('db_growth'), candidate.get('db_growth')
+    if old_growth and new_growth:
+        delta = change(old_growth['bytes_per_10k_uploads'], new_growth['bytes_per_10k_uploads'])
+        text = f'{delta:+.1f}%' if delta is not None else '-'
+        if delta is not None and delta > args.threshold:
+            regressions.append(f'数据库增长 {text}')
+        print(
+            f'每 1 万次提交的数据库增长: {old_growth["bytes_per_10k_uploads"] / 1024 / 1024:.1f} MB -> '
+            f'{new_growth["bytes_per_10k_uploads"] / 1024 / 1024:.1f} MB（{text}）'
+        )
+
+    if regressions:
+        print(f'\n⚠️  超过 {args.threshold}% 的回退: ' + '，'.join(regressions))
+        sys.exit(1)
+    print('\n✅ 没有超过阈值的回退')
+
+
+if __name__ == '__main__':
+    main()
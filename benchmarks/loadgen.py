@@ -0,0 +1,284 @@
+"""
+登录高峰（logon storm）负载生成与接口基准测试
+
+模拟早上大量计算机同时登录、同时运行采集脚本提交信息的场景，依次压测：
+- ingest: POST /api/computers/create/（与客户端相同的 gzip + Base64 日志请求体）
+- list:   GET /api/computers/（随机筛选条件，沿 next_cursor 翻页）
+- search: GET /api/computers/search/
+- detail: GET /api/computers/<id>/
+
+输出每个阶段的吞吐量、p50/p95/p99 延迟和错误数；指定 --measure-db 时（与服务器使用
+同一份配置，在仓库根目录运行）还统计每 1 万次提交的数据库增长。结果写入 JSON 文件，
+用 benchmarks/compare.py 对比两个版本的结果。
+
+    python benchmarks/loadgen.py --base-url http://127.0.0.1:8000 --uploads 10000 --concurrency 50 --measure-db
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+import requests
+
+from payloads import Fleet, encode_body
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULT_FORMAT = 1
+
+
+def percentile(sorted_values, fraction):
+    """最近秩法计算百分位数，sorted_values 需已排序"""
+    if not sorted_values:
+        return None
+    rank = max(int(round(fraction * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+class Phase:
+    """一个压测阶段的计时和统计，可在多个线程中同时记录"""
+
+    def __init__(self, name):
+        self.name = name
+        self.latencies = []
+        self.statuses = {}
+        self.errors = 0
+        self.lock = threading.Lock()
+        self.started = self.finished = None
+
+    def record(self, started, status):
+        elapsed = (time.perf_counter() - started) * 1000
+        with self.lock:
+            self.latencies.append(elapsed)
+            self.statuses[str(status)] = self.statuses.get(str(status), 0) + 1
+            if not isinstance(status, int) or status >= 400:
+                self.errors += 1
+
+    def summary(self):
+        latencies = sorted(self.latencies)
+        duration = (self.finished or time.perf_counter()) - self.started
+        ok = len(latencies) - self.errors
+        return {
+            'requests': len(latencies),
+            'errors': self.errors,
+            'status_counts': self.statuses,
+            'duration_s': round(duration, 3),
+            'throughput_rps': round(ok / duration, 1) if duration else None,
+            'latency_ms': {
+                'p50': _round(percentile(latencies, 0.50)),
+                'p95': _round(percentile(latencies, 0.95)),
+                'p99': _round(percentile(latencies, 0.99)),
+                'max': _round(latencies[-1] if latencies else None),
+                'mean': _round(sum(latencies) / len(latencies) if latencies else None),
+            },
+        }
+
+
+def _round(value):
+    return None if value is None else round(value, 2)
+
+
+class Runner:
+    def __init__(self, args):
+        self.args = args
+        self.base_url = args.base_url.rstrip('/')
+        self.local = threading.local()
+        self.fleet = Fleet(args.assets, change_rate=args.change_rate, log_kb=args.log_kb, seed=args.seed)
+        self.fleet_lock = threading.Lock()
+        self.record_ids = []
+        self.random = random.Random(args.seed)
+
+    @property
+    def session(self):
+        if not hasattr(self.local, 'session'):
+            self.local.session = requests.Session()
+        return self.local.session
+
+    def _request(self, phase, method, path, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, self.base_url + path, timeout=self.args.timeout, **kwargs)
+        except requests.RequestException as e:
+            phase.record(started, type(e).__name__)
+            return None
+        phase.record(started, response.status_code)
+        return response
+
+    def run(self, phase, count, task):
+        phase.started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.args.concurrency) as pool:
+            for _ in pool.map(lambda _: task(phase), range(count)):
+                pass
+        phase.finished = time.perf_counter()
+        return phase.summary()
+
+    # 各阶段的单个请求
+
+    def ingest(self, phase):
+        with self.fleet_lock:
+            payload = self.fleet.payload()
+        body, headers = encode_body(payload, compress=not self.args.no_compression)
+        response = self._request(phase, 'POST', '/api/computers/create/', data=body, headers=headers)
+        if response is not None and response.status_code in (200, 201):
+            record_id = response.json().get('id')
+            if record_id:
+                with self.fleet_lock:
+                    self.record_ids.append(record_id)
+
+    def list(self, phase):
+        params = self.random.choice([
+            {}, {'scope': 'current'}, {'has_errors': 'false'},
+            {'device_type': self.random.choice(['Desktop', 'Laptop', 'Notebook'])},
+        ])
+        params['page_size'] = self.args.page_size
+        for _ in range(self.args.list_pages):
+            response = self._request(phase, 'GET', '/api/computers/', params=params)
+            if response is None or response.status_code != 200:
+                return
+            cursor = response.json().get('next_cursor')
+            if not cursor:
+                return
+            params['cursor'] = cursor
+
+    def search(self, phase):
+        machine = self.random.choice(self.fleet.machines)
+        query = self.random.choice([machine['asset_code'][-6:], machine['user_name'], machine['model'].split()[0]])
+        self._request(phase, 'GET', '/api/computers/search/', params={'q': query, 'page_size': 20})
+
+    def detail(self, phase):
+        if not self.record_ids:
+            return
+        self._request(phase, 'GET', f'/api/computers/{self.random.choice(self.record_ids)}/')
+
+    def load_record_ids(self):
+        """只压测读接口时（没有 ingest 阶段）从列表接口取一批记录 id"""
+        response = requests.get(
+            f'{self.base_url}/api/computers/', params={'fields': 'id', 'page_size': 500}, timeout=self.args.timeout
+        )
+        response.raise_for_status()
+        self.record_ids = [item['id'] for item in response.json()['results']]
+
+
+def database_size():
+    """返回 (数据库占用字节数, Computer 记录数)；需要与服务器相同的 Django 配置"""
+    import django
+    from django.conf import settings
+
+    if not settings.configured:
+        sys.path.insert(0, str(ROOT))
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pc_info_record.settings')
+        django.setup()
+    from django.db import connection
+    from computers.models import Computer
+
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_database_size(current_database())')
+            size = cursor.fetchone()[0]
+    else:
+        name = str(settings.DATABASES['default']['NAME'])
+        size = sum(os.path.getsize(path) for path in (name, f'{name}-wal') if os.path.exists(path))
+    return size, Computer.objects.count()
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = bool(subprocess.run(
+            ['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT, capture_output=True, text=True
+        ).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return {'commit': commit, 'dirty': dirty}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='登录高峰负载生成与接口基准测试')
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000', help='服务器地址')
+    parser.add_argument('--phases', default='ingest,list,search,detail', help='要执行的阶段，逗号分隔')
+    parser.add_argument('--concurrency', type=int, default=50, help='并发客户端数（默认 50）')
+    parser.add_argument('--uploads', type=int, default=10000, help='ingest 阶段的提交次数（默认 10000）')
+    parser.add_argument('--assets', type=int, default=5000, help='模拟的计算机台数（默认 5000）')
+    parser.add_argument('--change-rate', type=float, default=0.05, help='每次提交信息有变化的概率（默认 0.05）')
+    parser.add_argument('--log-kb', type=int, default=24, help='每次提交的执行日志大小，KB（默认 24）')
+    parser.add_argument('--no-compression', action='store_true', help='不压缩请求体')
+    parser.add_argument('--reads', type=int, default=2000, help='list / search / detail 阶段各自的请求次数（默认 2000）')
+    parser.add_argument('--list-pages', type=int, default=3, help='list 阶段每次最多翻的页数（默认 3）')
+    parser.add_argument('--page-size', type=int, default=100, help='list 阶段的每页条数（默认 100）')
+    parser.add_argument('--timeout', type=float, default=30, help='请求超时，秒（默认 30）')
+    parser.add_argument('--seed', type=int, default=1, help='随机数种子（默认 1，保证各版本的请求序列相同）')
+    parser.add_argument('--measure-db', action='store_true', help='统计 ingest 阶段的数据库增长（需要能连接数据库）')
+    parser.add_argument('--settle', type=float, default=0, help='ingest 结束后等待的秒数（INGEST_MODE=spool 时等待后台入库）')
+    parser.add_argument('--label', default='', help='结果的标签，例如版本号')
+    parser.add_argument('--output', default=None, help='结果 JSON 文件，默认 benchmarks/results/<时间>-<提交>.json')
+    args = parser.parse_args()
+
+    phases = [phase.strip() for phase in args.phases.split(',') if phase.strip()]
+    runner = Runner(args)
+    revision = git_revision()
+    result = {
+        'format': RESULT_FORMAT,
+        'label': args.label,
+        'started_at': datetime.now(timezone.utc).isoformat(),
+        'git': revision,
+        'config': vars(args),
+        'phases': {},
+    }
+
+    if 'ingest' in phases:
+        before = database_size() if args.measure_db else None
+        print(f'ingest: {args.uploads} 次提交，{args.concurrency} 个并发客户端，{args.assets} 台计算机 ...')
+        result['phases']['ingest'] = runner.run(Phase('ingest'), args.uploads, runner.ingest)
+        if args.measure_db:
+            time.sleep(args.settle)
+            after = database_size()
+            growth = after[0] - before[0]
+            result['db_growth'] = {
+                'bytes_before': before[0],
+                'bytes_after': after[0],
+                'rows_written': after[1] - before[1],
+                'bytes_per_10k_uploads': round(growth * 10000 / args.uploads) if args.uploads else None,
+                'rows_per_10k_uploads': round((after[1] - before[1]) * 10000 / args.uploads) if args.uploads else None,
+            }
+    elif 'detail' in phases:
+        runner.load_record_ids()
+
+    for name in ('list', 'search', 'detail'):
+        if name in phases:
+            print(f'{name}: {args.reads} 次，{args.concurrency} 个并发客户端 ...')
+            result['phases'][name] = runner.run(Phase(name), args.reads, getattr(runner, name))
+
+    print()
+    print(f'{"阶段":<8}{"请求":>8}{"错误":>6}{"吞吐(次/秒)":>14}{"p50(ms)":>10}{"p95(ms)":>10}{"p99(ms)":>10}')
+    for name, summary in result['phases'].items():
+        latency = summary['latency_ms']
+        print(
+            f'{name:<10}{summary["requests"]:>8}{summary["errors"]:>6}{summary["throughput_rps"] or 0:>14}'
+            f'{latency["p50"] or 0:>10}{latency["p95"] or 0:>10}{latency["p99"] or 0:>10}'
+        )
+    if 'db_growth' in result:
+        growth = result['db_growth']
+        print(
+            f'数据库增长: 每 1 万次提交 {growth["bytes_per_10k_uploads"] / 1024 / 1024:.1f} MB，'
+            f'{growth["rows_per_10k_uploads"]} 条记录'
+        )
+
+    output = Path(args.output) if args.output else (
+        ROOT / 'benchmarks' / 'results'
+        / f'{datetime.now():%Y%m%d-%H%M%S}-{(revision or {}).get("commit", "unknown")[:8]}.json'
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding='utf-8')
+    print(f'结果已保存: {output}')
+
+
+if __name__ == '__main__':
+    main()
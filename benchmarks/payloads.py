@@ -0,0 +1,132 @@
+"""
+模拟 client/collect_computer_info.ps1 提交的数据
+
+每台计算机的硬件、系统信息固定（由资产编号决定），每次提交只有执行日志的时间戳不同；
+按 change_rate 的概率模拟使用人、内存或系统版本的变化。执行日志是 PowerShell 转录
+风格的多行文本，按 Base64 传输（execution_log_encoding='base64'），请求体可以 gzip 压缩。
+"""
+import base64
+import gzip
+import json
+import random
+from datetime import datetime, timedelta
+
+MODELS = [
+    ('Dell Inc.', 'OptiPlex 7090', 'Desktop'),
+    ('Dell Inc.', 'Latitude 5420', 'Laptop'),
+    ('LENOVO', 'ThinkCentre M70q', 'Mini Tower'),
+    ('LENOVO', 'ThinkPad T14 Gen 2', 'Notebook'),
+    ('HP', 'EliteDesk 800 G6', 'Desktop'),
+    ('HP', 'EliteBook 840 G8', 'Notebook'),
+]
+CPUS = [
+    'Intel(R) Core(TM) i5-10500 CPU @ 3.10GHz',
+    'Intel(R) Core(TM) i7-11700 @ 2.50GHz',
+    '11th Gen Intel(R) Core(TM) i5-1145G7 @ 2.60GHz',
+    'AMD Ryzen 5 PRO 5650G with Radeon Graphics',
+]
+OS_VERSIONS = [
+    ('Microsoft Windows 10 专业版', '10.0.19045'),
+    ('Microsoft Windows 11 专业版', '10.0.22631'),
+    ('Microsoft Windows 11 企业版', '10.0.26100'),
+]
+MEMORY_SIZES = [8, 16, 16, 32]
+
+LOG_LINES = [
+    '**********************',
+    'Windows PowerShell transcript start',
+    'Start time: {time:%Y%m%d%H%M%S}',
+    'Username: CORP\\{user}',
+    'RunAs User: CORP\\{user}',
+    'Machine: {computer} (Microsoft Windows NT {build}.0)',
+    'Host Application: C:\\Windows\\System32\\WindowsPowerShell\\v1.0\\powershell.exe -ExecutionPolicy Bypass -File collect_computer_info.ps1',
+    '📋 步骤 1: 收集系统信息',
+    '✅ 系统信息收集完成',
+    '  计算机名: {computer}',
+    '  CPU: {cpu}',
+    '  内存: {memory} GB',
+    'VERBOSE: Perform operation \'Query CimInstances\' with following parameters, \'queryExpression\' = SELECT * FROM Win32_BIOS',
+    'VERBOSE: Operation \'Query CimInstances\' complete.',
+    'Get-CimInstance : 已完成 Win32_LogicalDisk 查询 (DeviceID=C:, FreeSpace={free} bytes)',
+    '正在发送数据到: http://pc-info.corp.example/api/computers/create/',
+]
+
+
+class Fleet:
+    """一组模拟的计算机，记住每台计算机上一次提交的内容"""
+
+    def __init__(self, assets, change_rate=0.05, log_kb=24, seed=None):
+        self.random = random.Random(seed)
+        self.change_rate = change_rate
+        self.log_bytes = log_kb * 1024
+        self.machines = [self._machine(index) for index in range(assets)]
+
+    def _machine(self, index):
+        rng = random.Random(index)
+        brand, model, device_type = rng.choice(MODELS)
+        os_version, build = rng.choice(OS_VERSIONS)
+        serial = f'{rng.getrandbits(40):010X}'
+        return {
+            'asset_code': f'PC-{serial}',
+            'sn_code': serial,
+            'model': model,
+            'device_type': device_type,
+            'cpu_model': rng.choice(CPUS),
+            'memory_size': rng.choice(MEMORY_SIZES),
+            'os_version': os_version,
+            'os_internal_version': build,
+            'user_name': f'user{index:05d}',
+            'computer_name': f'{brand.split()[0].upper()}-{index:05d}',
+        }
+
+    def _execution_log(self, machine, when):
+        values = {
+            'time': when, 'user': machine['user_name'], 'computer': machine['computer_name'],
+            'build': machine['os_internal_version'], 'cpu': machine['cpu_model'],
+            'memory': machine['memory_size'], 'free': self.random.randrange(10**10, 10**11),
+        }
+        lines = []
+        size = 0
+        while size < self.log_bytes:
+            line = f'{when:%H:%M:%S} ' + self.random.choice(LOG_LINES).format(**values)
+            lines.append(line)
+            size += len(line.encode('utf-8')) + 2
+            when += timedelta(milliseconds=self.random.randrange(1, 400))
+        return '\r\n'.join(lines)
+
+    def _maybe_change(self, machine):
+        if self.random.random() >= self.change_rate:
+            return
+        field = self.random.choice(('user_name', 'memory_size', 'os_internal_version'))
+        if field == 'user_name':
+            machine['user_name'] = f'user{self.random.randrange(100000):05d}'
+        elif field == 'memory_size':
+            machine['memory_size'] = self.random.choice([size for size in MEMORY_SIZES if size != machine['memory_size']])
+        else:
+            major, minor = machine['os_internal_version'].rsplit('.', 1)
+            machine['os_internal_version'] = f'{major}.{int(minor) + 1}'
+
+    def payload(self, index=None):
+        """下一次提交的数据（字典）；index 指定计算机，默认随机选择"""
+        machine = self.machines[self.random.randrange(len(self.machines)) if index is None else index]
+        self._maybe_change(machine)
+        log = self._execution_log(machine, datetime.now())
+        return {
+            **machine,
+            'execution_log': base64.b64encode(log.encode('utf-8')).decode('ascii'),
+            'execution_log_encoding': 'base64',
+            'log_size': len(log.encode('utf-8')),
+            'error_log': '',
+            'has_errors': False,
+            'uploader': 'powershell_collector',
+        }
+
+
+def encode_body(payload, compress=True):
+    """按客户端的方式编码请求体，返回 (body, headers)"""
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    headers = {'Content-Type': 'application/json; charset=utf-8', 'User-Agent': 'PC-Info-Collector/2.0'}
+    if compress:
+        body = gzip.compress(body)
+        headers['Content-Encoding'] = 'gzip'
+    return body, headers
@@ -0,0 +1,79 @@
+#!/bin/bash
+# 在本机启动一次性的数据库和 gunicorn，运行登录高峰基准测试，结束后全部清理
+#
+#   benchmarks/run_local.sh                          # PostgreSQL（docker 或本机 initdb/pg_ctl）
+#   BENCH_DB=sqlite benchmarks/run_local.sh          # SQLite
+#   SERVER_MODE=asgi benchmarks/run_local.sh         # uvicorn worker + 异步 API
+#   benchmarks/run_local.sh --uploads 50000 --concurrency 200 --label v2.3
+#
+# 其余参数原样传给 benchmarks/loadgen.py；结果保存在 benchmarks/results/。
+# 可用环境变量：BENCH_DB、BENCH_PORT（gunicorn 端口，默认 8765）、BENCH_PG_PORT（默认 55432）、
+# BENCH_WORKERS（gunicorn worker 数，默认 4）、BENCH_PG_IMAGE（默认 postgres:17）
+set -euo pipefail
+
+ROOT="$(cd "$(dirname "$0")/.." && pwd)"
+cd "$ROOT"
+
+BENCH_DB="${BENCH_DB:-postgres}"
+BENCH_PORT="${BENCH_PORT:-8765}"
+BENCH_PG_PORT="${BENCH_PG_PORT:-55432}"
+BENCH_WORKERS="${BENCH_WORKERS:-4}"
+BENCH_PG_IMAGE="${BENCH_PG_IMAGE:-postgres:17}"
+WORKDIR="$(mktemp -d -t pcinfo-bench-XXXXXX)"
+CONTAINER=""
+PGDATA_DIR=""
+GUNICORN_PID=""
+
+cleanup() {
+  echo ""
+  echo "🧹 清理测试环境..."
+  [ -n "$GUNICORN_PID" ] && kill "$GUNICORN_PID" 2>/dev/null && wait "$GUNICORN_PID" 2>/dev/null || true
+  [ -n "$CONTAINER" ] && docker rm -f "$CONTAINER" >/dev/null 2>&1 || true
+  [ -n "$PGDATA_DIR" ] && pg_ctl -D "$PGDATA_DIR" -m immediate stop >/dev/null 2>&1 || true
+  rm -rf "$WORKDIR"
+}
+trap cleanup EXIT
+
+export DEBUG=False
+export SECRET_KEY=benchmark-only
+export ALLOWED_HOSTS=127.0.0.1,localhost
+
+if [ "$BENCH_DB" = "sqlite" ]; then
+  echo "🗄️  使用 SQLite: $WORKDIR/bench.sqlite3"
+  export DB_ENGINE=sqlite
+  export DB_NAME="$WORKDIR/bench.sqlite3"
+else
+  export DB_NAME=pc_info_record DB_USER=postgres DB_PASSWORD=bench DB_HOST=127.0.0.1 DB_PORT="$BENCH_PG_PORT"
+  if command -v docker >/dev/null 2>&1; then
+    echo "🐘 启动 PostgreSQL 容器（$BENCH_PG_IMAGE，端口 $BENCH_PG_PORT）..."
+    CONTAINER="pcinfo-bench-$$"
+    docker run -d --rm --name "$CONTAINER" -e POSTGRES_PASSWORD=bench -e POSTGRES_DB=pc_info_record \
+      -p "127.0.0.1:$BENCH_PG_PORT:5432" "$BENCH_PG_IMAGE" >/dev/null
+    until docker exec "$CONTAINER" pg_isready -U postgres -d pc_info_record >/dev/null 2>&1; do sleep 1; done
+  elif command -v initdb >/dev/null 2>&1 && command -v pg_ctl >/dev/null 2>&1; then
+    echo "🐘 使用本机 initdb 启动临时 PostgreSQL（端口 $BENCH_PG_PORT）..."
+    PGDATA_DIR="$WORKDIR/pgdata"
+    echo bench > "$WORKDIR/pwfile"
+    initdb -D "$PGDATA_DIR" -U postgres --pwfile="$WORKDIR/pwfile" -A scram-sha-256 >/dev/null
+    pg_ctl -D "$PGDATA_DIR" -o "-p $BENCH_PG_PORT -k $WORKDIR -c listen_addresses=127.0.0.1" -l "$WORKDIR/pg.log" -w start >/dev/null
+    PGPASSWORD=bench createdb -h 127.0.0.1 -p "$BENCH_PG_PORT" -U postgres pc_info_record
+  else
+    echo "❌ 需要 docker 或 PostgreSQL 的 initdb/pg_ctl，也可以使用 BENCH_DB=sqlite"
+    exit 1
+  fi
+fi
+
+echo "🔄 执行数据库迁移..."
+python manage.py migrate --noinput >/dev/null
+
+echo "🚀 启动 gunicorn（${SERVER_MODE:-wsgi}，$BENCH_WORKERS 个 worker，端口 $BENCH_PORT）..."
+GUNICORN_BIND="127.0.0.1:$BENCH_PORT" GUNICORN_WORKERS="$BENCH_WORKERS" \
+  gunicorn -c docker/gunicorn.conf.py --access-logfile /dev/null --error-logfile "$WORKDIR/gunicorn.log" &
+GUNICORN_PID=$!
+for _ in $(seq 1 30); do
+  curl -sf "http://127.0.0.1:$BENCH_PORT/health/ready/" >/dev/null 2>&1 && break
+  sleep 1
+done
+
+echo ""
+python benchmarks/loadgen.py --base-url "http://127.0.0.1:$BENCH_PORT" --measure-db "$@"
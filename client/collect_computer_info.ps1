@@ -7,7 +7,9 @@
 
 param(
     [string]$ServerUrl = "http://10.65.37.238",
-    [string]$ApiEndpoint = "$ServerUrl/api/computers/create/"
+    [string]$ApiEndpoint = "$ServerUrl/api/computers/create/",
+    # 不压缩请求体（服务器版本不支持 Content-Encoding: gzip 时使用）
+    [switch]$NoCompression
 )
 
 # 设置错误处理
@@ -184,16 +186,36 @@ try {
         Write-Host "正在发送数据到: $ApiEndpoint" -ForegroundColor Cyan
         Write-Host "数据大小: $($jsonData.Length) 字节" -ForegroundColor Cyan
         
+        # gzip 压缩请求体，减少分支机构到服务器的流量
+        $requestBody = $jsonData
+        if (-not $NoCompression) {
+            $jsonBytes = [System.Text.Encoding]::UTF8.GetBytes($jsonData)
+            $memoryStream = New-Object System.IO.MemoryStream
+            $gzipStream = New-Object System.IO.Compression.GZipStream($memoryStream, [System.IO.Compression.CompressionMode]::Compress)
+            $gzipStream.Write($jsonBytes, 0, $jsonBytes.Length)
+            $gzipStream.Close()
+            $requestBody = $memoryStream.ToArray()
+            $headers['Content-Type'] = 'application/json; charset=utf-8'
+            $headers['Content-Encoding'] = 'gzip'
+            Write-Host "压缩后大小: $($requestBody.Length) 字节" -ForegroundColor Cyan
+        }
+        
         # 发送 POST 请求
-        $apiResponse = Invoke-WebRequest -Uri $ApiEndpoint -Method Post -Body $jsonData -Headers $headers -TimeoutSec 30
+        $apiResponse = Invoke-WebRequest -Uri $ApiEndpoint -Method Post -Body $requestBody -Headers $headers -TimeoutSec 30
         
-        if ($apiResponse.StatusCode -eq 201) {
+        if ($apiResponse.StatusCode -in 200, 201, 202) {
             Write-Host "✅ 数据发送成功!" -ForegroundColor Green
             Write-Host "状态码: $($apiResponse.StatusCode)" -ForegroundColor Green
             
-            # 解析响应
+            # 解析响应（202 表示服务器已接收，稍后由后台写入数据库；200 表示与上次提交相比没有变化）
             $responseData = $apiResponse.Content | ConvertFrom-Json
-            Write-Host "创建的记录 ID: $($responseData.id)" -ForegroundColor Green
+            if ($apiResponse.StatusCode -eq 202) {
+                Write-Host "服务器已接收，等待后台入库（暂存 ID: $($responseData.spool_id)）" -ForegroundColor Green
+            } elseif ($apiResponse.StatusCode -eq 200) {
+                Write-Host "信息与上次提交相同，已更新最后上报时间（记录 ID: $($responseData.id)）" -ForegroundColor Green
+            } else {
+                Write-Host "创建的记录 ID: $($responseData.id)" -ForegroundColor Green
+            }
             Write-Host "服务器响应: $($apiResponse.Content)" -ForegroundColor Cyan
             
             $uploadSuccess = $true
@@ -233,10 +255,10 @@ try {
 
     if ($uploadSuccess) {
         try {
-            $listResponse = Invoke-WebRequest -Uri "$ServerUrl/api/computers/" -Method Get -TimeoutSec 10
-            $computerList = $listResponse.Content | ConvertFrom-Json
+            $listResponse = Invoke-WebRequest -Uri "$ServerUrl/api/computers/?asset_code=$([uri]::EscapeDataString($assetCode))&page_size=1" -Method Get -TimeoutSec 10
+            $computerList = ($listResponse.Content | ConvertFrom-Json).results
             
-            Write-Host "✅ 成功获取计算机列表，共 $($computerList.Count) 条记录" -ForegroundColor Green
+            Write-Host "✅ 成功获取计算机列表，返回 $($computerList.Count) 条记录" -ForegroundColor Green
             
             # 查找我们刚创建的记录
             $ourRecord = $computerList | Where-Object { $_.asset_code -eq $assetCode }
@@ -1,4 +1,6 @@
 from django.contrib import admin
+
+from . import data_version
 from .models import Computer
 
 
@@ -13,9 +15,10 @@ class ComputerAdmin(admin.ModelAdmin):
     ]
     search_fields = [
         'asset_code', 'sn_code', 'user_name', 'computer_name', 
-        'model', 'cpu_model', 'execution_log', 'error_log'
+        'model', 'cpu_model', 'log__error_log'
     ]
-    readonly_fields = ['upload_time', 'last_update']
+    # 日志存放在 ComputerLog 侧表（执行日志压缩存储在 LogBlob 中），后台只读展示
+    readonly_fields = ['execution_log', 'log_stored_size', 'error_log', 'upload_time', 'last_update']
     ordering = ['-upload_time']
     
     fieldsets = (
@@ -32,7 +35,7 @@ class ComputerAdmin(admin.ModelAdmin):
             'fields': ('user_name', 'computer_name')
         }),
         ('日志信息', {
-            'fields': ('execution_log', 'log_size'),
+            'fields': ('execution_log', 'log_size', 'log_stored_size'),
             'classes': ('collapse',)
         }),
         ('错误信息', {
@@ -45,6 +48,14 @@ class ComputerAdmin(admin.ModelAdmin):
         }),
     )
     
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        data_version.touch()
+    
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        data_version.touch()
+    
     def get_queryset(self, request):
         """优化查询"""
         qs = super().get_queryset(request)
@@ -0,0 +1,90 @@
+"""
+字段变化事件（ChangeEvent）的生成
+
+入库时把新记录与同一资产编码的上一条记录逐字段比较，每个变化的字段写入一行
+ChangeEvent（与写入记录在同一个事务内）。“本周哪些计算机换了内存、CPU 或使用人”
+只需按 (field, changed_at) 索引查询变化事件表，不再读取全部历史记录在 Python 中比较。
+
+上一条记录是同一资产编码最后写入的记录（当前状态表指向的记录，或同一批中之前的记录），
+计算机的第一条记录没有变化事件。
+"""
+from django.db import transaction
+
+from . import data_version
+from .models import ChangeEvent, Computer
+
+# 生成变化事件的字段（has_errors 是每次提交的状态，不算计算机信息的变化）
+# 修改后已有的变化事件不会重新生成，需要执行 rebuild_change_events
+CHANGE_FIELDS = (
+    'sn_code', 'model', 'device_type', 'cpu_model', 'memory_size',
+    'os_version', 'os_internal_version', 'user_name', 'computer_name',
+)
+
+
+def _text(value):
+    return None if value is None else str(value)
+
+
+def diff_events(computer_id, asset_code, changed_at, previous, current):
+    """比较两条记录的 CHANGE_FIELDS（字段名到取值的映射），返回未保存的 ChangeEvent 列表"""
+    return [
+        ChangeEvent(
+            computer_id=computer_id, asset_code=asset_code, field=field, changed_at=changed_at,
+            old_value=_text(previous[field]), new_value=_text(current[field]),
+        )
+        for field in CHANGE_FIELDS
+        if previous[field] != current[field]
+    ]
+
+
+def record_changes(computers, previous_state, batch_size=None):
+    """
+    为新写入的记录生成变化事件
+
+    computers 为按写入顺序排列、已经保存的 Computer 实例；previous_state 为 lock_current_state
+    的返回值，需要包含 CHANGE_FIELDS。需要在写入 computers 的同一个事务内调用。
+    """
+    previous = dict(previous_state)
+    events = []
+    for computer in computers:
+        current = {field: getattr(computer, field) for field in CHANGE_FIELDS}
+        if computer.asset_code in previous:
+            events.extend(diff_events(
+                computer.pk, computer.asset_code, computer.upload_time, previous[computer.asset_code], current,
+            ))
+        previous[computer.asset_code] = current
+    if events:
+        ChangeEvent.objects.bulk_create(events, batch_size=batch_size)
+    return len(events)
+
+
+def rebuild_change_events(batch_size=1000):
+    """
+    根据历史记录重新生成全部变化事件，返回事件数
+
+    按 (asset_code, id) 顺序读取历史记录，与入库时“上一条记录”的含义一致。
+    """
+    rows = (
+        Computer.objects.order_by('asset_code', 'id')
+        .values_list('id', 'asset_code', 'upload_time', *CHANGE_FIELDS)
+    )
+    total = 0
+    with transaction.atomic():
+        ChangeEvent.objects.all().delete()
+        events = []
+        asset_code = previous = None
+        for pk, code, upload_time, *values in rows.iterator(chunk_size=batch_size):
+            current = dict(zip(CHANGE_FIELDS, values))
+            if code == asset_code:
+                events.extend(diff_events(pk, code, upload_time, previous, current))
+            asset_code, previous = code, current
+            if len(events) >= batch_size:
+                ChangeEvent.objects.bulk_create(events)
+                total += len(events)
+                events = []
+        if events:
+            ChangeEvent.objects.bulk_create(events)
+            total += len(events)
+        # 变化事件接口的 ETag 基于数据版本
+        data_version.touch()
+    return total
@@ -0,0 +1,61 @@
+"""
+日志内容的压缩与解压
+
+默认使用标准库 zlib；安装了 zstandard 时可以通过 LOG_BLOB_CODEC=zstd 改用 zstd。
+解压时按每条记录保存的编码方式处理，两种编码的数据可以共存。
+"""
+import gzip
+import hashlib
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # zstd 是可选依赖
+    zstandard = None
+
+
+def content_digest(raw):
+    """日志内容的 SHA-256 摘要（十六进制），用作 LogBlob 主键"""
+    return hashlib.sha256(raw).hexdigest()
+
+
+def compress(raw, codec='zlib'):
+    """按指定编码压缩字节串"""
+    if codec == 'zlib':
+        return zlib.compress(raw, 6)
+    if codec == 'zstd':
+        if zstandard is None:
+            raise ValueError('未安装 zstandard，无法使用 zstd 压缩')
+        return zstandard.ZstdCompressor(level=10).compress(raw)
+    raise ValueError(f'不支持的压缩编码: {codec}')
+
+
+# 解压损坏的数据时可能抛出的异常
+DECOMPRESSION_ERRORS = (OSError, EOFError, zlib.error) + ((zstandard.ZstdError,) if zstandard else ())
+
+
+def open_decompressed(stream, encoding):
+    """
+    把压缩的输入流包装为解压后的只读文件对象，按需边读边解压
+
+    encoding 为 HTTP Content-Encoding 的取值，不支持时抛出 ValueError。
+    """
+    if encoding in ('gzip', 'x-gzip'):
+        return gzip.GzipFile(fileobj=stream, mode='rb')
+    if encoding == 'zstd':
+        if zstandard is None:
+            raise ValueError('未安装 zstandard，无法解压 zstd 请求')
+        return zstandard.ZstdDecompressor().stream_reader(stream)
+    raise ValueError(f'不支持的 Content-Encoding: {encoding}')
+
+
+def decompress(data, codec):
+    """按指定编码解压字节串"""
+    data = bytes(data)
+    if codec == 'zlib':
+        return zlib.decompress(data)
+    if codec == 'zstd':
+        if zstandard is None:
+            raise ValueError('未安装 zstandard，无法解压 zstd 日志')
+        return zstandard.ZstdDecompressor().decompress(data)
+    raise ValueError(f'不支持的压缩编码: {codec}')
@@ -0,0 +1,134 @@
+"""
+计算机当前状态（CurrentComputer）的维护
+"""
+from collections import Counter
+
+from django.db import connection, transaction
+from django.db.models import F, Max
+
+from . import data_version
+from .models import Computer, CurrentComputer
+
+
+def lock_current_state(asset_codes, fields=()):
+    """
+    锁定这些资产编码的当前状态行，返回 {asset_code: {...}}
+
+    每项包含 computer_id、fingerprint 以及 fields 中列出的最新记录（Computer）的字段。
+    必须在入库事务内、写入新记录之前调用：锁保证并发提交同一台计算机时
+    看到的“上一次状态”是一致的。
+    """
+    if not asset_codes:
+        return {}
+    _lock_asset_codes(asset_codes)
+    columns = ['asset_code', 'computer_id', 'fingerprint'] + [f'computer__{field}' for field in fields]
+    rows = (
+        CurrentComputer.objects.select_for_update(of=('self',))
+        .filter(asset_code__in=asset_codes)
+        .order_by('asset_code')
+        .values_list(*columns)
+    )
+    names = ['computer_id', 'fingerprint'] + list(fields)
+    return {asset_code: dict(zip(names, values)) for asset_code, *values in rows}
+
+
+def _lock_asset_codes(asset_codes):
+    """
+    PostgreSQL 上按资产编码加事务级 advisory lock
+
+    SELECT ... FOR UPDATE 只能锁住已有的当前状态行：同一台计算机的首次提交并发到达时，
+    两个事务都看不到上一次状态，筛选项和分布会各 +1 一次。advisory lock 对还不存在的行同样有效，
+    等待的事务拿到锁后再读取，就能看到先提交的那条记录。按哈希值的顺序加锁，不同批次之间不会死锁。
+    SQLite 同一时刻只有一个写事务，不需要加锁。
+    """
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT pg_advisory_xact_lock(h) FROM '
+            '(SELECT DISTINCT hashtext(code) AS h FROM unnest(%s::text[]) AS code ORDER BY h) AS locks',
+            [sorted(asset_codes)],
+        )
+
+
+def update_current_state(computers):
+    """
+    把新写入的记录设为对应 asset_code 的当前状态
+
+    需要在写入 computers 的同一个事务内调用。同一批里有多条相同 asset_code
+    的记录时，以最后一条为准（与写入顺序一致）。
+    """
+    latest = {}
+    for computer in computers:
+        latest[computer.asset_code] = computer
+    if not latest:
+        return
+    CurrentComputer.objects.bulk_create(
+        [
+            CurrentComputer(
+                asset_code=asset_code, computer=computer, upload_time=computer.upload_time,
+                fingerprint=computer.fingerprint, last_seen=computer.upload_time, seen_count=1,
+            )
+            for asset_code, computer in latest.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['asset_code'],
+        update_fields=['computer', 'upload_time', 'fingerprint', 'last_seen', 'seen_count'],
+    )
+
+
+def record_heartbeats(seen):
+    """
+    记录没有变化的提交：只更新当前状态的最后上报时间和上报次数
+
+    seen 为 [(asset_code, 上报时间), ...]，需要在入库事务内调用。
+    """
+    last_seen = {}
+    counts = Counter()
+    for asset_code, seen_at in seen:
+        last_seen[asset_code] = max(seen_at, last_seen.get(asset_code, seen_at))
+        counts[asset_code] += 1
+    for asset_code in sorted(last_seen):
+        CurrentComputer.objects.filter(asset_code=asset_code).update(
+            last_seen=last_seen[asset_code], seen_count=F('seen_count') + counts[asset_code],
+        )
+
+
+def rebuild_current_state(batch_size=1000):
+    """
+    根据历史记录重建当前状态表
+
+    每个 asset_code 取 id 最大（即最后写入）的记录，返回计算机台数。
+    """
+    latest_ids = (
+        Computer.objects.order_by()
+        .values('asset_code')
+        .annotate(latest_id=Max('id'))
+        .values_list('latest_id', flat=True)
+    )
+    with transaction.atomic():
+        CurrentComputer.objects.all().delete()
+        total = 0
+        chunk = []
+        for latest_id in latest_ids.iterator(chunk_size=batch_size):
+            chunk.append(latest_id)
+            if len(chunk) >= batch_size:
+                total += _insert_current(chunk)
+                chunk = []
+        if chunk:
+            total += _insert_current(chunk)
+        # scope=current 的列表和详情接口的 ETag 基于数据版本
+        data_version.touch()
+    return total
+
+
+def _insert_current(computer_ids):
+    rows = Computer.objects.filter(id__in=computer_ids).values_list('id', 'asset_code', 'upload_time', 'fingerprint')
+    CurrentComputer.objects.bulk_create([
+        CurrentComputer(
+            asset_code=asset_code, computer_id=pk, upload_time=upload_time,
+            fingerprint=fingerprint, last_seen=upload_time,
+        )
+        for pk, asset_code, upload_time, fingerprint in rows
+    ])
+    return len(computer_ids)
@@ -0,0 +1,72 @@
+"""
+计算机记录的数据版本：读接口 ETag 和响应缓存的依据（见 api.caching）
+
+- 写入新记录：Computer 的最大 id 变化；PostgreSQL 上入库事务提交后还调用 bump()，
+  序列 computers_data_version_seq 加一
+- 修改记录（后台编辑、删除过期日志）：Computer 的最大 last_update 变化
+- 删除记录（compact_history、分区卸载、后台删除）以及重建当前状态、筛选项计数、变化事件和汇总：
+  这些操作调用 touch()，更新 MaintenanceState 中名为 data_version 的一行
+
+PostgreSQL 上并发的入库事务不按 id 顺序提交：id 较小的记录晚提交时最大 id 不变，
+只看最大 id 会把缺少这条记录的缓存当成最新的。每个入库事务提交后都会递增序列，不存在这个问题；
+序列不受事务控制，没有行锁，不会成为并发入库的热点。SQLite 同一时刻只有一个写事务，最大 id 本身是单调的。
+
+各项都通过索引或序列读取，在一条 SQL 中完成，代价与记录总数无关。
+"""
+from datetime import timezone as dt_timezone
+
+from django.db import connection
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Computer, MaintenanceState
+
+STATE_NAME = 'data_version'
+# 迁移 0020 创建（仅 PostgreSQL）
+SEQUENCE_NAME = 'computers_data_version_seq'
+
+
+def bump():
+    """入库事务提交后调用（transaction.on_commit），使基于数据版本的 ETag 和缓存失效"""
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT nextval(%s)', [SEQUENCE_NAME])
+
+
+def touch():
+    """记录被删除或派生表被重建后调用，使所有基于数据版本的 ETag 和缓存失效"""
+    MaintenanceState.objects.update_or_create(name=STATE_NAME, defaults={'state': {}})
+
+
+def _to_datetime(value):
+    # SQLite 的原始查询返回字符串或不带时区的时间（UTC）
+    if isinstance(value, str):
+        value = parse_datetime(value)
+    if value is not None and timezone.is_naive(value):
+        value = timezone.make_aware(value, dt_timezone.utc)
+    return value
+
+
+def current_version():
+    """
+    返回版本标识
+
+    版本标识是字符串，数据有任何变化时都会改变。
+    """
+    computers = connection.ops.quote_name(Computer._meta.db_table)
+    states = connection.ops.quote_name(MaintenanceState._meta.db_table)
+    sequence = f'(SELECT last_value FROM {SEQUENCE_NAME})' if connection.vendor == 'postgresql' else '0'
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT {sequence}, (SELECT MAX(id) FROM {computers}), (SELECT MAX(last_update) FROM {computers}), '
+            f'(SELECT updated_at FROM {states} WHERE name = %s)',
+            [STATE_NAME],
+        )
+        ingested, max_id, last_update, touched = cursor.fetchone()
+    last_update, touched = _to_datetime(last_update), _to_datetime(touched)
+    tag = (
+        f'{ingested}:{max_id}:{last_update.isoformat() if last_update else ""}:'
+        f'{touched.isoformat() if touched else ""}'
+    )
+    return tag
@@ -0,0 +1,140 @@
+"""
+筛选项计数（FacetCount）的维护
+
+入库时增量更新（见 computers.ingest）：
+- history 范围：每条新记录在各维度的取值 +1
+- current 范围：新的当前记录的取值 +1，被它替换掉的旧当前记录的取值 -1
+
+变化量在入库事务内计算，提交之后才单独写入：计数行是每次入库都要更新的热点行，
+在入库事务内更新会让并发入库在这些行锁上排队，直到对方的事务整个提交。
+进程恰好在两者之间退出时这一批不会计入；计数出现偏差时（例如直接改过数据库）
+可以用 recompute_facets 命令重新统计。
+"""
+from collections import Counter
+from functools import partial
+
+from django.db import connection, transaction
+from django.db.models import Count
+
+from . import data_version
+from .models import Computer, FacetCount
+
+# 维护计数的筛选维度（均为 Computer 的字段）
+FACET_DIMENSIONS = ('device_type', 'has_errors', 'os_version', 'model')
+
+
+def facet_value(dimension, value):
+    """把字段值转换为 FacetCount.value 中保存的字符串"""
+    if dimension == 'has_errors':
+        return 'true' if value else 'false'
+    return value or ''
+
+
+def _values_of(computer):
+    return [(dimension, facet_value(dimension, getattr(computer, dimension))) for dimension in FACET_DIMENSIONS]
+
+
+def update_facets(computers, previous_state):
+    """
+    根据新写入的记录更新筛选项计数
+
+    previous_state 为 current_state.lock_current_state(..., FACET_DIMENSIONS) 的返回值，
+    即将被替换的旧当前记录的取值从中读取（锁保证并发提交同一台计算机时不会重复计数）。
+    在入库事务内调用，计数在事务提交后写入，回滚时不写入。
+    """
+    deltas = Counter()
+    latest = {}
+    for computer in computers:
+        latest[computer.asset_code] = computer
+        for dimension, value in _values_of(computer):
+            deltas[(FacetCount.SCOPE_HISTORY, dimension, value)] += 1
+
+    for asset_code, computer in latest.items():
+        for dimension, value in _values_of(computer):
+            deltas[(FacetCount.SCOPE_CURRENT, dimension, value)] += 1
+        previous = previous_state.get(asset_code)
+        if previous is None:
+            continue
+        for dimension in FACET_DIMENSIONS:
+            deltas[(FacetCount.SCOPE_CURRENT, dimension, facet_value(dimension, previous[dimension]))] -= 1
+
+    # 提交后执行，自动提交模式下一条 SQL 即一个短事务；写入失败只记录日志，不影响已提交的记录
+    transaction.on_commit(partial(_apply_deltas, deltas), robust=True)
+
+
+def remove_history(rows):
+    """
+    删除历史记录后扣减 history 范围的计数
+
+    rows 为被删除记录的 {维度: 字段值} 列表，需要与删除在同一个事务内调用。
+    只能删除非当前记录，current 范围的计数不受影响。
+    """
+    counts = Counter()
+    for row in rows:
+        for dimension in FACET_DIMENSIONS:
+            counts[(dimension, facet_value(dimension, row[dimension]))] += 1
+    remove_history_counts(counts)
+
+
+def remove_history_counts(counts):
+    """history 范围按 {(维度, 取值): 记录数} 扣减计数"""
+    _apply_deltas(Counter({
+        (FacetCount.SCOPE_HISTORY, dimension, value): -n for (dimension, value), n in counts.items()
+    }))
+
+
+def _apply_deltas(deltas):
+    # 按固定顺序更新，避免并发事务互相等待对方持有的计数行锁
+    rows = sorted(key + (delta,) for key, delta in deltas.items() if delta)
+    if not rows:
+        return
+    table = connection.ops.quote_name(FacetCount._meta.db_table)
+    placeholders = ', '.join(['(%s, %s, %s, %s)'] * len(rows))
+    sql = (
+        f'INSERT INTO {table} (scope, dimension, value, count) VALUES {placeholders} '
+        f'ON CONFLICT (scope, dimension, value) DO UPDATE SET count = {table}.count + EXCLUDED.count'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [param for row in rows for param in row])
+
+
+def get_facets(scope=FacetCount.SCOPE_HISTORY):
+    """
+    读取某个范围的筛选项计数
+
+    返回 {维度: [(取值, 记录数), ...]}，只包含记录数大于 0 的取值，按取值排序。
+    """
+    facets = {dimension: [] for dimension in FACET_DIMENSIONS}
+    rows = (
+        FacetCount.objects.filter(scope=scope, count__gt=0)
+        .order_by('dimension', 'value')
+        .values_list('dimension', 'value', 'count')
+    )
+    for dimension, value, count in rows:
+        if dimension in facets:
+            facets[dimension].append((value, count))
+    return facets
+
+
+def recompute_facets():
+    """根据 Computer 和 CurrentComputer 重新统计全部筛选项计数，返回写入的行数"""
+    querysets = {
+        FacetCount.SCOPE_HISTORY: Computer.objects.all(),
+        FacetCount.SCOPE_CURRENT: Computer.objects.filter(current_state__isnull=False),
+    }
+    facet_counts = []
+    with transaction.atomic():
+        for scope, queryset in querysets.items():
+            for dimension in FACET_DIMENSIONS:
+                rows = queryset.order_by().values(dimension).annotate(n=Count('id')).values_list(dimension, 'n')
+                counts = Counter()
+                for value, n in rows:
+                    counts[facet_value(dimension, value)] += n
+                facet_counts.extend(
+                    FacetCount(scope=scope, dimension=dimension, value=value, count=n)
+                    for value, n in counts.items()
+                )
+        FacetCount.objects.all().delete()
+        FacetCount.objects.bulk_create(facet_counts)
+        data_version.touch()
+    return len(facet_counts)
@@ -0,0 +1,112 @@
+"""
+计算机列表的筛选条件
+
+列表页（computers.views.computer_list）和导出接口（api.views.export_computers）
+共用同一套查询参数，保证“看到的”和“导出的”是同一批记录。
+变化事件接口（api.views.change_events_api）的筛选条件也在这里。
+"""
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .changes import CHANGE_FIELDS
+from .models import ChangeEvent
+from .search import search_filter
+
+
+def _parse_day(value):
+    """解析 YYYY-MM-DD，返回当天零点（当前时区）；格式错误时返回 None"""
+    try:
+        day = parse_date(value or '')
+    except ValueError:
+        return None
+    return timezone.make_aware(datetime.combine(day, time.min)) if day else None
+
+
+def _filter_days(queryset, field, start, end):
+    """按日期范围（YYYY-MM-DD，包含两端）筛选 field，格式错误的一端忽略"""
+    start = _parse_day(start)
+    if start:
+        queryset = queryset.filter(**{f'{field}__gte': start})
+    end = _parse_day(end)
+    if end:
+        queryset = queryset.filter(**{f'{field}__lt': end + timedelta(days=1)})
+    return queryset
+
+
+def filter_computers(queryset, params):
+    """
+    按查询参数筛选计算机记录
+
+    支持的参数：
+    - search: 在资产编码、用户名、计算机名、型号、SN码中模糊搜索
+    - device_type / os_version / model: 设备类型、操作系统版本、型号精确匹配
+    - has_errors: 'true' / 'false'
+    - scope: 'current' 时只返回每台计算机的最新记录（基于 CurrentComputer），
+      默认返回全部历史记录
+    - upload_from / upload_to: 上传日期范围（YYYY-MM-DD，包含两端），格式错误时忽略；
+      Computer 表分区后只扫描范围内的分区
+    - changed_field: 只返回与上一条记录相比该字段有变化的记录（取值见 CHANGE_FIELDS，其他值忽略），
+      由变化事件表的 (field, changed_at) 索引完成
+    """
+    # 记录范围：当前状态只需与 CurrentComputer 连接，代价与计算机台数相关
+    if params.get('scope') == 'current':
+        queryset = queryset.filter(current_state__isnull=False)
+    
+    # 搜索功能（PostgreSQL 上由 pg_trgm 索引加速，见 computers.search）
+    search_query = params.get('search', '')
+    if search_query:
+        queryset = queryset.filter(search_filter(search_query))
+    
+    # 设备类型筛选
+    device_type = params.get('device_type')
+    if device_type:
+        queryset = queryset.filter(device_type=device_type)
+    
+    # 操作系统版本、型号筛选（取值来自筛选项计数，见 computers.facets）
+    os_version = params.get('os_version')
+    if os_version:
+        queryset = queryset.filter(os_version=os_version)
+    model = params.get('model')
+    if model:
+        queryset = queryset.filter(model=model)
+    
+    # 上传日期范围：upload_to 当天的记录也包含在内
+    queryset = _filter_days(queryset, 'upload_time', params.get('upload_from'), params.get('upload_to'))
+    
+    # 字段变化：变化时间就是记录的上传时间，日期范围同时作用于变化事件，缩小子查询
+    changed_field = params.get('changed_field')
+    if changed_field in CHANGE_FIELDS:
+        changes = _filter_days(
+            ChangeEvent.objects.filter(field=changed_field), 'changed_at',
+            params.get('upload_from'), params.get('upload_to'),
+        )
+        queryset = queryset.filter(id__in=changes.values('computer_id'))
+    
+    # 错误状态筛选
+    has_errors = params.get('has_errors')
+    if has_errors == 'true':
+        queryset = queryset.filter(has_errors=True)
+    elif has_errors == 'false':
+        queryset = queryset.filter(has_errors=False)
+    
+    return queryset
+
+
+def filter_changes(queryset, params):
+    """
+    按查询参数筛选变化事件
+
+    支持的参数：
+    - field: 逗号分隔的字段名（调用方负责校验取值）
+    - asset_code: 资产编码精确匹配
+    - changed_from / changed_to: 变化日期范围（YYYY-MM-DD，包含两端），格式错误时忽略
+    """
+    fields = [field.strip() for field in params.get('field', '').split(',') if field.strip()]
+    if fields:
+        queryset = queryset.filter(field__in=fields)
+    asset_code = params.get('asset_code')
+    if asset_code:
+        queryset = queryset.filter(asset_code=asset_code)
+    return _filter_days(queryset, 'changed_at', params.get('changed_from'), params.get('changed_to'))
@@ -0,0 +1,130 @@
+"""
+健康检查（/health/live/、/health/ready/，以及兼容旧版本的 /health/）
+
+- 存活检查（liveness）：进程能处理请求即可，不访问数据库和其他依赖
+- 就绪检查（readiness）：数据库连接、迁移是否全部执行、日志等目录是否可写，
+  HEALTH_CHECK_LDAP=True 时还检查能否连接 LDAP 服务器
+
+就绪检查的结果在每个进程内缓存 HEALTH_CHECK_TTL 秒，同一时刻只有一个线程执行检查，
+其他同时到达的探测直接返回上一次的结果，探测频率再高也不会占用更多数据库连接。
+迁移检查需要加载全部迁移文件，通过一次后不再重复（新的迁移需要重新部署，进程会重启）。
+"""
+import logging
+import os
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_result = None
+_migrated = False
+
+
+def check_database():
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+
+
+def check_migrations():
+    global _migrated
+    if _migrated:
+        return
+    executor = MigrationExecutor(connection)
+    plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+    if plan:
+        raise RuntimeError(f'有 {len(plan)} 个迁移未执行')
+    _migrated = True
+
+
+def writable_dirs():
+    """需要写入的目录：日志文件、运行指标，spool 模式下还有入库暂存目录"""
+    dirs = {settings.METRICS_DIR}
+    for name in settings.LOG_HANDLERS:
+        filename = settings.LOGGING['handlers'].get(name, {}).get('filename')
+        if filename:
+            dirs.add(os.path.dirname(os.path.abspath(filename)))
+    if settings.INGEST_MODE == 'spool':
+        dirs.add(settings.INGEST_SPOOL_DIR)
+    return sorted(dirs)
+
+
+def check_directories():
+    failed = []
+    for path in writable_dirs():
+        try:
+            # 与写日志、写指标时一样，目录不存在时先创建
+            os.makedirs(path, exist_ok=True)
+        except OSError:
+            pass
+        if not os.access(path, os.W_OK):
+            failed.append(path)
+    if failed:
+        raise RuntimeError('目录不可写: ' + ', '.join(failed))
+
+
+def check_ldap():
+    """能否与 LDAP 服务器建立 TCP 连接（配置了多个地址时任意一个可用即可）"""
+    errors = []
+    for uri in settings.AUTH_LDAP_SERVER_URI.split():
+        parts = urlsplit(uri)
+        port = parts.port or (636 if parts.scheme == 'ldaps' else 389)
+        try:
+            socket.create_connection((parts.hostname, port), timeout=settings.LDAP_CONNECT_TIMEOUT).close()
+            return
+        except OSError as e:
+            errors.append(f'{parts.hostname}:{port} {e}')
+    raise RuntimeError('; '.join(errors))
+
+
+def _checks():
+    checks = [('database', check_database), ('migrations', check_migrations), ('directories', check_directories)]
+    if settings.HEALTH_CHECK_LDAP:
+        checks.append(('ldap', check_ldap))
+    return checks
+
+
+def _run_checks():
+    results = {}
+    for name, check in _checks():
+        if name == 'migrations' and not results['database']['ok']:
+            results[name] = {'ok': False, 'error': '数据库不可用，未检查'}
+            continue
+        started = time.perf_counter()
+        try:
+            check()
+        except Exception as e:
+            logger.warning('就绪检查失败: %s: %s', name, e)
+            results[name] = {'ok': False, 'error': str(e)}
+        else:
+            results[name] = {'ok': True}
+        results[name]['duration_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    return {
+        'status': 'ready' if all(result['ok'] for result in results.values()) else 'not_ready',
+        'checked_at': timezone.now().isoformat(),
+        'checks': results,
+    }, time.monotonic()
+
+
+def readiness():
+    """返回就绪检查结果（字典），结果缓存 HEALTH_CHECK_TTL 秒"""
+    global _result
+    result = _result
+    if result is not None and time.monotonic() - result[1] < settings.HEALTH_CHECK_TTL:
+        return result[0]
+    # 已有结果时不等待正在执行的检查，直接返回上一次的结果
+    if not _lock.acquire(blocking=result is None):
+        return result[0]
+    try:
+        if _result is result:
+            _result = _run_checks()
+        return _result[0]
+    finally:
+        _lock.release()
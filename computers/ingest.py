@@ -0,0 +1,147 @@
+"""
+计算机信息入库
+
+单条提交（create_computer）和批量提交（create_computers_batch）都经过这里写入，
+保证两条路径的入库规则一致。
+"""
+import copy
+import hashlib
+import json
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import data_version
+from .changes import CHANGE_FIELDS, record_changes
+from .current_state import lock_current_state, record_heartbeats, update_current_state
+from .facets import FACET_DIMENSIONS, update_facets
+from .logstore import prepare_computer_logs, save_computer_logs
+from .models import Computer
+from .rollups import ROLLUP_FIELDS, update_rollups
+
+# 参与快照指纹计算的字段：这些字段都没有变化时，认为这次提交与上一次相同
+# 修改后已有记录的指纹不再匹配，需要新增数据迁移重新计算（参考迁移 0012）
+FINGERPRINT_FIELDS = (
+    'sn_code', 'model', 'device_type', 'cpu_model', 'memory_size',
+    'os_version', 'os_internal_version', 'user_name', 'computer_name', 'has_errors',
+)
+
+
+def fingerprint_values(values):
+    """按 FINGERPRINT_FIELDS 顺序排列的字段值计算快照指纹（SHA-256）"""
+    return hashlib.sha256(
+        json.dumps(list(values), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    ).hexdigest()
+
+
+def snapshot_fingerprint(computer):
+    """计算记录的快照指纹"""
+    return fingerprint_values(getattr(computer, field) for field in FINGERPRINT_FIELDS)
+
+
+def build_computer(validated_data):
+    """根据校验后的数据构造（未保存的）Computer 实例"""
+    data = dict(validated_data)
+    # 如果有错误日志，自动设置has_errors为True
+    if data.get('error_log'):
+        data['has_errors'] = True
+    computer = Computer(**data)
+    computer.fingerprint = snapshot_fingerprint(computer)
+    return computer
+
+
+def _split_unchanged(computers, previous_state):
+    """
+    找出与该计算机上一次状态相同的记录，返回 (需要写入的记录, 未变化记录的下标)
+
+    比较对象是当前状态表中的指纹，或同一批中该资产编码前一条记录的指纹。
+    带错误日志的记录总是写入，保证每次出错都留有记录。
+    """
+    if not settings.INGEST_DEDUP_ENABLED:
+        return computers, []
+    fingerprints = {asset_code: state['fingerprint'] for asset_code, state in previous_state.items()}
+    changed = []
+    unchanged = []
+    for index, computer in enumerate(computers):
+        if not computer.has_errors and fingerprints.get(computer.asset_code) == computer.fingerprint:
+            unchanged.append(index)
+            continue
+        fingerprints[computer.asset_code] = computer.fingerprint
+        changed.append(computer)
+    return changed, unchanged
+
+
+def save_records(records, batch_size=None, received_at=None):
+    """
+    在同一个事务内批量写入记录
+
+    records 为 ComputerCreateSerializer 校验后的 validated_data 列表，
+    有变化的提交创建新记录（历史记录），按 batch_size 分块 INSERT，
+    日志正文写入 ComputerLog 侧表（执行日志按内容去重压缩存入 LogBlob），
+    并在同一事务内更新计算机当前状态表，生成与上一条记录相比的字段变化事件；
+    筛选项计数和每日分布汇总的变化量在事务提交后写入。
+    与上一次状态相同（快照指纹一致）的提交不写入新记录，只更新当前状态的
+    last_seen 和 seen_count（INGEST_DEDUP_ENABLED=False 时关闭）。
+    received_at 为与 records 一一对应的接收时间（暂存区延后入库时使用），
+    指定时用作 upload_time / last_seen，否则为写入时间。
+    返回 Computer 实例列表，顺序与 records 一致；未变化的提交返回该计算机
+    已有的最新记录，其 deduplicated 属性为 True。
+    """
+    computers = [build_computer(record) for record in records]
+    if not computers:
+        return computers
+    batch_size = batch_size or settings.INGEST_BATCH_SIZE
+    now = timezone.now()
+    seen_at = list(received_at) if received_at else [now] * len(computers)
+    with transaction.atomic():
+        previous_state = lock_current_state(
+            {computer.asset_code for computer in computers},
+            sorted(set(FACET_DIMENSIONS) | set(CHANGE_FIELDS) | set(ROLLUP_FIELDS)),
+        )
+        changed, unchanged = _split_unchanged(computers, previous_state)
+        if changed:
+            blobs = prepare_computer_logs(changed)
+            Computer.objects.bulk_create(changed, batch_size=batch_size)
+            if received_at:
+                # upload_time 是 auto_now_add 字段，INSERT 时总会被设为当前时间，只能写入后再改
+                for computer, upload_time in zip(computers, received_at):
+                    computer.upload_time = upload_time
+                Computer.objects.bulk_update(changed, ['upload_time'], batch_size=batch_size)
+            save_computer_logs(changed, blobs, batch_size=batch_size)
+            record_changes(changed, previous_state, batch_size=batch_size)
+            update_current_state(changed)
+            update_facets(changed, previous_state)
+            update_rollups(changed, previous_state)
+            transaction.on_commit(data_version.bump, robust=True)
+        if unchanged:
+            # 同一批中之后又有变化的计算机，之前的未变化提交已被新记录取代，不再计入
+            last_changed = {computer.asset_code: index for index, computer in enumerate(computers) if computer.pk}
+            record_heartbeats([
+                (computers[index].asset_code, seen_at[index])
+                for index in unchanged if index > last_changed.get(computers[index].asset_code, -1)
+            ])
+    if unchanged:
+        _resolve_unchanged(computers, unchanged, previous_state)
+    return computers
+
+
+def _resolve_unchanged(computers, unchanged, previous_state):
+    """把未变化的提交替换为提交时该计算机的最新记录（同一批中之前写入的记录，或已有的当前记录）"""
+    unchanged = set(unchanged)
+    existing_ids = {
+        previous_state[computers[index].asset_code]['computer_id']
+        for index in unchanged if computers[index].asset_code in previous_state
+    }
+    existing = Computer.objects.in_bulk(existing_ids)
+    latest = {}
+    for index, computer in enumerate(computers):
+        if index not in unchanged:
+            latest[computer.asset_code] = computer
+            continue
+        asset_code = computer.asset_code
+        computer = copy.copy(
+            latest.get(asset_code) or existing[previous_state[asset_code]['computer_id']]
+        )
+        computer.deduplicated = True
+        computers[index] = computer
@@ -0,0 +1,345 @@
+"""
+带连接池和缓存的 LDAP 认证后端（替代 django_auth_ldap.backend.LDAPBackend）
+
+默认的 LDAPBackend 每次登录都新建一条到 AD 的连接，用服务账号绑定、搜索用户，
+再用用户的 DN 和密码绑定；AUTH_LDAP_ALWAYS_UPDATE_USER = True 时每次都会保存用户。
+早上集中登录时，这些往返都压在 AD 上，AD 响应慢时登录请求会一直挂住。这里做了四件事：
+- 连接池：每个进程保留最多 LDAP_POOL_SIZE 条空闲连接，登录时复用，
+  已经以服务账号绑定的连接不再重复绑定；空闲超过 LDAP_POOL_MAX_IDLE 秒或出错的连接直接丢弃
+- 超时：连接超时 LDAP_CONNECT_TIMEOUT，每次绑定 / 搜索最多等待 LDAP_TIMEOUT 秒
+- 缓存：用户的 DN 和映射用到的属性一起缓存 AUTH_LDAP_CACHE_TIMEOUT 秒，
+  缓存命中时一次登录只需要一次用户绑定；用缓存的 DN 绑定失败时重新搜索一次（用户可能被移动到其他 OU）
+- 同步用户属性时只保存有变化的字段，没有变化就不写数据库（get_or_build_user 和 populate_user 信号）
+
+覆盖了 django_auth_ldap 的私有类 _LDAPUser 的部分方法，依赖其方法签名和内部属性，
+requirements.txt 中固定了验证过的版本范围；升级前运行 computers.tests 中的兼容性检查。
+
+只改变连接的获取方式和保存策略，认证结果与 LDAPBackend 相同（每次登录都会用密码绑定校验）。
+"""
+import logging
+import threading
+import time
+
+import ldap
+from django.conf import settings
+from django.core.cache import cache
+from django_auth_ldap.backend import LDAPBackend, _LDAPUser, _report_error, populate_user, valid_cache_key
+
+logger = logging.getLogger(__name__)
+
+# 说明连接本身已不可用（而不是查询结果错误）的异常，复用的连接遇到这些异常时换一条新连接重试一次
+STALE_ERRORS = (ldap.SERVER_DOWN, ldap.CONNECT_ERROR)
+
+
+class PooledConnection:
+    """LDAPObject 的包装：记录当前绑定的 DN，调用出错时标记为不可复用"""
+
+    def __init__(self, connection, uri):
+        self._connection = connection
+        self.uri = uri
+        self.bound_dn = None
+        self.broken = False
+        self.reused = False
+        self.idle_since = None
+
+    def simple_bind_s(self, who=None, cred=None, *args, **kwargs):
+        self.bound_dn = None
+        result = self._call(self._connection.simple_bind_s, who, cred, *args, **kwargs)
+        self.bound_dn = who
+        return result
+
+    def _call(self, method, *args, **kwargs):
+        try:
+            return method(*args, **kwargs)
+        except ldap.INVALID_CREDENTIALS:
+            # 密码错误不影响连接本身，但绑定状态已经变成匿名
+            raise
+        except ldap.LDAPError:
+            self.broken = True
+            raise
+
+    def __getattr__(self, name):
+        attr = getattr(self._connection, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            return self._call(attr, *args, **kwargs)
+
+        return call
+
+    def close(self):
+        try:
+            self._connection.unbind_s()
+        except ldap.LDAPError:
+            pass
+
+
+class ConnectionPool:
+    """按服务器地址保存空闲连接，线程安全；只限制空闲连接数，不限制同时使用的连接数"""
+
+    def __init__(self, size, max_idle):
+        self.size = size
+        self.max_idle = max_idle
+        self._idle = {}
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, uri):
+        """取一条空闲连接，没有可用的连接时返回 None"""
+        now = time.monotonic()
+        expired = []
+        connection = None
+        with self._lock:
+            idle = self._idle.get(uri, [])
+            while idle:
+                candidate = idle.pop()
+                if now - candidate.idle_since > self.max_idle:
+                    expired.append(candidate)
+                    continue
+                connection = candidate
+                self.reused += 1
+                break
+        for candidate in expired:
+            candidate.close()
+        if connection is not None:
+            connection.reused = True
+        return connection
+
+    def created_connection(self):
+        with self._lock:
+            self.created += 1
+
+    def release(self, connection):
+        """归还连接；出错的连接和超出空闲上限的连接直接关闭"""
+        if not connection.broken:
+            connection.idle_since = time.monotonic()
+            with self._lock:
+                idle = self._idle.setdefault(connection.uri, [])
+                if len(idle) < self.size:
+                    idle.append(connection)
+                    return
+        connection.close()
+
+    def clear(self):
+        with self._lock:
+            connections = [connection for idle in self._idle.values() for connection in idle]
+            self._idle.clear()
+        for connection in connections:
+            connection.close()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'created': self.created,
+                'reused': self.reused,
+                'idle': sum(len(idle) for idle in self._idle.values()),
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(settings.LDAP_POOL_SIZE, settings.LDAP_POOL_MAX_IDLE)
+    return _pool
+
+
+class _PooledLDAPUser(_LDAPUser):
+    """从连接池取连接、缓存 DN 和属性的 _LDAPUser"""
+
+    _dn_from_cache = False
+
+    def authenticate(self, password):
+        try:
+            return super().authenticate(password)
+        finally:
+            self._release_connection()
+
+    def populate_user(self):
+        try:
+            return super().populate_user()
+        finally:
+            self._release_connection()
+
+    def get_group_permissions(self):
+        try:
+            return super().get_group_permissions()
+        finally:
+            self._release_connection()
+
+    # 连接
+
+    def _server_uri(self):
+        uri = self.settings.SERVER_URI
+        return uri(self._request) if callable(uri) else uri
+
+    def _get_connection(self):
+        if self._connection is None:
+            pool = get_pool()
+            uri = self._server_uri()
+            connection = pool.acquire(uri)
+            if connection is None:
+                raw = super()._get_connection()
+                # 同步调用（绑定、搜索）的超时，-1 表示不限
+                raw.timeout = settings.LDAP_TIMEOUT
+                connection = PooledConnection(raw, uri)
+                pool.created_connection()
+            self._connection = connection
+        return self._connection
+
+    def _release_connection(self):
+        if self._connection is not None:
+            get_pool().release(self._connection)
+            self._connection = None
+            self._connection_bound = False
+
+    def _bind(self):
+        connection = self._get_connection()
+        if connection.bound_dn is not None and connection.bound_dn == self.settings.BIND_DN:
+            self._connection_bound = True
+            return
+        super()._bind()
+
+    def _discard_stale_connections(self):
+        """池中的连接可能已被 AD 或防火墙断开（例如 AD 重启），丢弃全部空闲连接"""
+        logger.debug('LDAP 连接已失效，重新连接 %s', self._connection.uri)
+        self._release_connection()
+        get_pool().clear()
+
+    def _bind_as(self, bind_dn, bind_password, sticky=False):
+        try:
+            super()._bind_as(bind_dn, bind_password, sticky=sticky)
+        except STALE_ERRORS:
+            if self._connection is None or not self._connection.reused:
+                raise
+            self._discard_stale_connections()
+            super()._bind_as(bind_dn, bind_password, sticky=sticky)
+
+    def _execute_user_search(self):
+        search = self.settings.USER_SEARCH
+        try:
+            return search.execute(self.connection, {'user': self._username})
+        except STALE_ERRORS:
+            # 已经以服务账号绑定的连接不再绑定，搜索就是复用后的第一次请求
+            if self._connection is None or not self._connection.reused:
+                raise
+            self._discard_stale_connections()
+            return search.execute(self.connection, {'user': self._username})
+
+    # DN 和属性缓存
+
+    def _user_cache_key(self):
+        return valid_cache_key(f'pc_info_record.ldap_user.{self._username.lower()}')
+
+    def _search_for_user_dn(self):
+        timeout = self.settings.CACHE_TIMEOUT
+        if timeout > 0 and not self._dn_from_cache:
+            cached = cache.get(self._user_cache_key())
+            if cached is not None:
+                self._dn_from_cache = True
+                user_dn, self._user_attrs = cached
+                return user_dn
+
+        self._dn_from_cache = False
+        self._user_attrs = None
+        # 不使用 django_auth_ldap 自己的 DN 缓存（只缓存 DN，登录时还要再搜索一次属性）
+        user_dn = None
+        try:
+            results = self._execute_user_search()
+        except ldap.LDAPError as e:
+            _report_error(type(self.backend), 'search_for_user_dn', self._user, self._request, e)
+        else:
+            if results is not None and len(results) == 1:
+                user_dn, self._user_attrs = results[0]
+        if user_dn is not None and timeout > 0:
+            cache.set(self._user_cache_key(), (user_dn, self._cached_attrs()), timeout)
+        return user_dn
+
+    def _cached_attrs(self):
+        """只缓存属性映射用到的属性（AD 返回的属性里可能有 thumbnailPhoto 等较大的二进制值）"""
+        wanted = {attr.lower() for attr in self.settings.USER_ATTR_MAP.values()}
+        return {name: values for name, values in self._user_attrs.items() if name.lower() in wanted}
+
+    def _authenticate_user_dn(self, password):
+        try:
+            super()._authenticate_user_dn(password)
+        except self.AuthenticationFailed:
+            if not self._dn_from_cache:
+                raise
+            # 缓存的 DN 可能已经过期（用户被移动或改名），重新搜索；DN 没变时不再重试，以免多计一次密码错误
+            cached_dn = self._user_dn
+            cache.delete(self._user_cache_key())
+            self._user_dn = self._search_for_user_dn()
+            if self._user_dn is None or self._user_dn == cached_dn:
+                raise
+            super()._authenticate_user_dn(password)
+
+
+class PooledLDAPBackend(LDAPBackend):
+    """使用连接池和缓存的 LDAP 认证后端，配置项与 LDAPBackend 相同（AUTH_LDAP_*）"""
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        username = kwargs.get(self.get_user_model().USERNAME_FIELD, username)
+        if username is None:
+            return None
+
+        if password or self.settings.PERMIT_EMPTY_PASSWORD:
+            ldap_user = _PooledLDAPUser(self, username=username.strip(), request=request)
+            return self.authenticate_ldap_user(ldap_user, password)
+        logger.debug('Rejecting empty password for %s', username)
+        return None
+
+    def populate_user(self, username):
+        return _PooledLDAPUser(self, username=username).populate_user()
+
+    def get_or_build_user(self, username, ldap_user):
+        user, built = super().get_or_build_user(username, ldap_user)
+        if not built:
+            # 同步 LDAP 属性之前的字段值，保存时据此找出有变化的字段（见 save_changed_fields）
+            user._ldap_field_values = _field_values(user)
+        return user, built
+
+
+def _field_values(user):
+    return {field.attname: getattr(user, field.attname) for field in user._meta.concrete_fields}
+
+
+def save_changed_fields(sender, user, ldap_user, **kwargs):
+    """
+    populate_user 信号：已有用户接下来的一次 save() 只保存有变化的字段
+
+    django_auth_ldap 同步属性后总是调用不带参数的 user.save()，把所有字段写回数据库。
+    这里把这一次调用改为 save(update_fields=有变化的字段)，没有变化时 Django 不执行 UPDATE。
+    有变化的字段在保存时才比较，之后连接的 populate_user 信号处理函数修改的字段也会保存。
+    """
+    before = user.__dict__.pop('_ldap_field_values', None)
+    if before is None:
+        # 新建的用户需要完整保存
+        return
+
+    def save(*args, **kwargs):
+        # 只替换这一次调用，之后（例如登录时更新 last_login）恢复为 Model.save
+        del user.save
+        if 'update_fields' not in kwargs:
+            after = _field_values(user)
+            kwargs['update_fields'] = [
+                field.name for field in user._meta.concrete_fields
+                if after[field.attname] != before[field.attname]
+            ]
+            if kwargs['update_fields']:
+                logger.debug('Updating Django user %s: %s', user.get_username(), ', '.join(kwargs['update_fields']))
+        return type(user).save(user, *args, **kwargs)
+
+    user.save = save
+
+
+populate_user.connect(
+    save_changed_fields, sender=PooledLDAPBackend, dispatch_uid='computers.ldap_backend.save_changed_fields',
+)
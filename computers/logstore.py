@@ -0,0 +1,139 @@
+"""
+执行日志的内容寻址存储
+
+日志正文保存在与 Computer 一对一的 ComputerLog 侧表中：执行日志按 SHA-256
+去重、压缩后写入 LogBlob，侧表只保存指向 LogBlob 的外键；错误日志直接存放在侧表。
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .compression import compress, content_digest
+from .models import ComputerLog, LogBlob
+
+# 日志字段在查询中对应的列（经由 ComputerLog 侧表）
+LOG_COLUMNS = {
+    'execution_log': ('log__execution_log_blob__codec', 'log__execution_log_blob__data'),
+    'error_log': ('log__error_log',),
+}
+
+
+def build_blob(raw, digest=None, codec=None):
+    """把日志内容（UTF-8 字节串）构造为（未保存的）LogBlob"""
+    codec = codec or settings.LOG_BLOB_CODEC
+    data = compress(raw, codec)
+    return LogBlob(
+        digest=digest or content_digest(raw), codec=codec, data=data,
+        raw_size=len(raw), stored_size=len(data),
+    )
+
+
+def prepare_computer_logs(computers):
+    """
+    写入 Computer 之前调用：把新设置的执行日志去重压缩为 LogBlob
+
+    同时把 log_size / log_stored_size 设置为日志的原始大小和压缩后大小。
+    返回需要写入的 LogBlob 列表，交给 save_computer_logs 保存。
+    """
+    blobs = {}
+    for computer in computers:
+        if not getattr(computer, '_logs_changed', False):
+            continue
+        text = computer.execution_log
+        if not text:
+            computer._execution_log_blob_id = None
+            computer.log_stored_size = 0
+            continue
+        raw = text.encode('utf-8')
+        digest = content_digest(raw)
+        blob = blobs.get(digest)
+        if blob is None:
+            blob = blobs[digest] = build_blob(raw, digest)
+        computer._execution_log_blob_id = blob.digest
+        computer.log_size = blob.raw_size
+        computer.log_stored_size = blob.stored_size
+    return list(blobs.values())
+
+
+def save_computer_logs(computers, blobs, batch_size=None):
+    """
+    写入 Computer 之后、同一个事务内调用：保存 LogBlob 和日志侧表
+
+    内容相同的 LogBlob 主键相同，数据库中已存在的直接复用；
+    只为带日志的记录创建侧表行。
+    """
+    if blobs:
+        _save_and_share_lock(blobs)
+    rows = []
+    for computer in computers:
+        if not getattr(computer, '_logs_changed', False):
+            continue
+        blob_id = computer._execution_log_blob_id
+        if blob_id or computer.error_log:
+            rows.append(ComputerLog(
+                computer=computer, execution_log_blob_id=blob_id, error_log=computer.error_log or None,
+            ))
+        computer._logs_changed = False
+    if rows:
+        ComputerLog.objects.bulk_create(rows, batch_size=batch_size or settings.INGEST_BATCH_SIZE)
+
+
+def _save_and_share_lock(blobs):
+    """
+    写入 LogBlob（已存在的跳过），并对全部用到的行加共享锁直到事务结束
+
+    复用的 LogBlob 可能正被 delete_orphan_blobs 当作孤儿删除：加了共享锁的行不会被它选中；
+    在加锁前已被它锁定并删除的行，加锁时读不到，重新写入一次。
+    """
+    pending = blobs
+    while pending:
+        LogBlob.objects.bulk_create(pending, ignore_conflicts=True)
+        if not connection.features.has_select_for_update:
+            # SQLite 没有行锁，写事务之间本身是串行的
+            return
+        table = connection.ops.quote_name(LogBlob._meta.db_table)
+        placeholders = ', '.join(['%s'] * len(pending))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT digest FROM {table} WHERE digest IN ({placeholders}) ORDER BY digest FOR SHARE',
+                [blob.digest for blob in pending],
+            )
+            locked = {digest for digest, in cursor.fetchall()}
+        pending = [blob for blob in pending if blob.digest not in locked]
+
+
+def orphan_blobs(min_age_days=1):
+    """不再被任何日志侧表行引用、且创建时间早于 min_age_days 天的 LogBlob"""
+    cutoff = timezone.now() - timedelta(days=min_age_days)
+    referenced = ComputerLog.objects.filter(execution_log_blob__isnull=False).values('execution_log_blob')
+    return LogBlob.objects.filter(created_at__lt=cutoff).exclude(digest__in=referenced)
+
+
+def delete_orphan_blobs(batch_size=1000, min_age_days=1):
+    """
+    分批删除不再被引用的 LogBlob，返回删除的行数
+
+    入库可能按内容复用一个看起来是孤儿的 LogBlob（与创建时间无关）：每批在一个事务内
+    先锁定候选行（跳过入库已加共享锁的行），删除时再检查一次没有日志侧表行引用它。
+    """
+    blobs = connection.ops.quote_name(LogBlob._meta.db_table)
+    logs = connection.ops.quote_name(ComputerLog._meta.db_table)
+    blob_column = connection.ops.quote_name(ComputerLog._meta.get_field('execution_log_blob').column)
+    orphans = orphan_blobs(min_age_days).order_by('digest')
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            digests = list(orphans.select_for_update(skip_locked=True).values_list('digest', flat=True)[:batch_size])
+            if not digests:
+                return deleted
+            placeholders = ', '.join(['%s'] * len(digests))
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'DELETE FROM {blobs} WHERE digest IN ({placeholders}) AND NOT EXISTS '
+                    f'(SELECT 1 FROM {logs} WHERE {logs}.{blob_column} = {blobs}.digest)',
+                    digests,
+                )
+                # 锁定后被新记录引用的行不删除，下一批查询时也不再是孤儿
+                deleted += cursor.rowcount
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from computers.query_plans import check_plans, seed_synthetic
+
+
+class Command(BaseCommand):
+    help = (
+        '用 EXPLAIN ANALYZE 检查列表页、API 等热点查询的执行计划：不能有大范围顺序扫描，'
+        '执行时间不超过预算（仅 PostgreSQL）'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0,
+                            help='先生成的合成记录数，检查结束后回滚（默认 0，使用现有数据）')
+        parser.add_argument('--assets', type=int, default=5000, help='合成数据的计算机台数（默认 5000）')
+        parser.add_argument('--budget-ms', type=float, default=50.0, help='每个查询的执行时间预算（默认 50 毫秒）')
+        parser.add_argument('--max-seq-rows', type=int, default=10000,
+                            help='允许的顺序扫描行数，超过即视为没有使用索引（默认 10000）')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('执行计划检查只支持 PostgreSQL')
+
+        with transaction.atomic():
+            if options['seed']:
+                self.stdout.write(f'生成 {options["seed"]} 条合成记录（{options["assets"]} 台计算机）...')
+                seed_synthetic(options['seed'], options['assets'])
+            results = check_plans(options['budget_ms'], options['max_seq_rows'])
+            # 合成数据和 EXPLAIN ANALYZE 的副作用都不保留
+            transaction.set_rollback(True)
+
+        if not results:
+            raise CommandError('没有记录可供检查，可以加上 --seed 生成合成数据')
+        failed = 0
+        for name, elapsed, indexes, problems in results:
+            mark = '❌' if problems else '✅'
+            self.stdout.write(f'{mark} {name}: {elapsed:.1f}ms，索引: {", ".join(indexes) or "无"}')
+            for problem in problems:
+                self.stdout.write(f'     {problem}')
+            failed += bool(problems)
+        if failed:
+            raise CommandError(f'{failed} 个查询的执行计划不符合要求')
+        self.stdout.write(self.style.SUCCESS(f'✅ {len(results)} 个查询的执行计划均符合要求'))
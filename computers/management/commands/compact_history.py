@@ -0,0 +1,83 @@
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from computers.logstore import delete_orphan_blobs
+from computers.retention import compact_batch, drop_old_logs, load_state, save_state
+
+
+class Command(BaseCommand):
+    help = (
+        '按保留策略压缩历史记录：保留每一次变化，最近 N 天每天保留一条、更早的每月保留一条，'
+        '并删除过期的执行日志。分批执行，中断后再次运行从断点继续'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--daily-days', type=int, default=settings.HISTORY_DAILY_DAYS,
+            help='最近多少天内每天保留一条记录，更早的每月保留一条（默认 HISTORY_DAILY_DAYS）'
+        )
+        parser.add_argument(
+            '--log-days', type=int, default=settings.HISTORY_LOG_RETENTION_DAYS,
+            help='删除上传时间早于 N 天的记录的执行日志，0 表示不删除（默认 HISTORY_LOG_RETENTION_DAYS）'
+        )
+        parser.add_argument('--batch-size', type=int, default=100, help='每批处理的计算机台数（默认 100）')
+        parser.add_argument('--log-batch-size', type=int, default=1000, help='每批删除执行日志的记录数（默认 1000）')
+        parser.add_argument('--sleep', type=float, default=0.5, help='每批之间暂停的秒数，降低对线上数据库的影响（默认 0.5）')
+        parser.add_argument('--restart', action='store_true', help='忽略上次的进度，从头开始')
+        parser.add_argument('--dry-run', action='store_true', help='只统计可以删除的记录数，不删除')
+
+    def handle(self, *args, **options):
+        self._stopping = False
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        dry_run = options['dry_run']
+
+        state = {} if options['restart'] else load_state()
+        after = state.get('after')
+        if after:
+            self.stdout.write(f'↩️  从上次中断的位置继续（资产编码 {after} 之后）')
+        elif not dry_run:
+            save_state({'started_at': timezone.now().isoformat(), 'deleted': 0})
+
+        examined = deleted = 0
+        while not self._stopping:
+            after, batch_examined, batch_deleted = compact_batch(
+                after, options['batch_size'], options['daily_days'], dry_run=dry_run
+            )
+            if after is None:
+                break
+            examined += batch_examined
+            deleted += batch_deleted
+            self.stdout.write(f'已处理到 {after}：检查 {examined} 条，{"可删除" if dry_run else "已删除"} {deleted} 条')
+            time.sleep(options['sleep'])
+
+        if self._stopping:
+            self.stdout.write(self.style.WARNING('⏸️  已中断，下次运行将从断点继续'))
+            return
+
+        if not dry_run:
+            state = load_state()
+            state.pop('after', None)
+            state['finished_at'] = timezone.now().isoformat()
+            save_state(state)
+
+        logs = 0
+        if options['log_days'] > 0:
+            logs = drop_old_logs(options['log_days'], options['log_batch_size'], options['sleep'], dry_run=dry_run)
+        blobs = 0 if dry_run else delete_orphan_blobs()
+
+        if dry_run:
+            self.stdout.write(f'可删除的历史记录: {deleted} 条（共检查 {examined} 条），可删除的执行日志: {logs} 条')
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ 历史记录压缩完成：删除 {deleted} 条记录（共检查 {examined} 条），'
+            f'删除 {logs} 条执行日志，清理 {blobs} 条日志内容'
+        ))
+
+    def _stop(self, signum, frame):
+        # 处理完当前批次后退出，进度已保存
+        self._stopping = True
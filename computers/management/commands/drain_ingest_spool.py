@@ -0,0 +1,64 @@
+import json
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections
+
+from computers.spool import drain_batch, recover_processing, spool_status
+
+
+class Command(BaseCommand):
+    help = '把入库暂存区（INGEST_MODE=spool）中的记录批量写入数据库'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='处理完当前所有暂存记录后退出')
+        parser.add_argument('--status', action='store_true', help='只输出暂存区状态（JSON），不写入数据库')
+        parser.add_argument('--batch-size', type=int, default=None, help='每批写入的记录数（默认 INGEST_BATCH_SIZE）')
+        parser.add_argument('--interval', type=float, default=1.0, help='暂存区为空时的轮询间隔秒数（默认 1）')
+        parser.add_argument('--max-backoff', type=float, default=30.0, help='数据库不可用时的最长重试间隔秒数（默认 30）')
+
+    def handle(self, *args, **options):
+        if options['status']:
+            self.stdout.write(json.dumps(spool_status(), ensure_ascii=False))
+            return
+
+        self._stopping = False
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        recovered = recover_processing()
+        if recovered:
+            self.stdout.write(f'↩️  已将上次未完成的 {recovered} 条记录放回待入库队列')
+
+        total = 0
+        backoff = options['interval']
+        while not self._stopping:
+            close_old_connections()
+            try:
+                processed, saved = drain_batch(options['batch_size'])
+            except DatabaseError as e:
+                self.stderr.write(f'❌ 写入数据库失败，{backoff:.0f} 秒后重试: {e}')
+                time.sleep(backoff)
+                backoff = min(backoff * 2, options['max_backoff'])
+                continue
+            backoff = options['interval']
+
+            if processed:
+                total += saved
+                status = spool_status()
+                failed = f'，{processed - saved} 条移入 failed/' if processed > saved else ''
+                self.stdout.write(
+                    f'已写入 {saved} 条{failed}（累计 {total}），待入库 {status["incoming"]} 条，'
+                    f'最早等待 {status["oldest_age_seconds"]} 秒'
+                )
+                continue
+            if options['once']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'✅ 暂存区处理结束，共写入 {total} 条记录'))
+
+    def _stop(self, signum, frame):
+        # 处理完当前批次后退出，不会留下已认领但未写入的记录
+        self._stopping = True
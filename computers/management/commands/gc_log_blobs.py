@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from computers.logstore import delete_orphan_blobs, orphan_blobs
+
+
+class Command(BaseCommand):
+    help = '删除不再被任何计算机记录引用的日志内容（LogBlob）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='每批删除的行数（默认 1000）')
+        parser.add_argument(
+            '--min-age-days', type=int, default=1,
+            help='只清理创建时间早于 N 天的内容（默认 1）'
+        )
+        parser.add_argument('--dry-run', action='store_true', help='只统计，不删除')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            self.stdout.write(f'可清理的日志内容: {orphan_blobs(options["min_age_days"]).count()} 条')
+            return
+
+        deleted = delete_orphan_blobs(options['batch_size'], options['min_age_days'])
+        self.stdout.write(self.style.SUCCESS(f'✅ 已清理 {deleted} 条日志内容'))
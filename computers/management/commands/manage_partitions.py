@@ -0,0 +1,66 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from computers.partitioning import (
+    PartitionError, convert_table, detach_partition, ensure_partitions, is_partitioned,
+    list_partitions, partitions_older_than,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        '维护 Computer 表的按月分区（仅 PostgreSQL）：提前创建之后几个月的分区，'
+        '卸载并归档超过保留期的分区。建议每天定时执行'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--status', action='store_true', help='只列出现有分区及估算行数')
+        parser.add_argument('--convert', action='store_true', help='把尚未分区的 Computer 表转换为分区表（会锁表，请在维护窗口执行）')
+        parser.add_argument(
+            '--ahead', type=int, default=settings.COMPUTER_PARTITION_AHEAD_MONTHS,
+            help='提前创建的月份数（默认 COMPUTER_PARTITION_AHEAD_MONTHS）'
+        )
+        parser.add_argument(
+            '--retention-months', type=int, default=settings.COMPUTER_PARTITION_RETENTION_MONTHS,
+            help='卸载整体早于 N 个月前的分区，0 表示不卸载（默认 COMPUTER_PARTITION_RETENTION_MONTHS）'
+        )
+        parser.add_argument('--drop', action='store_true', help='卸载的分区直接删除，而不是改名保留（归档）')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('表分区只支持 PostgreSQL')
+
+        if options['convert']:
+            try:
+                created = convert_table(options['ahead'])
+            except PartitionError as e:
+                raise CommandError(str(e))
+            self.stdout.write(self.style.SUCCESS(f'✅ Computer 表已转换为分区表，创建 {created} 个按月分区'))
+        elif not is_partitioned():
+            raise CommandError(
+                'Computer 表尚未分区：设置 COMPUTER_PARTITIONING=True 后执行 migrate，'
+                '或使用 manage_partitions --convert 转换'
+            )
+
+        if options['status']:
+            for name, bound, rows in list_partitions():
+                self.stdout.write(f'{name:<40} 约 {rows:>10} 行  {bound}')
+            return
+
+        created = ensure_partitions(options['ahead'])
+        for name in created:
+            self.stdout.write(f'已创建分区 {name}')
+
+        detached = 0
+        if options['retention_months'] > 0:
+            for name in partitions_older_than(options['retention_months']):
+                try:
+                    rows = detach_partition(name, drop=options['drop'])
+                except PartitionError as e:
+                    self.stderr.write(f'⚠️  跳过 {name}: {e}')
+                    continue
+                detached += 1
+                self.stdout.write(f'已{"删除" if options["drop"] else "卸载并归档"}分区 {name}（{rows} 条记录）')
+
+        self.stdout.write(self.style.SUCCESS(f'✅ 分区维护完成：新建 {len(created)} 个，卸载 {detached} 个'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from computers.changes import rebuild_change_events
+
+
+class Command(BaseCommand):
+    help = '根据历史记录重新生成字段变化事件（修改 CHANGE_FIELDS 或导入历史数据后使用）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='每批写入的事件数（默认 1000）')
+
+    def handle(self, *args, **options):
+        total = rebuild_change_events(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'✅ 变化事件已重建，共 {total} 条'))
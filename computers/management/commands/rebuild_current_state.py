@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from computers.current_state import rebuild_current_state
+from computers.facets import recompute_facets
+
+
+class Command(BaseCommand):
+    help = '根据历史记录重建计算机当前状态表（每个资产编码取最新一条记录）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='每批写入的记录数（默认 1000）')
+
+    def handle(self, *args, **options):
+        total = rebuild_current_state(batch_size=options['batch_size'])
+        # 当前状态变了，“最新状态”范围的筛选项计数也要跟着重新统计
+        recompute_facets()
+        self.stdout.write(self.style.SUCCESS(f'✅ 当前状态表已重建，共 {total} 台计算机'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from computers.facets import recompute_facets
+
+
+class Command(BaseCommand):
+    help = '根据历史记录和当前状态表重新统计筛选项计数（设备类型、错误状态、操作系统版本、型号）'
+
+    def handle(self, *args, **options):
+        total = recompute_facets()
+        self.stdout.write(self.style.SUCCESS(f'✅ 筛选项计数已重新统计，共 {total} 项'))
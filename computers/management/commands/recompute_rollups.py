@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from computers.rollups import recompute_rollups
+
+
+class Command(BaseCommand):
+    help = '根据历史记录重新生成每日分布汇总（操作系统内部版本、CPU 型号、内存大小、型号）'
+
+    def handle(self, *args, **options):
+        total = recompute_rollups()
+        self.stdout.write(self.style.SUCCESS(f'✅ 每日分布汇总已重新生成，共 {total} 行'))
@@ -0,0 +1,83 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory, override_settings
+
+from api import fast_read
+from api.views import computer_list_api
+from computers.serializers import ComputerSerializer, LIST_DEFAULT_FIELDS
+
+
+class Command(BaseCommand):
+    help = (
+        '对比列表 API 的快速输出路径与 DRF 序列化器：逐页检查两者输出的字节完全一致，'
+        '并输出每秒处理的行数'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000, help='参与对比的最新记录数（默认 5000）')
+        parser.add_argument('--page-size', type=int, default=None, help='每页条数（默认 API_MAX_PAGE_SIZE）')
+        parser.add_argument('--fields', default=None, help='逗号分隔的字段，默认与列表接口相同（不含日志）')
+        parser.add_argument('--all-fields', action='store_true', help='包含日志在内的全部字段')
+        parser.add_argument('--repeat', type=int, default=3, help='测速轮数，取最快的一轮（默认 3）')
+
+    def handle(self, *args, **options):
+        if options['all_fields']:
+            fields = list(ComputerSerializer.Meta.fields)
+        elif options['fields']:
+            fields = [f.strip() for f in options['fields'].split(',') if f.strip()]
+        else:
+            fields = list(LIST_DEFAULT_FIELDS)
+        page_size = options['page_size'] or settings.API_MAX_PAGE_SIZE
+        params = {'fields': ','.join(fields), 'page_size': page_size}
+
+        slow_pages, slow_rate = self._run(False, params, options)
+        fast_pages, fast_rate = self._run(True, params, options)
+
+        if len(slow_pages) != len(fast_pages):
+            raise CommandError(f'页数不一致：序列化器 {len(slow_pages)} 页，快速路径 {len(fast_pages)} 页')
+        for number, (slow, fast) in enumerate(zip(slow_pages, fast_pages), 1):
+            if slow != fast:
+                offset = next((i for i, (a, b) in enumerate(zip(slow, fast)) if a != b), min(len(slow), len(fast)))
+                raise CommandError(
+                    f'第 {number} 页输出不一致（第 {offset} 字节）：\n'
+                    f'  序列化器: {slow[max(offset - 80, 0):offset + 80]!r}\n'
+                    f'  快速路径: {fast[max(offset - 80, 0):offset + 80]!r}'
+                )
+
+        encoder = 'orjson' if fast_read.orjson is not None else 'json'
+        self.stdout.write(f'字段: {",".join(fields)}')
+        self.stdout.write(f'DRF 序列化器: {slow_rate:,.0f} 行/秒')
+        self.stdout.write(f'快速路径（{encoder}）: {fast_rate:,.0f} 行/秒')
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {len(fast_pages)} 页输出逐字节一致，快速路径为序列化器的 {fast_rate / slow_rate:.1f} 倍'
+            if slow_rate else f'✅ {len(fast_pages)} 页输出逐字节一致'
+        ))
+
+    def _run(self, fast, params, options):
+        """按游标读取最多 --rows 条记录，返回 (每页的响应内容, 最快一轮的行/秒)"""
+        factory = RequestFactory()
+        best = None
+        with override_settings(API_FAST_READ=fast, API_RESPONSE_CACHE_TTL=0):
+            for _ in range(max(options['repeat'], 1)):
+                pages = []
+                rows = 0
+                cursor = None
+                started = time.perf_counter()
+                while rows < options['rows']:
+                    query = dict(params, **({'cursor': cursor} if cursor else {}))
+                    response = computer_list_api(factory.get('/api/computers/', query))
+                    if response.status_code != 200:
+                        raise CommandError(f'列表接口返回 {response.status_code}')
+                    pages.append(response.content)
+                    data = fast_read.json.loads(response.content)
+                    rows += len(data['results'])
+                    cursor = data['next_cursor']
+                    if not cursor:
+                        break
+                elapsed = time.perf_counter() - started
+                rate = rows / elapsed if elapsed else 0
+                if best is None or rate > best[1]:
+                    best = (pages, rate)
+        return best
@@ -0,0 +1,282 @@
+"""
+运行指标（Prometheus 文本格式）
+
+每个进程在内存中累计计数器和直方图，并定期写入 METRICS_DIR 下自己的文件
+（文件名包含 pid 和进程启动时间），进程退出时再写入一次；/metrics/ 读取并合并所有进程的文件后输出，
+因此多个 gunicorn worker 的数据能正确汇总，worker 重启后旧进程的计数也不会丢失。
+已退出进程的文件在读取时合并进 aggregate.json 后删除，worker 反复重启时文件数不会一直增长。
+进程是否存在按 pid 判断，METRICS_DIR 不能在多台主机（或多个容器）之间共享。
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# 指标定义：名称 -> (类型, 说明, 直方图分桶)
+METRICS = {
+    'http_request_duration_seconds': ('histogram', '请求处理耗时（秒）', LATENCY_BUCKETS),
+    'http_request_size_bytes': ('histogram', '请求体大小（字节）', SIZE_BUCKETS),
+    'http_response_size_bytes': ('histogram', '响应体大小（字节，流式响应不统计）', SIZE_BUCKETS),
+    'http_requests_total': ('counter', '请求数', None),
+    'db_queries_per_request': ('histogram', '每个请求执行的 SQL 数', QUERY_COUNT_BUCKETS),
+    'db_query_duration_seconds_total': ('counter', 'SQL 执行总耗时（秒）', None),
+    'ingest_records_total': ('counter', '提交的计算机记录数（按结果）', None),
+    'ingest_log_bytes_total': ('counter', '解码后的执行日志字节数', None),
+    'ingest_validation_failures_total': ('counter', '记录校验失败次数（按字段）', None),
+}
+
+# 已退出进程合并后的指标，sources 中记录已合并的文件名
+AGGREGATE_FILE = 'aggregate.json'
+LOCK_FILE = 'metrics.lock'
+# 锁文件超过这个时间（秒）仍未删除，认为持有锁的进程已异常退出
+LOCK_TIMEOUT = 10.0
+
+_lock = threading.Lock()
+_state = {'pid': None, 'path': None, 'last_flush': 0.0}
+_counters = defaultdict(float)
+_histograms = {}
+
+
+def _labels_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _reset_if_forked():
+    # fork 出来的子进程不继承父进程的计数，写入自己的文件
+    pid = os.getpid()
+    if _state['pid'] != pid:
+        _counters.clear()
+        _histograms.clear()
+        _state['pid'] = pid
+        _state['path'] = Path(settings.METRICS_DIR, f'{pid}-{time.time_ns()}.json')
+        _state['last_flush'] = 0.0
+
+
+def inc(name, value=1, **labels):
+    """计数器加 value"""
+    with _lock:
+        _reset_if_forked()
+        _counters[(name, _labels_key(labels))] += value
+
+
+def observe(name, value, **labels):
+    """直方图记录一个观测值"""
+    buckets = METRICS[name][2]
+    with _lock:
+        _reset_if_forked()
+        key = (name, _labels_key(labels))
+        entry = _histograms.get(key)
+        if entry is None:
+            entry = _histograms[key] = {'counts': [0] * (len(buckets) + 1), 'sum': 0.0}
+        for index, bound in enumerate(buckets):
+            if value <= bound:
+                entry['counts'][index] += 1
+                break
+        else:
+            entry['counts'][-1] += 1
+        entry['sum'] += value
+
+
+def flush(force=False):
+    """把本进程的指标写入文件；未到 METRICS_FLUSH_INTERVAL 时跳过（force=True 时立即写入）"""
+    now = time.monotonic()
+    with _lock:
+        _reset_if_forked()
+        if not force and now - _state['last_flush'] < settings.METRICS_FLUSH_INTERVAL:
+            return
+        _state['last_flush'] = now
+        payload = json.dumps({
+            'counters': [[name, list(labels), value] for (name, labels), value in _counters.items()],
+            'histograms': [
+                [name, list(labels), entry['counts'], entry['sum']]
+                for (name, labels), entry in _histograms.items()
+            ],
+        })
+        path = _state['path']
+    _write(path, payload)
+
+
+def flush_on_exit():
+    """进程退出时写入最后一个 METRICS_FLUSH_INTERVAL 内的指标（atexit，以及 gunicorn 的 worker_exit）"""
+    # fork 出的子进程也继承了 atexit 注册的函数，没有记录过指标的进程不写文件
+    if _state['pid'] != os.getpid():
+        return
+    try:
+        flush(force=True)
+    except OSError:
+        pass
+
+
+atexit.register(flush_on_exit)
+
+
+def _write(path, payload):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.tmp')
+    tmp_path.write_text(payload, encoding='utf-8')
+    os.replace(tmp_path, path)
+
+
+def _read(path):
+    try:
+        return json.loads(path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+
+
+def _merge(counters, histograms, data):
+    for name, labels, value in data.get('counters', []):
+        counters[(name, tuple(map(tuple, labels)))] += value
+    for name, labels, counts, total in data.get('histograms', []):
+        key = (name, tuple(map(tuple, labels)))
+        entry = histograms.setdefault(key, {'counts': [0] * len(counts), 'sum': 0.0})
+        entry['counts'] = [a + b for a, b in zip(entry['counts'], counts)]
+        entry['sum'] += total
+
+
+@contextmanager
+def _dir_lock(directory):
+    """METRICS_DIR 内的进程间互斥锁（独占创建锁文件，各平台都可用）"""
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / LOCK_FILE
+    while True:
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            break
+        except FileExistsError:
+            try:
+                if time.time() - path.stat().st_mtime > LOCK_TIMEOUT:
+                    path.unlink()
+                    continue
+            except FileNotFoundError:
+                continue
+            time.sleep(0.01)
+    try:
+        yield
+    finally:
+        path.unlink(missing_ok=True)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _dead_files(directory):
+    """已退出进程的指标文件：文件名中的 pid 已不存在，或 pid 已被本进程复用"""
+    if os.name == 'nt':
+        # Windows 上 os.kill(pid, 0) 会结束目标进程，不判断
+        return []
+    dead = []
+    for path in directory.glob('*-*.json'):
+        pid = path.name.split('-', 1)[0]
+        if not pid.isdigit():
+            continue
+        if int(pid) == os.getpid():
+            if path != _state['path']:
+                dead.append(path)
+        elif not _pid_alive(int(pid)):
+            dead.append(path)
+    return dead
+
+
+def _compact(directory, aggregate):
+    """把已退出进程的文件合并进 aggregate.json 后删除，返回新的 aggregate 内容"""
+    dead = _dead_files(directory)
+    merged = set(aggregate.get('sources', []))
+    new = [path for path in dead if path.name not in merged]
+    if not new:
+        # 上次合并后没来得及删除的文件
+        for path in dead:
+            path.unlink(missing_ok=True)
+        return aggregate
+    counters, histograms = defaultdict(float), {}
+    for data in [aggregate] + [_read(path) or {} for path in new]:
+        _merge(counters, histograms, data)
+    aggregate = {
+        'counters': [[name, list(labels), value] for (name, labels), value in counters.items()],
+        'histograms': [
+            [name, list(labels), entry['counts'], entry['sum']] for (name, labels), entry in histograms.items()
+        ],
+        # 先写入合并结果再删除来源文件；两者之间进程退出时，读取时按文件名跳过已合并的文件，不会重复计数
+        'sources': sorted(path.name for path in dead),
+    }
+    _write(directory / AGGREGATE_FILE, json.dumps(aggregate))
+    for path in dead:
+        path.unlink(missing_ok=True)
+    return aggregate
+
+
+def collect():
+    """合并所有进程的指标文件，返回 (counters, histograms)；顺便合并已退出进程的文件"""
+    directory = Path(settings.METRICS_DIR)
+    counters = defaultdict(float)
+    histograms = {}
+    # 与合并互斥：否则可能读到合并前的 aggregate.json，而来源文件已被删除，计数器会暂时变小
+    with _dir_lock(directory):
+        aggregate = _compact(directory, _read(directory / AGGREGATE_FILE) or {})
+        merged = set(aggregate.get('sources', []))
+        _merge(counters, histograms, aggregate)
+        for path in directory.glob('*.json'):
+            if path.name == AGGREGATE_FILE or path.name in merged:
+                continue
+            data = _read(path)
+            if data is not None:
+                _merge(counters, histograms, data)
+    return counters, histograms
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = []
+    for key, value in pairs:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        escaped.append(f'{key}="{value}"')
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def render_prometheus():
+    """以 Prometheus 文本格式（0.0.4）输出所有进程汇总后的指标"""
+    flush(force=True)
+    counters, histograms = collect()
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind == 'counter':
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f'{name}{_format_labels(labels)} {_format_number(value)}')
+            continue
+        for (metric, labels), entry in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(list(buckets) + ['+Inf'], entry['counts']):
+                cumulative += count
+                le = bound if bound == '+Inf' else _format_number(bound)
+                lines.append(f'{name}_bucket{_format_labels(labels, [("le", le)])} {cumulative}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {_format_number(entry["sum"])}')
+            lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,182 @@
+"""
+中间件：运行指标采集、请求体解压
+"""
+import io
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import JsonResponse
+
+from . import metrics
+from .compression import DECOMPRESSION_ERRORS, open_decompressed
+
+# 解压请求体时每次读取的大小
+DECOMPRESS_CHUNK_SIZE = 64 * 1024
+
+
+# 当前请求的 SQL 统计；异步视图的查询在 sync_to_async 的线程中执行，上下文变量会随之传递到线程中
+_query_stats = ContextVar('query_stats', default=None)
+
+
+def _record_query(execute, sql, params, many, context):
+    stats = _query_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    query_started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats['count'] += 1
+        stats['duration'] += time.perf_counter() - query_started
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """connection_created 信号：给每个数据库连接加上 SQL 统计（不在请求中时不统计）"""
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+connection_created.connect(install_query_recorder, dispatch_uid='computers.middleware.install_query_recorder')
+
+
+class MetricsMiddleware:
+    """
+    记录每个请求的耗时、请求/响应大小和 SQL 执行情况（见 computers.metrics）
+
+    按视图名称（URL name）分组，未匹配到 URL 的请求记为 unmatched，避免标签数量随 URL 增长。
+    应放在 MIDDLEWARE 的第一位，统计的耗时包含其他中间件。同时支持同步和异步请求。
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        request_size = self._request_size(request)
+        # 本线程的连接可能在本模块导入之前就已建立
+        for alias in connections:
+            install_query_recorder(None, connections[alias])
+        token = _query_stats.set({'count': 0, 'duration': 0.0})
+        try:
+            response = self.get_response(request)
+        finally:
+            query_stats = _query_stats.get()
+            _query_stats.reset(token)
+        self._record(request, response, started, request_size, query_stats)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        request_size = self._request_size(request)
+        token = _query_stats.set({'count': 0, 'duration': 0.0})
+        try:
+            response = await self.get_response(request)
+        finally:
+            query_stats = _query_stats.get()
+            _query_stats.reset(token)
+        self._record(request, response, started, request_size, query_stats)
+        return response
+
+    @staticmethod
+    def _request_size(request):
+        # 在后续中间件处理之前读取：RequestDecompressionMiddleware 会把 CONTENT_LENGTH 改为解压后的大小，
+        # 这里统计的是实际传输的（压缩后的）大小
+        content_length = request.META.get('CONTENT_LENGTH') or '0'
+        return int(content_length) if content_length.isdigit() else 0
+
+    def _record(self, request, response, started, request_size, query_stats):
+        match = request.resolver_match
+        view = match.view_name if match is not None else 'unmatched'
+        metrics.observe('http_request_duration_seconds', time.perf_counter() - started, view=view, method=request.method)
+        metrics.inc('http_requests_total', view=view, method=request.method, status=response.status_code)
+        metrics.observe('http_request_size_bytes', request_size, view=view)
+        if not response.streaming:
+            metrics.observe('http_response_size_bytes', len(response.content), view=view)
+        metrics.observe('db_queries_per_request', query_stats['count'], view=view)
+        metrics.inc('db_query_duration_seconds_total', query_stats['duration'], view=view)
+        metrics.flush()
+
+
+class RequestDecompressionMiddleware:
+    """
+    解压带 Content-Encoding: gzip / zstd 的请求体
+
+    客户端压缩提交的数据后，分支机构到服务器的流量大幅减少。请求体边读边解压，
+    每次读取的长度不超过上限的剩余部分，解压出的数据最多比 REQUEST_MAX_DECOMPRESSED_SIZE 多 1 字节，
+    超过上限时立即返回 413（防止压缩炸弹）。解析 JSON 需要完整的请求体，解压结果保存在内存中，
+    因此每个请求的内存占用最多约为该上限。不支持的编码返回 415，数据损坏返回 400。
+    解压后的请求对后续处理完全透明。
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        error = self._decompress(request)
+        return error if error is not None else self.get_response(request)
+
+    async def __acall__(self, request):
+        # 解压是 CPU 密集的同步操作，在线程中执行，不阻塞事件循环
+        if self._encoding(request):
+            error = await sync_to_async(self._decompress)(request)
+            if error is not None:
+                return error
+        return await self.get_response(request)
+
+    @staticmethod
+    def _encoding(request):
+        encoding = request.META.get('HTTP_CONTENT_ENCODING', '').strip().lower()
+        return '' if encoding == 'identity' else encoding
+
+    def _decompress(self, request):
+        """解压请求体并替换 request 的输入流；出错时返回错误响应"""
+        encoding = self._encoding(request)
+        if not encoding:
+            return None
+
+        try:
+            reader = open_decompressed(request, encoding)
+        except ValueError as e:
+            return JsonResponse({'detail': str(e)}, status=415)
+
+        limit = settings.REQUEST_MAX_DECOMPRESSED_SIZE
+        body = io.BytesIO()
+        try:
+            with reader:
+                while True:
+                    # gzip / zstd 的 read(n) 只解压出 n 字节，不会先把整段压缩数据解开
+                    chunk = reader.read(min(DECOMPRESS_CHUNK_SIZE, limit + 1 - body.tell()))
+                    if not chunk:
+                        break
+                    body.write(chunk)
+                    if body.tell() > limit:
+                        return JsonResponse(
+                            {'detail': f'解压后的请求体超过上限 {limit} 字节'}, status=413
+                        )
+        except DECOMPRESSION_ERRORS as e:
+            return JsonResponse({'detail': f'请求体解压失败: {e}'}, status=400)
+
+        # 用解压后的内容替换请求体，后续的解析器按普通请求处理
+        request.META['CONTENT_LENGTH'] = str(body.tell())
+        del request.META['HTTP_CONTENT_ENCODING']
+        body.seek(0)
+        request._stream = body
+        request._read_started = False
+        return None
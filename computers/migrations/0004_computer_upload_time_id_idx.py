@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('computers', '0003_remove_employee_department_remove_computer_employee_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='computer',
+            index=models.Index(fields=['-upload_time', '-id'], name='computer_upload_time_id_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def populate_current_state(apps, schema_editor):
+    """用已有的历史记录初始化当前状态表：每个 asset_code 取 id 最大的记录"""
+    Computer = apps.get_model('computers', 'Computer')
+    CurrentComputer = apps.get_model('computers', 'CurrentComputer')
+    latest_ids = list(
+        Computer.objects.order_by().values('asset_code').annotate(latest_id=Max('id'))
+        .values_list('latest_id', flat=True)
+    )
+    for start in range(0, len(latest_ids), 1000):
+        rows = Computer.objects.filter(id__in=latest_ids[start:start + 1000]).values_list(
+            'id', 'asset_code', 'upload_time'
+        )
+        CurrentComputer.objects.bulk_create([
+            CurrentComputer(asset_code=asset_code, computer_id=pk, upload_time=upload_time)
+            for pk, asset_code, upload_time in rows
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('computers', '0004_computer_upload_time_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CurrentComputer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('asset_code', models.CharField(max_length=50, unique=True, verbose_name='资产编码')),
+                ('upload_time', models.DateTimeField(verbose_name='最新上传时间')),
+                ('computer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='current_state', to='computers.computer', verbose_name='最新记录')),
+            ],
+            options={
+                'verbose_name': '计算机当前状态',
+                'verbose_name_plural': '计算机当前状态',
+            },
+        ),
+        migrations.RunPython(populate_current_state, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:36
+
+import django.db.models.deletion
+from django.db import migrations, models, transaction
+
+from computers.compression import compress, content_digest
+
+BATCH_SIZE = 500
+
+
+def move_execution_logs(apps, schema_editor):
+    """把已有的 execution_log 文本按批迁移到 LogBlob，每批一个事务，避免长事务"""
+    Computer = apps.get_model('computers', 'Computer')
+    LogBlob = apps.get_model('computers', 'LogBlob')
+    last_id = 0
+    while True:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            rows = list(
+                Computer.objects.filter(id__gt=last_id)
+                .exclude(execution_log__isnull=True).exclude(execution_log='')
+                .order_by('id').values_list('id', 'execution_log')[:BATCH_SIZE]
+            )
+            if not rows:
+                break
+            blobs = {}
+            updates = []
+            for pk, text in rows:
+                raw = text.encode('utf-8')
+                digest = content_digest(raw)
+                blob = blobs.get(digest)
+                if blob is None:
+                    data = compress(raw, 'zlib')
+                    blob = blobs[digest] = LogBlob(
+                        digest=digest, codec='zlib', data=data,
+                        raw_size=len(raw), stored_size=len(data),
+                    )
+                updates.append(Computer(
+                    id=pk, execution_log_blob_id=digest,
+                    log_size=blob.raw_size, log_stored_size=blob.stored_size,
+                ))
+            LogBlob.objects.bulk_create(blobs.values(), ignore_conflicts=True)
+            Computer.objects.bulk_update(updates, ['execution_log_blob', 'log_size', 'log_stored_size'])
+            last_id = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    # 数据迁移分批提交，大表上不会产生一个超长事务
+    atomic = False
+
+    dependencies = [
+        ('computers', '0005_currentcomputer'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LogBlob',
+            fields=[
+                ('digest', models.CharField(max_length=64, primary_key=True, serialize=False, verbose_name='内容摘要(SHA-256)')),
+                ('codec', models.CharField(default='zlib', max_length=10, verbose_name='压缩编码')),
+                ('data', models.BinaryField(verbose_name='压缩后的内容')),
+                ('raw_size', models.IntegerField(verbose_name='原始大小(字节)')),
+                ('stored_size', models.IntegerField(verbose_name='存储大小(字节)')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+            ],
+            options={
+                'verbose_name': '日志内容',
+                'verbose_name_plural': '日志内容',
+            },
+        ),
+        migrations.AddField(
+            model_name='computer',
+            name='log_stored_size',
+            field=models.IntegerField(default=0, help_text='压缩后实际占用的大小', verbose_name='日志存储大小(字节)'),
+        ),
+        migrations.AddField(
+            model_name='computer',
+            name='execution_log_blob',
+            field=models.ForeignKey(blank=True, help_text='PowerShell脚本的完整执行日志', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='computers.logblob', verbose_name='执行日志内容'),
+        ),
+        migrations.RunPython(move_execution_logs, migrations.RunPython.noop),
+    ]
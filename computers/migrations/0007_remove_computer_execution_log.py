@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:36
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('computers', '0006_logblob'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='computer',
+            name='execution_log',
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:38
+
+import django.db.models.deletion
+from django.db import migrations, models, transaction
+from django.db.models import Q
+
+BATCH_SIZE = 2000
+
+
+def move_logs_to_side_table(apps, schema_editor):
+    """把带日志的记录按批复制到 ComputerLog，每批一个事务，避免在大表上长时间持锁"""
+    Computer = apps.get_model('computers', 'Computer')
+    ComputerLog = apps.get_model('computers', 'ComputerLog')
+    has_logs = Q(execution_log_blob__isnull=False) | (Q(error_log__isnull=False) & ~Q(error_log=''))
+    last_id = 0
+    while True:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            rows = list(
+                Computer.objects.filter(id__gt=last_id).filter(has_logs)
+                .order_by('id').values_list('id', 'execution_log_blob_id', 'error_log')[:BATCH_SIZE]
+            )
+            if not rows:
+                break
+            ComputerLog.objects.bulk_create(
+                [
+                    ComputerLog(computer_id=pk, execution_log_blob_id=blob_id, error_log=error_log or None)
+                    for pk, blob_id, error_log in rows
+                ],
+                ignore_conflicts=True,
+            )
+            last_id = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    # 数据迁移分批提交，大表上不会产生一个超长事务
+    atomic = False
+
+    dependencies = [
+        ('computers', '0007_remove_computer_execution_log'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComputerLog',
+            fields=[
+                ('computer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='log', serialize=False, to='computers.computer', verbose_name='计算机记录')),
+                ('error_log', models.TextField(blank=True, help_text='业务逻辑错误信息', null=True, verbose_name='错误日志')),
+                ('execution_log_blob', models.ForeignKey(blank=True, help_text='PowerShell脚本的完整执行日志', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='computers.logblob', verbose_name='执行日志内容')),
+            ],
+            options={
+                'verbose_name': '计算机日志',
+                'verbose_name_plural': '计算机日志',
+            },
+        ),
+        migrations.RunPython(move_logs_to_side_table, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:38
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('computers', '0008_computerlog'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='computer',
+            name='error_log',
+        ),
+        migrations.RemoveField(
+            model_name='computer',
+            name='execution_log_blob',
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:40
+
+from django.db import migrations
+
+# 与 computers.search.SEARCH_FIELDS 保持一致
+SEARCH_FIELDS = ['asset_code', 'user_name', 'computer_name', 'model', 'sn_code']
+
+
+def create_trgm_indexes(apps, schema_editor):
+    """PostgreSQL 上为搜索字段建立 pg_trgm GIN 索引，其他数据库跳过"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            # 没有安装 contrib 包时跳过，搜索仍然可用，只是没有索引加速
+            print('\n  ⚠️  数据库未提供 pg_trgm 扩展，跳过搜索索引的创建')
+            return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for field in SEARCH_FIELDS:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS computer_{field}_trgm '
+            f'ON computers_computer USING gin ({field} gin_trgm_ops)'
+        )
+
+
+def drop_trgm_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for field in SEARCH_FIELDS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS computer_{field}_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('computers', '0009_remove_computer_log_columns'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trgm_indexes, drop_trgm_indexes),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:43
+
+from collections import Counter
+
+from django.db import migrations, models
+from django.db.models import Count
+
+FACET_DIMENSIONS = ('device_type', 'has_errors', 'os_version', 'model')
+
+
+def populate_facet_counts(apps, schema_editor):
+    """用已有的记录初始化筛选项计数"""
+    Computer = apps.get_model('computers', 'Computer')
+    FacetCount = apps.get_model('computers', 'FacetCount')
+    querysets = {
+        'history': Computer.objects.all(),
+        'current': Computer.objects.filter(current_state__isnull=False),
+    }
+    facet_counts = []
+    for scope, queryset in querysets.items():
+        for dimension in FACET_DIMENSIONS:
+            counts = Counter()
+            rows = queryset.order_by().values(dimension).annotate(n=Count('id')).values_list(dimension, 'n')
+            for value, n in rows:
+                if dimension == 'has_errors':
+                    value = 'true' if value else 'false'
+                counts[value or ''] += n
+            facet_counts.extend(
+                FacetCount(scope=scope, dimension=dimension, value=value, count=n)
+                for value, n in counts.items()
+            )
+    FacetCount.objects.bulk_create(facet_counts)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('computers', '0010_computer_search_trgm_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FacetCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('history', '全部历史记录'), ('current', '最新状态')], max_length=10, verbose_name='记录范围')),
+                ('dimension', models.CharField(max_length=30, verbose_name='维度')),
+                ('value', models.CharField(max_length=100, verbose_name='取值')),
+                ('count', models.BigIntegerField(default=0, verbose_name='记录数')),
+            ],
+            options={
+                'verbose_name': '筛选项计数',
+                'verbose_name_plural': '筛选项计数',
+                'constraints': [models.UniqueConstraint(fields=('scope', 'dimension', 'value'), name='facet_count_unique')],
+            },
+        ),
+        migrations.RunPython(populate_facet_counts, migrations.RunPython.noop),
+    ]
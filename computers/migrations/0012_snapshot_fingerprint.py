@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:52
+
+import hashlib
+import json
+
+from django.db import migrations, models
+
+# 与 computers.ingest.FINGERPRINT_FIELDS 保持一致（迁移中固定一份，避免随代码变化）
+FINGERPRINT_FIELDS = (
+    'sn_code', 'model', 'device_type', 'cpu_model', 'memory_size',
+    'os_version', 'os_internal_version', 'user_name', 'computer_name', 'has_errors',
+)
+
+
+def populate_fingerprints(apps, schema_editor):
+    """为每台计算机的最新记录计算快照指纹，最后上报时间初始化为最新上传时间"""
+    Computer = apps.get_model('computers', 'Computer')
+    CurrentComputer = apps.get_model('computers', 'CurrentComputer')
+    current = list(CurrentComputer.objects.order_by('id').select_related('computer'))
+    for start in range(0, len(current), 1000):
+        chunk = current[start:start + 1000]
+        computers = []
+        for state in chunk:
+            computer = state.computer
+            values = [getattr(computer, field) for field in FINGERPRINT_FIELDS]
+            computer.fingerprint = hashlib.sha256(
+                json.dumps(values, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            ).hexdigest()
+            state.fingerprint = computer.fingerprint
+            state.last_seen = state.upload_time
+            computers.append(computer)
+        Computer.objects.bulk_update(computers, ['fingerprint'])
+        CurrentComputer.objects.bulk_update(chunk, ['fingerprint', 'last_seen'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('computers', '0011_facetcount'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='computer',
+            name='fingerprint',
+            field=models.CharField(blank=True, default='', max_length=64, verbose_name='快照指纹'),
+        ),
+        migrations.AddField(
+            model_name='currentcomputer',
+            name='fingerprint',
+            field=models.CharField(blank=True, default='', max_length=64, verbose_name='最新记录的快照指纹'),
+        ),
+        migrations.AddField(
+            model_name='currentcomputer',
+            name='last_seen',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='最后上报时间'),
+        ),
+        migrations.AddField(
+            model_name='currentcomputer',
+            name='seen_count',
+            field=models.PositiveIntegerField(default=1, help_text='最新记录之后（含）的上报次数', verbose_name='上报次数'),
+        ),
+        migrations.RunPython(populate_fingerprints, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('computers', '0012_snapshot_fingerprint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MaintenanceState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='任务名称')),
+                ('state', models.JSONField(blank=True, default=dict, verbose_name='进度')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '维护任务进度',
+                'verbose_name_plural': '维护任务进度',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='computer',
+            index=models.Index(fields=['asset_code', 'upload_time'], name='computer_asset_upload_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+import logging
+
+from django.conf import settings
+from django.db import migrations
+
+logger = logging.getLogger(__name__)
+
+
+def partition_computer_table(apps, schema_editor):
+    """COMPUTER_PARTITIONING=True 且使用 PostgreSQL 时，把 Computer 表转换为按月分区（见 computers.partitioning）"""
+    if schema_editor.connection.vendor != 'postgresql' or not settings.COMPUTER_PARTITIONING:
+        return
+    from computers.partitioning import convert_table
+
+    created = convert_table(settings.COMPUTER_PARTITION_AHEAD_MONTHS)
+    logger.info('computers_computer 已转换为分区表，创建 %s 个按月分区', created)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('computers', '0013_maintenancestate'),
+    ]
+
+    operations = [
+        # 分区表仍可以像普通表一样使用，回滚时保持分区表不变
+        migrations.RunPython(partition_computer_table, migrations.RunPython.noop),
+    ]
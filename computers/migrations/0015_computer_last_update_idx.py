@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('computers', '0014_computer_partitioning'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='computer',
+            index=models.Index(fields=['last_update'], name='computer_last_update_idx'),
+        ),
+    ]
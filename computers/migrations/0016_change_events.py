@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# 与 computers.changes.CHANGE_FIELDS 保持一致（迁移中固定一份，避免随代码变化）
+CHANGE_FIELDS = (
+    'sn_code', 'model', 'device_type', 'cpu_model', 'memory_size',
+    'os_version', 'os_internal_version', 'user_name', 'computer_name',
+)
+
+
+def populate_change_events(apps, schema_editor):
+    """按 (asset_code, id) 顺序比较已有的历史记录，生成变化事件"""
+    Computer = apps.get_model('computers', 'Computer')
+    ChangeEvent = apps.get_model('computers', 'ChangeEvent')
+    rows = Computer.objects.order_by('asset_code', 'id').values_list('id', 'asset_code', 'upload_time', *CHANGE_FIELDS)
+    events = []
+    asset_code = previous = None
+    for pk, code, upload_time, *values in rows.iterator(chunk_size=1000):
+        if code == asset_code:
+            events.extend(
+                ChangeEvent(
+                    computer_id=pk, asset_code=code, field=field, changed_at=upload_time,
+                    old_value=None if old is None else str(old), new_value=None if new is None else str(new),
+                )
+                for field, old, new in zip(CHANGE_FIELDS, previous, values)
+                if old != new
+            )
+        asset_code, previous = code, values
+        if len(events) >= 1000:
+            ChangeEvent.objects.bulk_create(events)
+            events = []
+    ChangeEvent.objects.bulk_create(events)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('computers', '0015_computer_last_update_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('asset_code', models.CharField(max_length=50, verbose_name='资产编码')),
+                ('field', models.CharField(max_length=30, verbose_name='字段')),
+                ('old_value', models.TextField(blank=True, null=True, verbose_name='原值')),
+                ('new_value', models.TextField(blank=True, null=True, verbose_name='新值')),
+                ('changed_at', models.DateTimeField(help_text='变化后记录的上传时间', verbose_name='变化时间')),
+                ('computer', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='changes', to='computers.computer', verbose_name='变化后的记录')),
+            ],
+            options={
+                'verbose_name': '变化事件',
+                'verbose_name_plural': '变化事件',
+                'indexes': [models.Index(fields=['field', '-changed_at', '-id'], name='change_field_time_idx'), models.Index(fields=['-changed_at', '-id'], name='change_time_idx'), models.Index(fields=['asset_code', '-changed_at'], name='change_asset_time_idx')],
+            },
+        ),
+        migrations.RunPython(populate_change_events, migrations.RunPython.noop),
+    ]
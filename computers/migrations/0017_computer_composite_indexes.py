@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('computers', '0016_change_events'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='computer',
+            name='computer_asset_upload_idx',
+        ),
+        migrations.AlterField(
+            model_name='computer',
+            name='asset_code',
+            field=models.CharField(max_length=50, verbose_name='资产编码'),
+        ),
+        migrations.AlterField(
+            model_name='computer',
+            name='has_errors',
+            field=models.BooleanField(default=False, verbose_name='是否有错误'),
+        ),
+        migrations.AddIndex(
+            model_name='computer',
+            index=models.Index(fields=['asset_code', 'upload_time', 'id'], name='computer_asset_upload_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='computer',
+            index=models.Index(fields=['has_errors', '-upload_time', '-id'], name='computer_errors_upload_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='computer',
+            index=models.Index(fields=['device_type', '-upload_time', '-id'], name='computer_device_upload_idx'),
+        ),
+    ]
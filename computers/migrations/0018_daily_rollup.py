@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:28
+
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.utils import timezone
+
+ROLLUP_DIMENSIONS = ('os_internal_version', 'cpu_model', 'memory_size', 'model')
+ROLLUP_FIELDS = ROLLUP_DIMENSIONS + ('has_errors',)
+
+
+def populate_daily_rollups(apps, schema_editor):
+    """用已有的记录生成每日分布汇总（与 computers.rollups.recompute_rollups 相同）"""
+    Computer = apps.get_model('computers', 'Computer')
+    DailyRollup = apps.get_model('computers', 'DailyRollup')
+    deltas = defaultdict(lambda: [0, 0])
+
+    def add(day, values, sign):
+        for dimension in ROLLUP_DIMENSIONS:
+            value = values[dimension]
+            delta = deltas[(dimension, day, '' if value is None else str(value))]
+            delta[0] += sign
+            if values['has_errors']:
+                delta[1] += sign
+
+    rows = Computer.objects.order_by('asset_code', 'id').values_list('asset_code', 'upload_time', *ROLLUP_FIELDS)
+    previous_asset_code, previous = None, None
+    for asset_code, upload_time, *values in rows.iterator(chunk_size=2000):
+        day = timezone.localdate(upload_time)
+        current = dict(zip(ROLLUP_FIELDS, values))
+        if asset_code == previous_asset_code:
+            add(day, previous, -1)
+        add(day, current, 1)
+        previous_asset_code, previous = asset_code, current
+    DailyRollup.objects.bulk_create(
+        [
+            DailyRollup(day=day, dimension=dimension, value=value, machines=machines, with_errors=with_errors)
+            for (dimension, day, value), (machines, with_errors) in deltas.items() if machines or with_errors
+        ],
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('computers', '0017_computer_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='日期')),
+                ('dimension', models.CharField(max_length=30, verbose_name='维度')),
+                ('value', models.CharField(max_length=100, verbose_name='取值')),
+                ('machines', models.IntegerField(default=0, verbose_name='计算机台数变化')),
+                ('with_errors', models.IntegerField(default=0, verbose_name='有错误的计算机台数变化')),
+            ],
+            options={
+                'verbose_name': '每日分布汇总',
+                'verbose_name_plural': '每日分布汇总',
+                'constraints': [models.UniqueConstraint(fields=('dimension', 'day', 'value'), name='daily_rollup_unique')],
+            },
+        ),
+        migrations.RunPython(populate_daily_rollups, migrations.RunPython.noop),
+    ]
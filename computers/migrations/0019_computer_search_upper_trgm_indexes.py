@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:10
+
+from django.db import migrations
+
+SEARCH_FIELDS = ['asset_code', 'user_name', 'computer_name', 'model', 'sn_code']
+
+
+def replace_trgm_indexes(apps, schema_editor):
+    """
+    迁移 0010 把三元组索引建在裸列上，而 icontains 查询的是 UPPER("字段"::text)，索引从未被使用。
+    这里删除这些索引，改为建立在同样表达式上的索引（CONCURRENTLY，不阻塞写入）。
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    from computers.partitioning import create_index_concurrently, drop_index_concurrently
+    from computers.search import TRGM_INDEXES
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            # 迁移 0010 因没有 pg_trgm 扩展跳过了索引
+            return
+    for field in SEARCH_FIELDS:
+        drop_index_concurrently(f'computer_{field}_trgm')
+    for name, using in TRGM_INDEXES.items():
+        create_index_concurrently(name, using)
+
+
+def restore_trgm_indexes(apps, schema_editor):
+    """回滚：恢复迁移 0010 建立的裸列索引"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    from computers.partitioning import create_index_concurrently, drop_index_concurrently
+    from computers.search import TRGM_INDEXES
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return
+    for name in TRGM_INDEXES:
+        drop_index_concurrently(name)
+    for field in SEARCH_FIELDS:
+        create_index_concurrently(f'computer_{field}_trgm', f'USING gin ({field} gin_trgm_ops)')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY 不能在事务中执行
+    atomic = False
+
+    dependencies = [
+        ('computers', '0018_daily_rollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(replace_trgm_indexes, restore_trgm_indexes),
+    ]
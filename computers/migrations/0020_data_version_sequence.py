@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:05
+
+from django.db import migrations
+
+
+def create_sequence(apps, schema_editor):
+    """PostgreSQL 上创建数据版本序列（见 computers.data_version），其他数据库跳过"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE SEQUENCE IF NOT EXISTS computers_data_version_seq')
+
+
+def drop_sequence(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP SEQUENCE IF EXISTS computers_data_version_seq')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('computers', '0019_computer_search_upper_trgm_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_sequence, drop_sequence),
+    ]
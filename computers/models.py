@@ -1,11 +1,13 @@
 from django.db import models
 from django.utils import timezone
 
+from .compression import decompress
+
 
 class Computer(models.Model):
     """计算机模型 - 简化版（支持历史记录）"""
     # 基本信息
-    asset_code = models.CharField(max_length=50, verbose_name="资产编码", db_index=True)
+    asset_code = models.CharField(max_length=50, verbose_name="资产编码")
     sn_code = models.CharField(max_length=50, verbose_name="SN码")
     model = models.CharField(max_length=100, verbose_name="型号")
     device_type = models.CharField(max_length=50, verbose_name="设备类型", default="Default string")
@@ -23,12 +25,16 @@ class Computer(models.Model):
     computer_name = models.CharField(max_length=100, verbose_name="计算机名", default="")
     
     # 日志信息字段
-    execution_log = models.TextField(verbose_name="执行日志", blank=True, null=True, help_text="PowerShell脚本的完整执行日志")
+    # 日志正文存放在一对一的 ComputerLog 侧表中（执行日志再经 LogBlob 去重压缩），
+    # 通过 execution_log / error_log 属性按需读取，主表只保留大小和状态
     log_size = models.IntegerField(verbose_name="日志大小(字节)", default=0)
+    log_stored_size = models.IntegerField(verbose_name="日志存储大小(字节)", default=0, help_text="压缩后实际占用的大小")
     
     # 错误信息字段
-    error_log = models.TextField(verbose_name="错误日志", blank=True, null=True, help_text="业务逻辑错误信息")
-    has_errors = models.BooleanField(verbose_name="是否有错误", default=False, db_index=True)
+    has_errors = models.BooleanField(verbose_name="是否有错误", default=False)
+    
+    # 快照指纹：硬件、系统、用户等字段的摘要，入库时用来判断与上一次提交相比是否有变化
+    fingerprint = models.CharField(max_length=64, blank=True, default='', verbose_name="快照指纹")
     
     # 系统字段
     uploader = models.CharField(max_length=50, default="Robot", verbose_name="上传者")
@@ -39,6 +45,235 @@ class Computer(models.Model):
         verbose_name = "计算机"
         verbose_name_plural = "计算机"
         ordering = ['-upload_time']
+        # 索引与实际查询一一对应，python manage.py check_query_plans 用 EXPLAIN 检查这些查询的执行计划
+        indexes = [
+            # 列表页、列表 API 游标分页按 (upload_time, id) 倒序翻页
+            models.Index(fields=['-upload_time', '-id'], name='computer_upload_time_id_idx'),
+            # 单台计算机的历史记录：API 的 asset_code 过滤（倒序扫描）、compact_history 逐台顺序扫描；
+            # 也代替了原来 asset_code 上的单列索引
+            models.Index(fields=['asset_code', 'upload_time', 'id'], name='computer_asset_upload_id_idx'),
+            # 列表页的错误状态、设备类型筛选，按上传时间倒序取一页时不需要排序，也用于筛选后的计数
+            models.Index(fields=['has_errors', '-upload_time', '-id'], name='computer_errors_upload_idx'),
+            models.Index(fields=['device_type', '-upload_time', '-id'], name='computer_device_upload_idx'),
+            # 读接口的数据版本取 MAX(last_update)（见 computers.data_version）
+            models.Index(fields=['last_update'], name='computer_last_update_idx'),
+        ]
 
     def __str__(self):
         return f"{self.asset_code} - {self.user_name}"
+
+    def _get_log(self):
+        """日志侧表中对应的行，没有日志时返回 None"""
+        if self.pk is None:
+            return None
+        try:
+            return self.log
+        except ComputerLog.DoesNotExist:
+            return None
+
+    @property
+    def execution_log(self):
+        """执行日志全文，第一次访问时才从日志侧表和 LogBlob 读取并解压"""
+        if not hasattr(self, '_execution_log'):
+            log = self._get_log()
+            blob = log.execution_log_blob if log is not None else None
+            self._execution_log = blob.text if blob is not None else ''
+        return self._execution_log
+
+    @execution_log.setter
+    def execution_log(self, value):
+        # 新写入的日志在入库时由 computers.logstore 写入侧表
+        self._execution_log = value or ''
+        self._logs_changed = True
+
+    @property
+    def error_log(self):
+        """业务错误日志，第一次访问时才从日志侧表读取"""
+        if not hasattr(self, '_error_log'):
+            log = self._get_log()
+            self._error_log = (log.error_log or '') if log is not None else ''
+        return self._error_log
+
+    @error_log.setter
+    def error_log(self, value):
+        self._error_log = value or ''
+        self._logs_changed = True
+
+
+class ComputerLog(models.Model):
+    """计算机记录的日志 - 与 Computer 一对一的侧表
+
+    日志正文体积大、只在详情页使用，与主表分开存放后 Computer 保持窄表，
+    列表、筛选、后台和 VACUUM 都不需要再扫过日志数据。只有带日志的记录才有对应行。
+    """
+    computer = models.OneToOneField(
+        Computer, on_delete=models.CASCADE, primary_key=True, related_name='log', verbose_name="计算机记录"
+    )
+    execution_log_blob = models.ForeignKey(
+        'LogBlob', on_delete=models.PROTECT, null=True, blank=True, related_name='+',
+        verbose_name="执行日志内容", help_text="PowerShell脚本的完整执行日志"
+    )
+    error_log = models.TextField(verbose_name="错误日志", blank=True, null=True, help_text="业务逻辑错误信息")
+
+    class Meta:
+        verbose_name = "计算机日志"
+        verbose_name_plural = "计算机日志"
+
+    def __str__(self):
+        return f"{self.computer_id}"
+
+
+class CurrentComputer(models.Model):
+    """计算机当前状态 - 每个资产编码一行，指向该计算机最新的一条记录
+
+    Computer 是只追加的历史表，“当前整个机队的状态”如果每次都从历史中
+    找每个 asset_code 的最新记录，代价与历史记录总数成正比。本表在入库时
+    与 Computer 在同一个事务内更新（见 computers.ingest），查询当前状态时
+    只需与本表做一次连接，代价只与计算机台数有关。
+    
+    与最新记录相比没有变化的提交不再写入新的历史记录，只更新 last_seen 和 seen_count。
+    """
+    asset_code = models.CharField(max_length=50, unique=True, verbose_name="资产编码")
+    computer = models.OneToOneField(
+        Computer, on_delete=models.CASCADE, related_name='current_state', verbose_name="最新记录"
+    )
+    upload_time = models.DateTimeField(verbose_name="最新上传时间")
+    fingerprint = models.CharField(max_length=64, blank=True, default='', verbose_name="最新记录的快照指纹")
+    last_seen = models.DateTimeField(null=True, blank=True, verbose_name="最后上报时间")
+    seen_count = models.PositiveIntegerField(default=1, verbose_name="上报次数", help_text="最新记录之后（含）的上报次数")
+
+    class Meta:
+        verbose_name = "计算机当前状态"
+        verbose_name_plural = "计算机当前状态"
+
+    def __str__(self):
+        return f"{self.asset_code} -> {self.computer_id}"
+
+
+class ChangeEvent(models.Model):
+    """字段变化事件 - 同一台计算机相邻两条记录之间每个变化的字段一行
+
+    入库时与上一条记录比较后写入（见 computers.changes），按字段和时间范围
+    查询变化（例如本周内存有变化的计算机）只需一次基于索引的查询。
+    Computer 表可能是分区表，外键不建数据库约束，级联删除由 Django 完成。
+    """
+    computer = models.ForeignKey(
+        Computer, on_delete=models.CASCADE, db_constraint=False, related_name='changes',
+        verbose_name="变化后的记录"
+    )
+    asset_code = models.CharField(max_length=50, verbose_name="资产编码")
+    field = models.CharField(max_length=30, verbose_name="字段")
+    old_value = models.TextField(null=True, blank=True, verbose_name="原值")
+    new_value = models.TextField(null=True, blank=True, verbose_name="新值")
+    changed_at = models.DateTimeField(verbose_name="变化时间", help_text="变化后记录的上传时间")
+
+    class Meta:
+        verbose_name = "变化事件"
+        verbose_name_plural = "变化事件"
+        indexes = [
+            # 按字段和时间范围查询，变化事件接口按 (changed_at, id) 倒序翻页
+            models.Index(fields=['field', '-changed_at', '-id'], name='change_field_time_idx'),
+            models.Index(fields=['-changed_at', '-id'], name='change_time_idx'),
+            models.Index(fields=['asset_code', '-changed_at'], name='change_asset_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.asset_code} {self.field}: {self.old_value} -> {self.new_value}"
+
+
+class FacetCount(models.Model):
+    """筛选项计数 - 每个 (范围, 维度, 取值) 一行
+
+    列表页的筛选下拉框需要知道有哪些设备类型、型号等以及各有多少条记录，
+    如果每次打开页面都去 Computer 上做 DISTINCT / GROUP BY，代价与记录总数成正比。
+    本表在入库时增量维护（见 computers.facets），页面只读取这张小表。
+    """
+    SCOPE_HISTORY = 'history'
+    SCOPE_CURRENT = 'current'
+    SCOPE_CHOICES = [
+        (SCOPE_HISTORY, '全部历史记录'),
+        (SCOPE_CURRENT, '最新状态'),
+    ]
+
+    scope = models.CharField(max_length=10, choices=SCOPE_CHOICES, verbose_name="记录范围")
+    dimension = models.CharField(max_length=30, verbose_name="维度")
+    value = models.CharField(max_length=100, verbose_name="取值")
+    count = models.BigIntegerField(default=0, verbose_name="记录数")
+
+    class Meta:
+        verbose_name = "筛选项计数"
+        verbose_name_plural = "筛选项计数"
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'dimension', 'value'], name='facet_count_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.scope}:{self.dimension}={self.value} ({self.count})"
+
+
+class DailyRollup(models.Model):
+    """机队分布的每日汇总 - 每个 (维度, 日期, 取值) 一行，保存当天的净变化量
+
+    每台计算机按其最新记录计入一次（被新记录取代的旧快照不再计入），
+    某一天的分布 = 该天及之前各天的变化量之和。入库时增量维护（见 computers.rollups），
+    操作系统版本、CPU 型号、内存大小、型号的分布和各型号的错误率只需读取这张小表。
+    """
+    day = models.DateField(verbose_name="日期")
+    dimension = models.CharField(max_length=30, verbose_name="维度")
+    value = models.CharField(max_length=100, verbose_name="取值")
+    machines = models.IntegerField(default=0, verbose_name="计算机台数变化")
+    with_errors = models.IntegerField(default=0, verbose_name="有错误的计算机台数变化")
+
+    class Meta:
+        verbose_name = "每日分布汇总"
+        verbose_name_plural = "每日分布汇总"
+        constraints = [
+            models.UniqueConstraint(fields=['dimension', 'day', 'value'], name='daily_rollup_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.dimension}={self.value} ({self.machines:+d})"
+
+
+class MaintenanceState(models.Model):
+    """维护任务的进度 - 每个任务一行
+
+    分批执行、可能被中断的维护命令（例如 compact_history）把处理到的位置保存在这里，
+    下次运行时从断点继续，而不是从头开始。
+    """
+    name = models.CharField(max_length=50, unique=True, verbose_name="任务名称")
+    state = models.JSONField(default=dict, blank=True, verbose_name="进度")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="更新时间")
+
+    class Meta:
+        verbose_name = "维护任务进度"
+        verbose_name_plural = "维护任务进度"
+
+    def __str__(self):
+        return self.name
+
+
+class LogBlob(models.Model):
+    """执行日志内容 - 以内容的 SHA-256 为主键，压缩存储
+
+    同一台计算机每天上传的执行日志往往完全相同，按内容寻址后多条
+    Computer 记录共用一行，避免重复占用表空间、TOAST 和备份。
+    """
+    digest = models.CharField(max_length=64, primary_key=True, verbose_name="内容摘要(SHA-256)")
+    codec = models.CharField(max_length=10, default='zlib', verbose_name="压缩编码")
+    data = models.BinaryField(verbose_name="压缩后的内容")
+    raw_size = models.IntegerField(verbose_name="原始大小(字节)")
+    stored_size = models.IntegerField(verbose_name="存储大小(字节)")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
+
+    class Meta:
+        verbose_name = "日志内容"
+        verbose_name_plural = "日志内容"
+
+    def __str__(self):
+        return f"{self.digest[:12]} ({self.raw_size} -> {self.stored_size})"
+
+    @property
+    def text(self):
+        """解压后的日志文本"""
+        return decompress(self.data, self.codec).decode('utf-8')
@@ -0,0 +1,225 @@
+"""
+分页工具
+
+- 游标（keyset）分页：按 (upload_time, id) 倒序翻页，每一页只需要一次基于索引的
+  范围查询，不会像 OFFSET 分页那样随着页码变深而越来越慢
+- EstimatedCountPaginator：列表页使用的分页器，避免每次打开页面都执行 COUNT(*)
+"""
+import base64
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+
+class InvalidCursor(ValueError):
+    """游标格式错误或已被篡改"""
+
+
+def encode_cursor(upload_time, pk):
+    """把 (upload_time, id) 编码为 URL 安全的游标字符串"""
+    raw = json.dumps([upload_time.isoformat(), pk], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """解析游标字符串，返回 (upload_time, id)"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        upload_time_str, pk = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        upload_time = parse_datetime(upload_time_str)
+    except (ValueError, TypeError, UnicodeError):
+        raise InvalidCursor(f'无效的游标: {cursor}')
+    if upload_time is None or not isinstance(pk, int):
+        raise InvalidCursor(f'无效的游标: {cursor}')
+    return upload_time, pk
+
+
+def _older_than(cursor, time_field='upload_time'):
+    moment, pk = decode_cursor(cursor)
+    return Q(**{f'{time_field}__lt': moment}) | Q(**{time_field: moment, 'id__lt': pk})
+
+
+def _newer_than(cursor, time_field='upload_time'):
+    moment, pk = decode_cursor(cursor)
+    return Q(**{f'{time_field}__gt': moment}) | Q(**{time_field: moment, 'id__gt': pk})
+
+
+def _row_cursor(row):
+    return encode_cursor(row.upload_time, row.id)
+
+
+def keyset_page(queryset, cursor=None, page_size=100, row_cursor=_row_cursor, time_field='upload_time'):
+    """
+    取出游标之后的一页数据
+
+    返回 (rows, next_cursor)；没有下一页时 next_cursor 为 None。
+    queryset 必须包含 time_field（默认 upload_time）和 id 两个字段，按 (time_field, id) 倒序翻页；
+    queryset 返回的不是模型实例时（例如 values_list），或者按其他时间字段翻页时，
+    由 row_cursor 根据一行生成游标。
+    """
+    queryset = queryset.order_by(f'-{time_field}', '-id')
+    if cursor:
+        queryset = queryset.filter(_older_than(cursor, time_field))
+
+    # 多取一条用来判断是否还有下一页，避免额外的 COUNT 查询
+    rows = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = row_cursor(rows[-1])
+    return rows, next_cursor
+
+
+def estimate_row_count(model, using='default'):
+    """
+    根据 PostgreSQL 的统计信息（pg_class.reltuples）估算表的行数
+
+    分区表（见 computers.partitioning）本身没有行数统计，取各分区估算值之和。
+    无法估算（非 PostgreSQL、表从未 ANALYZE）时返回 None。
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT CASE WHEN c.relkind = 'p' THEN ("
+            "  SELECT SUM(GREATEST(p.reltuples, 0)) FROM pg_inherits i"
+            "  JOIN pg_class p ON p.oid = i.inhrelid WHERE i.inhparent = c.oid"
+            ") ELSE c.reltuples END::bigint "
+            "FROM pg_class c WHERE c.oid = %s::regclass",
+            [model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return row[0]
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    count 不再每次执行 SELECT COUNT(*) 的分页器
+
+    - 未加任何筛选条件时，使用数据库统计信息中的估算行数；
+      表较小（估算值低于 PAGINATION_EXACT_COUNT_THRESHOLD）时仍然精确计数
+    - 有筛选条件时精确计数，结果按查询语句缓存 PAGINATION_COUNT_CACHE_TTL 秒
+
+    count_is_estimate 表示 count 是否为估算值。
+    """
+    _count_is_estimate = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimate_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= settings.PAGINATION_EXACT_COUNT_THRESHOLD:
+                self._count_is_estimate = True
+                return estimate
+
+        sql, params = queryset.query.sql_with_params()
+        digest = hashlib.md5(f'{sql}|{params!r}'.encode('utf-8')).hexdigest()
+        return cache.get_or_set(
+            f'pagination_count:{digest}', queryset.count, settings.PAGINATION_COUNT_CACHE_TTL
+        )
+
+    @property
+    def count_is_estimate(self):
+        self.count
+        return self._count_is_estimate
+
+
+class KeysetPage:
+    """
+    深分页时使用的“上一页 / 下一页”页面
+
+    只提供模板需要的属性；翻页通过 ?after= / ?before= 游标进行，不再使用 OFFSET。
+    """
+    is_keyset = True
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def paginate_computers(request, queryset, per_page=20):
+    """
+    列表页分页
+
+    前 PAGINATION_MAX_PAGES 页使用页码（OFFSET）翻页，总数来自 EstimatedCountPaginator；
+    更深的页面使用游标翻页（?after= / ?before=），翻页耗时与页码深度无关。
+    queryset 必须按 (-upload_time, -id) 排序。返回模板上下文字典。
+    """
+    queryset = queryset.order_by('-upload_time', '-id')
+    paginator = EstimatedCountPaginator(queryset, per_page)
+    after = request.GET.get('after')
+    before = request.GET.get('before')
+
+    if after or before:
+        try:
+            page_obj = _keyset_web_page(queryset, per_page, after=after, before=before)
+        except InvalidCursor:
+            page_obj = None
+        if page_obj is not None:
+            return {'page_obj': page_obj, 'paginator': paginator, 'page_range': []}
+
+    page_obj = paginator.get_page(request.GET.get('page'))
+    max_pages = settings.PAGINATION_MAX_PAGES
+    if page_obj.number > max_pages:
+        page_obj = paginator.get_page(max_pages)
+    page_range = [
+        num for num in paginator.get_elided_page_range(page_obj.number, on_each_side=2, on_ends=0)
+        if num == Paginator.ELLIPSIS or num <= max_pages
+    ]
+    # 最后一个页码页之后改用游标翻页
+    page_obj.next_cursor = None
+    if page_obj.number == max_pages and page_obj.has_next() and page_obj.object_list:
+        page_obj.next_cursor = _row_cursor(list(page_obj.object_list)[-1])
+    return {
+        'page_obj': page_obj,
+        'paginator': paginator,
+        'page_range': page_range,
+        'show_last_page': paginator.num_pages <= max_pages and not paginator.count_is_estimate,
+    }
+
+
+def _keyset_web_page(queryset, per_page, after=None, before=None):
+    if before:
+        # 向前翻：按时间正序取比游标更新的一页，再反转为倒序显示
+        rows = list(queryset.filter(_newer_than(before)).order_by('upload_time', 'id')[:per_page + 1])
+        has_newer = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        if not rows:
+            return None
+        return KeysetPage(
+            rows,
+            next_cursor=_row_cursor(rows[-1]),
+            previous_cursor=_row_cursor(rows[0]) if has_newer else None,
+        )
+
+    rows, next_cursor = keyset_page(queryset, after, per_page)
+    if not rows:
+        return None
+    return KeysetPage(rows, next_cursor=next_cursor, previous_cursor=_row_cursor(rows[0]))
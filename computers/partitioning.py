@@ -0,0 +1,270 @@
+"""
+Computer 表按 upload_time 的 PostgreSQL 声明式范围分区（可选）
+
+COMPUTER_PARTITIONING=True 时，迁移 0014 把 computers_computer 转换为按月分区的分区表
+（已经部署的系统也可以用 manage_partitions --convert 转换）。按时间范围查询、
+按 upload_time 排序分页时 PostgreSQL 只扫描相关的分区（分区裁剪），
+过期的历史数据可以整个分区卸载（DETACH），不需要大量 DELETE。
+
+分区表的限制：
+- 主键必须包含分区键，主键改为 (id, upload_time)；id 仍由同一个序列生成，全局唯一
+- 其他表不能再用外键约束引用 Computer.id：转换时删除 ComputerLog、CurrentComputer 的外键约束，
+  级联删除由 Django 在应用层完成（on_delete=CASCADE 本来就由 Django 执行）。
+  之后新增引用 Computer 的外键需要设置 db_constraint=False
+
+分区命名：computers_computer_pYYYYMM（按 TIME_ZONE 的自然月），另有一个默认分区
+computers_computer_default 接收没有对应分区的记录。
+"""
+from datetime import datetime
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import data_version
+from .facets import FACET_DIMENSIONS, facet_value, remove_history_counts
+
+TABLE = 'computers_computer'
+DEFAULT_PARTITION = f'{TABLE}_default'
+PARTITION_PREFIX = f'{TABLE}_p'
+ARCHIVE_PREFIX = f'{TABLE}_archive_p'
+
+# 引用 Computer 的侧表：卸载分区时一并删除这些表中对应的行
+DEPENDENT_TABLES = (
+    ('computers_computerlog', 'computer_id'),
+    ('computers_changeevent', 'computer_id'),
+)
+
+
+class PartitionError(Exception):
+    """分区操作无法执行（例如数据库不支持、要卸载的分区中有当前记录）"""
+
+
+def month_start(value):
+    """value 所在自然月的第一天零点（当前时区）"""
+    local = timezone.localtime(value)
+    return local.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(month, months):
+    """month 为某月第一天零点，返回之后（months 为负数时为之前）第 months 个月的第一天零点"""
+    index = month.year * 12 + month.month - 1 + months
+    return timezone.make_aware(datetime(index // 12, index % 12 + 1, 1))
+
+
+def partition_name(month):
+    return f'{PARTITION_PREFIX}{month:%Y%m}'
+
+
+def partition_month(name):
+    """从分区名中解析月份，不是按月分区（例如默认分区）时返回 None"""
+    if not name.startswith(PARTITION_PREFIX):
+        return None
+    suffix = name[len(PARTITION_PREFIX):]
+    if len(suffix) != 6 or not suffix.isdigit():
+        return None
+    return timezone.make_aware(datetime(int(suffix[:4]), int(suffix[4:]), 1))
+
+
+def is_partitioned():
+    """computers_computer 是否已经是分区表（非 PostgreSQL 时总是 False）"""
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)', [TABLE])
+        row = cursor.fetchone()
+    return row is not None and row[0] == 'p'
+
+
+def list_partitions():
+    """返回 [(分区名, 分区范围, 估算行数), ...]，按分区名排序"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), GREATEST(c.reltuples, 0)::bigint '
+            'FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid '
+            'WHERE i.inhparent = %s::regclass ORDER BY c.relname',
+            [TABLE],
+        )
+        return cursor.fetchall()
+
+
+def create_partition(month):
+    """
+    创建某个月的分区，已存在时返回 False
+
+    默认分区中已有该月的记录时，先把这些记录移入新分区再挂载，否则挂载会失败。
+    """
+    name = partition_name(month)
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT to_regclass(%s)', [name])
+        if cursor.fetchone()[0] is not None:
+            return False
+        start, end = month, add_months(month, 1)
+        with transaction.atomic():
+            cursor.execute(f'CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+            cursor.execute(
+                f'WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE upload_time >= %s AND upload_time < %s '
+                f'RETURNING *) INSERT INTO {name} SELECT * FROM moved',
+                [start, end],
+            )
+            cursor.execute(f'ALTER TABLE {TABLE} ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)', [start, end])
+    return True
+
+
+def ensure_partitions(ahead_months, since=None):
+    """创建从 since（默认本月）到之后 ahead_months 个月的分区，返回新建的分区名列表"""
+    month = month_start(since or timezone.now())
+    last = add_months(month_start(timezone.now()), ahead_months)
+    created = []
+    while month <= last:
+        if create_partition(month):
+            created.append(partition_name(month))
+        month = add_months(month, 1)
+    return created
+
+
+def convert_table(ahead_months):
+    """
+    把普通的 computers_computer 表转换为按月分区的分区表，返回新建的分区数
+
+    在一个事务内完成：改名原表、创建分区表和分区、复制数据、重建索引、删除原表。
+    复制期间表被锁定，数据量大时应在维护窗口执行。已经是分区表时返回 0。
+    """
+    if connection.vendor != 'postgresql':
+        raise PartitionError('表分区只支持 PostgreSQL')
+    if is_partitioned():
+        return 0
+
+    legacy = f'{TABLE}_legacy'
+    with transaction.atomic(), connection.cursor() as cursor:
+        # 除主键外的索引（包括 pg_trgm 索引）在新表上按原名重建
+        cursor.execute(
+            'SELECT pg_get_indexdef(i.indexrelid) FROM pg_index i '
+            'WHERE i.indrelid = %s::regclass AND NOT i.indisprimary',
+            [TABLE],
+        )
+        index_definitions = [row[0] for row in cursor.fetchall()]
+        cursor.execute(
+            "SELECT conrelid::regclass::text, conname FROM pg_constraint "
+            "WHERE confrelid = %s::regclass AND contype = 'f'",
+            [TABLE],
+        )
+        for table, constraint in cursor.fetchall():
+            cursor.execute(f'ALTER TABLE {table} DROP CONSTRAINT {connection.ops.quote_name(constraint)}')
+        cursor.execute(f'SELECT MIN(upload_time) FROM {TABLE}')
+        oldest = cursor.fetchone()[0]
+
+        cursor.execute(f'ALTER TABLE {TABLE} RENAME TO {legacy}')
+        cursor.execute(
+            f'CREATE TABLE {TABLE} (LIKE {legacy} INCLUDING DEFAULTS INCLUDING IDENTITY '
+            f'INCLUDING CONSTRAINTS INCLUDING STORAGE INCLUDING COMMENTS) PARTITION BY RANGE (upload_time)'
+        )
+        cursor.execute(f'CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT')
+        created = ensure_partitions(ahead_months, since=oldest)
+
+        cursor.execute(f'INSERT INTO {TABLE} SELECT * FROM {legacy}')
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence('{TABLE}', 'id'), "
+            f"COALESCE((SELECT MAX(id) FROM {TABLE}), 1), (SELECT MAX(id) FROM {TABLE}) IS NOT NULL)"
+        )
+        cursor.execute(f'DROP TABLE {legacy}')
+        # 原表删除后主键和索引才能沿用原来的名称
+        cursor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_pkey PRIMARY KEY (id, upload_time)')
+        for definition in index_definitions:
+            cursor.execute(definition)
+        cursor.execute(f'ANALYZE {TABLE}')
+    return len(created)
+
+
+def _index_state(cursor, name):
+    """索引是否存在、是否有效：返回 None（不存在）、True 或 False（CONCURRENTLY 创建中途失败留下的无效索引）"""
+    cursor.execute('SELECT i.indisvalid FROM pg_index i WHERE i.indexrelid = to_regclass(%s)', [name])
+    row = cursor.fetchone()
+    return None if row is None else row[0]
+
+
+def create_index_concurrently(name, using):
+    """
+    在 computers_computer 上创建索引而不阻塞写入，已存在时跳过；需要在事务外调用
+
+    using 为 CREATE INDEX 中 USING 开始的部分。分区表不支持 CREATE INDEX CONCURRENTLY：
+    先在分区表上创建 ON ONLY 索引（暂时无效），再逐个分区 CONCURRENTLY 创建并挂载，
+    全部分区挂载后分区表上的索引自动变为有效，之后新建的分区会自动创建该索引。
+    """
+    with connection.cursor() as cursor:
+        if not is_partitioned():
+            if _index_state(cursor, name) is False:
+                cursor.execute(f'DROP INDEX CONCURRENTLY {name}')
+            cursor.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {TABLE} {using}')
+            return
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON ONLY {TABLE} {using}')
+        for partition, _, _ in list_partitions():
+            child = f'{partition}_{name}'
+            if _index_state(cursor, child) is False:
+                cursor.execute(f'DROP INDEX CONCURRENTLY {child}')
+            cursor.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {child} ON {partition} {using}')
+            cursor.execute(
+                'SELECT 1 FROM pg_inherits WHERE inhrelid = to_regclass(%s) AND inhparent = to_regclass(%s)',
+                [child, name],
+            )
+            if cursor.fetchone() is None:
+                cursor.execute(f'ALTER INDEX {name} ATTACH PARTITION {child}')
+
+
+def drop_index_concurrently(name):
+    """删除 computers_computer 上的索引而不阻塞读写，不存在时跳过；需要在事务外调用
+
+    分区表上的索引不能 CONCURRENTLY 删除，只能普通删除（短暂锁表）。
+    """
+    with connection.cursor() as cursor:
+        concurrently = '' if is_partitioned() else 'CONCURRENTLY '
+        cursor.execute(f'DROP INDEX {concurrently}IF EXISTS {name}')
+
+
+def partitions_older_than(months):
+    """上界早于 months 个月前的月初的分区名列表（即整个分区都已超过保留期）"""
+    cutoff = add_months(month_start(timezone.now()), -months)
+    return [
+        name for name, _, _ in list_partitions()
+        if (month := partition_month(name)) is not None and add_months(month, 1) <= cutoff
+    ]
+
+
+def detach_partition(name, drop=False):
+    """
+    卸载一个分区，返回其中的记录数
+
+    卸载后分区中的记录不再出现在 Computer 中：同时删除这些记录的日志侧表行和变化事件、扣减筛选项计数。
+    drop=False 时分区改名为 computers_computer_archive_pYYYYMM 保留在数据库中（可用 pg_dump 归档），
+    drop=True 时直接删除。分区中有计算机的当前记录时拒绝卸载（这些计算机很久没有变化，
+    需要等它们的信息变化产生新记录后才能卸载）。
+    """
+    if partition_month(name) is None:
+        raise PartitionError(f'{name} 不是按月分区')
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT COUNT(*) FROM computers_currentcomputer cc JOIN {name} p ON p.id = cc.computer_id'
+        )
+        current = cursor.fetchone()[0]
+        if current:
+            raise PartitionError(f'{name} 中有 {current} 台计算机的当前记录，不能卸载')
+
+        cursor.execute(f'ALTER TABLE {TABLE} DETACH PARTITION {name}')
+        for table, column in DEPENDENT_TABLES:
+            cursor.execute(f'DELETE FROM {table} WHERE {column} IN (SELECT id FROM {name})')
+
+        counts = {}
+        for dimension in FACET_DIMENSIONS:
+            cursor.execute(f'SELECT {dimension}, COUNT(*) FROM {name} GROUP BY {dimension}')
+            for value, n in cursor.fetchall():
+                key = (dimension, facet_value(dimension, value))
+                counts[key] = counts.get(key, 0) + n
+        remove_history_counts(counts)
+        data_version.touch()
+
+        cursor.execute(f'SELECT COUNT(*) FROM {name}')
+        rows = cursor.fetchone()[0]
+        if drop:
+            cursor.execute(f'DROP TABLE {name}')
+        else:
+            cursor.execute(f'ALTER TABLE {name} RENAME TO {ARCHIVE_PREFIX}{name[len(PARTITION_PREFIX):]}')
+    return rows
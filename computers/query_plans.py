@@ -0,0 +1,196 @@
+"""
+热点查询的执行计划检查（check_query_plans 命令，仅 PostgreSQL）
+
+列表页、列表 API、详情、变化事件接口、机队分布和维护命令的查询都由这里按与视图相同的代码路径构造，
+逐个执行 EXPLAIN (ANALYZE, FORMAT JSON)，检查两点：
+- 没有对 Computer（含各分区）和 ChangeEvent 的大范围顺序扫描；搜索必须使用 pg_trgm 索引
+- 实际执行时间不超过预算
+
+可以先在同一个事务内生成一批合成数据（结束后回滚，不会留在数据库中），
+用于在开发环境或新部署上检查索引是否和查询匹配。
+"""
+from datetime import timedelta
+
+from django.db import connection
+from django.utils import timezone
+
+from .changes import CHANGE_FIELDS
+from .filters import filter_changes, filter_computers
+from .models import ChangeEvent, Computer, CurrentComputer
+from .pagination import _older_than, encode_cursor
+from .partitioning import TABLE
+from .rollups import distribution_query
+from .search import _trigram_available, search_computers
+
+SEED_PREFIX = 'PLANCHECK-'
+
+# 必须使用特定索引的查询：{名称: 索引名后缀}
+REQUIRED_INDEXES = {'搜索': '_trgm'}
+
+
+def seed_synthetic(rows, assets):
+    """
+    生成 rows 条合成记录（assets 台计算机，上传时间分布在最近一年内），以及对应的当前状态和变化事件
+
+    需要在事务内调用，由调用方回滚。
+    """
+    span = 365 * 86400.0 / max(rows, 1)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {TABLE} (
+                asset_code, sn_code, model, device_type, cpu_model, memory_size,
+                os_version, os_internal_version, user_name, computer_name,
+                log_size, log_stored_size, has_errors, fingerprint, uploader, upload_time, last_update
+            )
+            SELECT
+                %(prefix)s || lpad((g %% %(assets)s)::text, 6, '0'),
+                'SN' || (g %% %(assets)s),
+                (ARRAY['OptiPlex 7090', 'ThinkCentre M70q', 'EliteDesk 800 G6', 'Latitude 5420'])[1 + g %% 4],
+                (ARRAY['Desktop', 'Laptop', 'Notebook', 'Mini PC', 'Workstation'])[1 + g %% 5],
+                (ARRAY['Intel Core i5-10500', 'Intel Core i7-11700', 'AMD Ryzen 5 5600G'])[1 + g %% 3],
+                (ARRAY[8, 16, 32])[1 + (g / %(assets)s) %% 3],
+                (ARRAY['Windows 10 专业版', 'Windows 11 专业版'])[1 + (g / %(assets)s) %% 2],
+                '19045.' || (g %% 100),
+                'user' || (g %% (%(assets)s * 2)),
+                'PC-' || (g %% %(assets)s),
+                0, 0, g %% 50 = 0, md5(g::text), 'PlanCheck',
+                now() - make_interval(secs => (%(rows)s - g) * %(span)s),
+                now() - make_interval(secs => (%(rows)s - g) * %(span)s)
+            FROM generate_series(1, %(rows)s) AS g
+            """,
+            {'prefix': SEED_PREFIX, 'assets': assets, 'rows': rows, 'span': span},
+        )
+        cursor.execute(
+            f"""
+            INSERT INTO {CurrentComputer._meta.db_table} (asset_code, computer_id, upload_time, fingerprint, last_seen, seen_count)
+            SELECT DISTINCT ON (asset_code) asset_code, id, upload_time, fingerprint, upload_time, 1
+            FROM {TABLE} WHERE asset_code LIKE %s ORDER BY asset_code, id DESC
+            ON CONFLICT (asset_code) DO NOTHING
+            """,
+            [SEED_PREFIX + '%'],
+        )
+        # 大约每 20 条记录有一个字段变化
+        cursor.execute(
+            f"""
+            INSERT INTO {ChangeEvent._meta.db_table} (computer_id, asset_code, field, old_value, new_value, changed_at)
+            SELECT id, asset_code, (%s::text[])[1 + id %% %s], 'old', 'new', upload_time
+            FROM {TABLE} WHERE asset_code LIKE %s AND id %% 20 = 0
+            """,
+            [list(CHANGE_FIELDS), len(CHANGE_FIELDS), SEED_PREFIX + '%'],
+        )
+        for model in (Computer, CurrentComputer, ChangeEvent):
+            cursor.execute(f'ANALYZE {model._meta.db_table}')
+
+
+def hot_queries():
+    """返回 [(名称, queryset), ...]：与各视图相同方式构造的查询"""
+    sample = Computer.objects.order_by('-upload_time', '-id').values(
+        'id', 'asset_code', 'device_type', 'upload_time'
+    ).first()
+    if sample is None:
+        return []
+    recent = timezone.localdate() - timedelta(days=7)
+    page = ('-upload_time', '-id')
+    asset_codes = list(
+        CurrentComputer.objects.order_by('asset_code').values_list('asset_code', flat=True)[:100]
+    )
+
+    def listing(params):
+        return filter_computers(Computer.objects.all(), params).order_by(*page)[:21]
+
+    queries = [
+        ('列表页第一页', listing({})),
+        ('列表页：仅最新状态', listing({'scope': 'current'})),
+        ('列表页：有错误', listing({'has_errors': 'true'})),
+        ('列表页：设备类型', listing({'device_type': sample['device_type']})),
+        ('列表页：最近 7 天上传', listing({'upload_from': str(recent)})),
+        ('列表页：最近 7 天内存有变化', listing({'changed_field': 'memory_size', 'upload_from': str(recent)})),
+        ('列表 API：游标翻页', Computer.objects.filter(
+            _older_than(encode_cursor(sample['upload_time'], sample['id']))).order_by(*page)[:101]),
+        ('列表 API：单台计算机的历史', Computer.objects.filter(
+            asset_code=sample['asset_code']).order_by(*page)[:101]),
+        ('详情', Computer.objects.filter(pk=sample['id'])),
+        ('变化事件 API：按字段和日期', filter_changes(
+            ChangeEvent.objects.all(), {'field': 'memory_size,cpu_model', 'changed_from': str(recent)}
+        ).order_by('-changed_at', '-id')[:101]),
+        ('compact_history：逐台读取历史', Computer.objects.filter(
+            asset_code__in=asset_codes).order_by('asset_code', 'upload_time', 'id').values('id', 'upload_time')),
+        ('机队分布：某一天的 CPU 型号分布', distribution_query('cpu_model', timezone.localdate())),
+    ]
+    if _trigram_available():
+        queries.append(('搜索', search_computers(Computer.objects.all(), sample['asset_code'][-4:])[:20]))
+    return queries
+
+
+def explain(queryset):
+    """执行 EXPLAIN (ANALYZE, FORMAT JSON)，返回顶层的计划字典（含 Plan 和 Execution Time）"""
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (ANALYZE, FORMAT JSON) {sql}', params)
+        result = cursor.fetchone()[0]
+    return result[0]
+
+
+def _nodes(plan):
+    yield plan
+    for child in plan.get('Plans', ()):
+        yield from _nodes(child)
+
+
+def _checked_table(relation):
+    """需要避免顺序扫描的表：Computer（含分区）和 ChangeEvent"""
+    return (
+        relation == TABLE or relation.startswith(f'{TABLE}_p') or relation == f'{TABLE}_default'
+        or relation == ChangeEvent._meta.db_table
+    )
+
+
+def analyze_plan(result, max_seq_rows):
+    """
+    检查一个执行计划，返回 (使用的索引, 问题列表)
+
+    顺序扫描读取的行数（返回的行数加上被过滤掉的行数，乘以循环次数）超过 max_seq_rows 时记为问题；
+    很小的表或分区（例如空的默认分区）上的顺序扫描不算。
+    """
+    indexes = []
+    problems = []
+    for node in _nodes(result['Plan']):
+        if node.get('Index Name') and node['Index Name'] not in indexes:
+            indexes.append(node['Index Name'])
+        relation = node.get('Relation Name', '')
+        if node['Node Type'] == 'Seq Scan' and _checked_table(relation):
+            scanned = (node.get('Actual Rows', 0) + node.get('Rows Removed by Filter', 0)) * node.get('Actual Loops', 1)
+            if scanned > max_seq_rows:
+                problems.append(f'顺序扫描 {relation}（{scanned} 行）')
+    return indexes, problems
+
+
+def _parent_indexes(names):
+    """分区上的索引换成分区表上对应的索引名（即模型中定义的名称），其他索引名不变"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT c.relname, p.relname FROM pg_inherits i '
+            'JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent '
+            'WHERE c.relname = ANY(%s)',
+            [list(names)],
+        )
+        parents = dict(cursor.fetchall())
+    return list(dict.fromkeys(parents.get(name, name) for name in names))
+
+
+def check_plans(budget_ms, max_seq_rows):
+    """检查全部热点查询，返回 [(名称, 执行时间毫秒, 使用的索引, 问题列表), ...]"""
+    results = []
+    for name, queryset in hot_queries():
+        result = explain(queryset)
+        elapsed = result['Execution Time']
+        indexes, problems = analyze_plan(result, max_seq_rows)
+        indexes = _parent_indexes(indexes)
+        suffix = REQUIRED_INDEXES.get(name)
+        if suffix and not any(index.endswith(suffix) for index in indexes):
+            problems.append(f'没有使用 *{suffix} 索引')
+        if elapsed > budget_ms:
+            problems.append(f'执行时间 {elapsed:.1f}ms 超过预算 {budget_ms}ms')
+        results.append((name, elapsed, indexes, problems))
+    return results
@@ -0,0 +1,132 @@
+"""
+历史记录保留策略（compact_history 命令）
+
+按资产编码逐台检查历史记录（按 upload_time 排序），以下记录保留，其余删除：
+- 每一次变化：快照指纹与前一条记录不同的记录
+- 带错误的记录，以及每台计算机的当前记录
+- 最近 daily_days 天内每天的第一条记录，更早的每月第一条记录
+
+另外，上传时间早于 log_days 天的记录一律删除执行日志（记录本身按上面的规则保留）。
+
+每批只处理少量计算机、每批一个短事务，批与批之间暂停，可以在业务运行期间执行，
+不会长时间持锁，也不会在主从复制中产生大的延迟。处理进度保存在 MaintenanceState 中，
+中断后再次运行从断点继续。
+"""
+import time
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import data_version
+from .facets import FACET_DIMENSIONS, remove_history
+from .ingest import FINGERPRINT_FIELDS, fingerprint_values
+from .models import Computer, ComputerLog, CurrentComputer, MaintenanceState
+
+STATE_NAME = 'compact_history'
+
+_COLUMNS = ['id', 'asset_code', 'upload_time'] + sorted(set(FINGERPRINT_FIELDS) | set(FACET_DIMENSIONS))
+
+
+def select_deletions(rows, current_ids, daily_cutoff):
+    """
+    按保留策略挑出可以删除的记录
+
+    rows 为按 (asset_code, upload_time, id) 排序的记录字典，必须包含每台计算机的全部历史。
+    只删除与前一条记录内容相同、且所在的天（daily_cutoff 之后）或月（之前）已有保留记录的记录，
+    因此重复执行结果不变。
+    """
+    deletions = []
+    asset_code = None
+    for row in rows:
+        if row['asset_code'] != asset_code:
+            asset_code = row['asset_code']
+            previous = None
+            kept_buckets = set()
+        fingerprint = fingerprint_values(row[field] for field in FINGERPRINT_FIELDS)
+        changed = fingerprint != previous
+        previous = fingerprint
+
+        local_time = timezone.localtime(row['upload_time'])
+        if row['upload_time'] >= daily_cutoff:
+            bucket = local_time.date()
+        else:
+            bucket = (local_time.year, local_time.month)
+
+        if changed or row['has_errors'] or row['id'] in current_ids or bucket not in kept_buckets:
+            kept_buckets.add(bucket)
+        else:
+            deletions.append(row)
+    return deletions
+
+
+def load_state():
+    """读取上次的处理进度"""
+    state = MaintenanceState.objects.filter(name=STATE_NAME).values_list('state', flat=True).first()
+    return state or {}
+
+
+def save_state(state):
+    MaintenanceState.objects.update_or_create(name=STATE_NAME, defaults={'state': state})
+
+
+def compact_batch(after, batch_size, daily_days, dry_run=False):
+    """
+    处理资产编码大于 after 的下一批计算机（最多 batch_size 台）
+
+    返回 (本批最后一个资产编码, 检查的记录数, 删除的记录数)；没有更多计算机时资产编码为 None。
+    删除记录、扣减筛选项计数和保存进度在同一个事务内完成。
+    """
+    asset_codes = list(
+        CurrentComputer.objects.filter(asset_code__gt=after or '')
+        .order_by('asset_code')
+        .values_list('asset_code', flat=True)[:batch_size]
+    )
+    if not asset_codes:
+        return None, 0, 0
+
+    daily_cutoff = timezone.now() - timedelta(days=daily_days)
+    with transaction.atomic():
+        current_ids = set(
+            CurrentComputer.objects.filter(asset_code__in=asset_codes).values_list('computer_id', flat=True)
+        )
+        rows = list(
+            Computer.objects.filter(asset_code__in=asset_codes)
+            .order_by('asset_code', 'upload_time', 'id')
+            .values(*_COLUMNS)
+        )
+        deletions = select_deletions(rows, current_ids, daily_cutoff)
+        if deletions and not dry_run:
+            Computer.objects.filter(id__in=[row['id'] for row in deletions]).delete()
+            remove_history(deletions)
+            data_version.touch()
+        if not dry_run:
+            state = load_state()
+            state['after'] = asset_codes[-1]
+            state['deleted'] = state.get('deleted', 0) + len(deletions)
+            save_state(state)
+    return asset_codes[-1], len(rows), len(deletions)
+
+
+def drop_old_logs(log_days, batch_size, sleep=0.0, dry_run=False):
+    """
+    删除上传时间早于 log_days 天的记录的执行日志，返回处理的记录数
+
+    错误日志保留；没有错误日志的侧表行整行删除。不再被引用的 LogBlob 由 delete_orphan_blobs 清理。
+    """
+    cutoff = timezone.now() - timedelta(days=log_days)
+    logs = ComputerLog.objects.filter(computer__upload_time__lt=cutoff, execution_log_blob__isnull=False)
+    if dry_run:
+        return logs.count()
+
+    total = 0
+    while True:
+        ids = list(logs.order_by('computer_id').values_list('computer_id', flat=True)[:batch_size])
+        if not ids:
+            return total
+        with transaction.atomic():
+            ComputerLog.objects.filter(computer_id__in=ids, error_log__isnull=True).delete()
+            ComputerLog.objects.filter(computer_id__in=ids).update(execution_log_blob=None)
+            Computer.objects.filter(id__in=ids).update(log_stored_size=0, last_update=timezone.now())
+        total += len(ids)
+        time.sleep(sleep)
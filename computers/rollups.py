@@ -0,0 +1,160 @@
+"""
+机队分布每日汇总（DailyRollup）的维护和读取
+
+每台计算机按其最新记录计入分布，入库时增量更新（见 computers.ingest）：
+新记录的取值在其上传日期 +1，被它取代的上一条记录的取值在同一天 -1；有错误的记录同时计入 with_errors。
+与筛选项计数一样，变化量在入库事务提交之后才单独写入，当天的汇总行不会让并发入库互相等待。
+某一天的分布是该天及之前各天变化量之和，读取的行数只与天数和取值个数有关，与历史记录总数无关。
+
+未变化的提交（去重）不改变分布。计数出现偏差，或需要按保留下来的历史记录重新生成时，
+使用 recompute_rollups 命令。
+"""
+from collections import defaultdict
+from functools import partial
+
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from . import data_version
+from .models import Computer, DailyRollup
+
+# 汇总的维度（均为 Computer 的字段）
+ROLLUP_DIMENSIONS = ('os_internal_version', 'cpu_model', 'memory_size', 'model')
+# 计算变化量需要读取的字段
+ROLLUP_FIELDS = ROLLUP_DIMENSIONS + ('has_errors',)
+
+
+def rollup_value(value):
+    """把字段值转换为 DailyRollup.value 中保存的字符串"""
+    return '' if value is None else str(value)
+
+
+def _add(deltas, day, values, sign):
+    for dimension in ROLLUP_DIMENSIONS:
+        delta = deltas[(dimension, day, rollup_value(values[dimension]))]
+        delta[0] += sign
+        if values['has_errors']:
+            delta[1] += sign
+
+
+def update_rollups(computers, previous_state):
+    """
+    根据新写入的记录更新每日汇总
+
+    previous_state 为 current_state.lock_current_state(..., ROLLUP_FIELDS) 的返回值，
+    被替换的上一条记录的取值从中读取。与 facets.update_facets 一样在入库事务内调用，事务提交后写入。
+    """
+    deltas = defaultdict(lambda: [0, 0])
+    previous = {}
+    for computer in computers:
+        day = timezone.localdate(computer.upload_time)
+        before = previous.get(computer.asset_code) or previous_state.get(computer.asset_code)
+        if before is not None:
+            _add(deltas, day, before, -1)
+        current = {field: getattr(computer, field) for field in ROLLUP_FIELDS}
+        _add(deltas, day, current, 1)
+        previous[computer.asset_code] = current
+    transaction.on_commit(partial(_apply_deltas, deltas), robust=True)
+
+
+def _apply_deltas(deltas):
+    # 与筛选项计数相同：按固定顺序更新，避免并发事务互相等待对方持有的行锁
+    rows = sorted(
+        (dimension, connection.ops.adapt_datefield_value(day), value, machines, with_errors)
+        for (dimension, day, value), (machines, with_errors) in deltas.items() if machines or with_errors
+    )
+    if not rows:
+        return
+    table = connection.ops.quote_name(DailyRollup._meta.db_table)
+    placeholders = ', '.join(['(%s, %s, %s, %s, %s)'] * len(rows))
+    sql = (
+        f'INSERT INTO {table} (dimension, day, value, machines, with_errors) VALUES {placeholders} '
+        f'ON CONFLICT (dimension, day, value) DO UPDATE SET '
+        f'machines = {table}.machines + EXCLUDED.machines, with_errors = {table}.with_errors + EXCLUDED.with_errors'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [param for row in rows for param in row])
+
+
+def distribution_query(dimension, day):
+    """某一天结束时各取值的 (取值, 台数, 有错误的台数)，按 (dimension, day, value) 唯一索引读取"""
+    return (
+        DailyRollup.objects.filter(dimension=dimension, day__lte=day)
+        .values('value')
+        .annotate(total=Sum('machines'), errors=Sum('with_errors'))
+        .filter(total__gt=0)
+        .values_list('value', 'total', 'errors')
+    )
+
+
+def distribution(dimension, day):
+    """某一天结束时的分布，返回 {取值: (计算机台数, 有错误的台数)}，只包含台数大于 0 的取值"""
+    return {value: (total, errors) for value, total, errors in distribution_query(dimension, day)}
+
+
+def _sort_key(dimension, value, machines):
+    if dimension == 'memory_size':
+        # 内存按容量从小到大排列（直方图）
+        return (0, int(value)) if value.isdigit() else (1, value)
+    return (-machines, value)
+
+
+def rollup_report(dimensions, day, compare_day):
+    """
+    各维度在 day 的分布，以及与 compare_day 相比的变化
+
+    返回 {维度: {'total', 'with_errors', 'values': [{'value', 'machines', 'share', 'with_errors',
+    'error_rate', 'change'}, ...]}}；每个维度读取两次汇总表。
+    """
+    report = {}
+    for dimension in dimensions:
+        current = distribution(dimension, day)
+        before = distribution(dimension, compare_day)
+        total = sum(machines for machines, _ in current.values())
+        values = []
+        for value, (machines, with_errors) in current.items():
+            values.append({
+                'value': value,
+                'machines': machines,
+                'share': round(machines / total, 4),
+                'with_errors': with_errors,
+                'error_rate': round(with_errors / machines, 4),
+                'change': machines - before.get(value, (0, 0))[0],
+            })
+        values.sort(key=lambda row: _sort_key(dimension, row['value'], row['machines']))
+        report[dimension] = {
+            'total': total,
+            'with_errors': sum(with_errors for _, with_errors in current.values()),
+            'values': values,
+        }
+    return report
+
+
+def recompute_rollups(batch_size=2000):
+    """
+    根据历史记录重新生成全部每日汇总，返回写入的行数
+
+    按资产编码和 id 顺序读取一遍 Computer（服务器端游标，内存占用恒定）。
+    历史记录被 compact_history 压缩或分区被卸载后，更早日期的分布只反映保留下来的记录。
+    """
+    deltas = defaultdict(lambda: [0, 0])
+    rows = Computer.objects.order_by('asset_code', 'id').values_list('asset_code', 'upload_time', *ROLLUP_FIELDS)
+    with transaction.atomic():
+        previous_asset_code, previous = None, None
+        for asset_code, upload_time, *values in rows.iterator(chunk_size=batch_size):
+            day = timezone.localdate(upload_time)
+            current = dict(zip(ROLLUP_FIELDS, values))
+            if asset_code == previous_asset_code:
+                _add(deltas, day, previous, -1)
+            _add(deltas, day, current, 1)
+            previous_asset_code, previous = asset_code, current
+        rollups = [
+            DailyRollup(day=day, dimension=dimension, value=value, machines=machines, with_errors=with_errors)
+            for (dimension, day, value), (machines, with_errors) in deltas.items() if machines or with_errors
+        ]
+        DailyRollup.objects.all().delete()
+        DailyRollup.objects.bulk_create(rollups, batch_size=batch_size)
+        # 汇总接口的 ETag 基于数据版本
+        data_version.touch()
+    return len(rollups)
@@ -0,0 +1,63 @@
+"""
+计算机记录的搜索
+
+PostgreSQL 上通过 pg_trgm 的 GIN 索引（见迁移 0019）加速 icontains（'%关键字%'）匹配，
+并按三元组相似度排序；其他数据库（如测试用的 SQLite）或未安装 pg_trgm 时
+退化为普通的 icontains 查询，按“完全匹配 > 前缀匹配 > 包含”排序。
+"""
+from functools import lru_cache
+
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.functions import Greatest
+
+# 参与搜索的字段，迁移 0019 为每个字段建立了三元组索引（TRGM_INDEXES）
+SEARCH_FIELDS = ['asset_code', 'user_name', 'computer_name', 'model', 'sn_code']
+
+# 三元组索引：{索引名: USING 部分}。icontains 在 PostgreSQL 上生成 UPPER("字段"::text) LIKE UPPER(...)，
+# 索引必须建立在同样的表达式上规划器才会使用（check_query_plans 检查搜索使用了 *_trgm 索引）
+TRGM_INDEXES = {
+    f'computer_{field}_upper_trgm': f'USING gin ((UPPER({field}::text)) gin_trgm_ops)' for field in SEARCH_FIELDS
+}
+
+
+@lru_cache(maxsize=1)
+def _trigram_available():
+    """当前数据库是否安装了 pg_trgm 扩展（每个进程只检查一次）"""
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+def search_filter(query):
+    """关键字匹配任一搜索字段的条件"""
+    condition = Q()
+    for field in SEARCH_FIELDS:
+        condition |= Q(**{f'{field}__icontains': query})
+    return condition
+
+
+def search_computers(queryset, query):
+    """
+    搜索计算机记录，返回按相关度（其次按上传时间）排序的 queryset
+
+    结果带有 rank 注解，数值越大越相关。
+    """
+    queryset = queryset.filter(search_filter(query))
+    if _trigram_available():
+        from django.contrib.postgres.search import TrigramWordSimilarity
+
+        rank = Greatest(*[TrigramWordSimilarity(query, field) for field in SEARCH_FIELDS])
+    else:
+        rank = Greatest(*[
+            Case(
+                When(**{f'{field}__iexact': query}, then=Value(3)),
+                When(**{f'{field}__istartswith': query}, then=Value(2)),
+                default=Value(1),
+                output_field=IntegerField(),
+            )
+            for field in SEARCH_FIELDS
+        ])
+    return queryset.annotate(rank=rank).order_by('-rank', '-upload_time', '-id')
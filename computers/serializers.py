@@ -1,9 +1,25 @@
 from rest_framework import serializers
-from .models import Computer
+from .ingest import save_records
+from .models import ChangeEvent, Computer
+
+
+# 体积较大的日志字段，列表类接口默认不返回
+LOG_FIELDS = ('execution_log', 'error_log')
 
 
 class ComputerSerializer(serializers.ModelSerializer):
-    """计算机序列化器"""
+    """计算机序列化器
+
+    支持通过 fields 参数只输出部分字段，例如：
+    ComputerSerializer(computers, many=True, fields=['id', 'asset_code'])
+    """
+    
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
     
     class Meta:
         model = Computer
@@ -11,9 +27,22 @@ class ComputerSerializer(serializers.ModelSerializer):
             'id', 'asset_code', 'sn_code', 'model', 'device_type',
             'cpu_model', 'memory_size', 'os_version', 'os_internal_version',
             'user_name', 'computer_name', 'execution_log', 'log_size',
-            'error_log', 'has_errors', 'uploader', 'upload_time', 'last_update'
+            'log_stored_size', 'error_log', 'has_errors', 'uploader',
+            'upload_time', 'last_update'
         ]
-        read_only_fields = ['id', 'upload_time', 'last_update']
+        read_only_fields = ['id', 'log_stored_size', 'upload_time', 'last_update']
+
+
+# 列表类接口的默认字段：除日志以外的全部字段
+LIST_DEFAULT_FIELDS = [f for f in ComputerSerializer.Meta.fields if f not in LOG_FIELDS]
+
+
+class ChangeEventSerializer(serializers.ModelSerializer):
+    """变化事件序列化器，computer 为变化后记录的 id"""
+    
+    class Meta:
+        model = ChangeEvent
+        fields = ['id', 'asset_code', 'field', 'old_value', 'new_value', 'changed_at', 'computer']
 
 
 class ComputerCreateSerializer(serializers.ModelSerializer):
@@ -35,12 +64,8 @@ class ComputerCreateSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         """
         每次提交都创建新记录，支持历史记录追踪
-        自动设置has_errors字段
+        自动设置has_errors字段（见 computers.ingest）
         """
-        # 如果有错误日志，自动设置has_errors为True
-        if validated_data.get('error_log'):
-            validated_data['has_errors'] = True
-        
         # 直接创建新记录，不检查是否已存在
-        computer = Computer.objects.create(**validated_data)
+        computer, = save_records([validated_data])
         return computer
@@ -0,0 +1,201 @@
+"""
+入库暂存区（write-behind spool）
+
+INGEST_MODE=spool 时，create_computer 校验通过后只把记录写入本地暂存目录就返回 202，
+由后台进程（drain_ingest_spool 命令）批量写入数据库。这样登录高峰期 Web 进程
+不会被数据库写入拖住，数据库变慢时客户端的提交耗时也基本不变。
+
+目录结构（INGEST_SPOOL_DIR 下）：
+- tmp/         正在写入的文件，写完 fsync 后原子改名到 incoming/
+- incoming/    等待入库的记录，每个请求一个 JSON 文件，文件名按接收时间排序
+- processing/  后台进程已认领、正在入库的记录
+- failed/      无法入库的记录（格式错误或校验失败），需要人工处理
+
+只应运行一个 drain_ingest_spool 进程：启动时会把 processing/ 中上次未完成的记录放回 incoming/。
+"""
+import json
+import logging
+import os
+import time
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DatabaseError, DataError, IntegrityError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .ingest import save_records
+from .serializers import ComputerCreateSerializer
+
+logger = logging.getLogger(__name__)
+
+INCOMING = 'incoming'
+PROCESSING = 'processing'
+FAILED = 'failed'
+TMP = 'tmp'
+
+
+def _spool_path(*parts):
+    return Path(settings.INGEST_SPOOL_DIR, *parts)
+
+
+def _ensure_dirs():
+    for name in (TMP, INCOMING, PROCESSING, FAILED):
+        _spool_path(name).mkdir(parents=True, exist_ok=True)
+
+
+def _fsync_dir(path):
+    # 改名后同步目录项，保证断电后文件仍然在 incoming/ 中（Windows 不支持，跳过）
+    if os.name != 'posix':
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def enqueue(record):
+    """
+    把一条校验通过的记录写入暂存区，返回暂存 ID
+
+    record 为 ComputerCreateSerializer 的 validated_data。文件先写入 tmp/ 并 fsync，
+    再原子改名到 incoming/，返回时记录已经落盘，不会出现写了一半的文件。
+    """
+    _ensure_dirs()
+    spool_id = f'{time.time_ns():020d}-{os.getpid()}-{uuid.uuid4().hex[:8]}'
+    payload = json.dumps(
+        {'received_at': timezone.now().isoformat(), 'record': record},
+        ensure_ascii=False,
+    ).encode('utf-8')
+
+    tmp_path = _spool_path(TMP, f'{spool_id}.json')
+    with open(tmp_path, 'wb') as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, _spool_path(INCOMING, f'{spool_id}.json'))
+    _fsync_dir(_spool_path(INCOMING))
+    return spool_id
+
+
+def recover_processing():
+    """把 processing/ 中上次未完成的记录放回 incoming/，返回放回的文件数"""
+    _ensure_dirs()
+    recovered = 0
+    for path in _spool_path(PROCESSING).glob('*.json'):
+        os.replace(path, _spool_path(INCOMING, path.name))
+        recovered += 1
+    return recovered
+
+
+def _claim(batch_size):
+    """按接收顺序认领最多 batch_size 个文件，移动到 processing/"""
+    names = sorted(entry.name for entry in os.scandir(_spool_path(INCOMING)) if entry.name.endswith('.json'))
+    claimed = []
+    for name in names[:batch_size]:
+        target = _spool_path(PROCESSING, name)
+        try:
+            os.replace(_spool_path(INCOMING, name), target)
+        except FileNotFoundError:
+            continue
+        claimed.append(target)
+    return claimed
+
+
+def _move_to_failed(path, reason):
+    logger.error('暂存记录无法入库，已移入 failed/: %s (%s)', path.name, reason)
+    os.replace(path, _spool_path(FAILED, path.name))
+    _spool_path(FAILED, f'{path.stem}.error.txt').write_text(str(reason), encoding='utf-8')
+
+
+def _load(path):
+    """读取并重新校验暂存文件，返回 (validated_data, received_at)"""
+    with open(path, encoding='utf-8') as f:
+        payload = json.load(f)
+    serializer = ComputerCreateSerializer(data=payload['record'])
+    if not serializer.is_valid():
+        raise ValueError(serializer.errors)
+    return serializer.validated_data, parse_datetime(payload['received_at'])
+
+
+def drain_batch(batch_size=None):
+    """
+    把一批暂存记录写入数据库，返回 (处理的文件数, 写入的记录数)
+
+    处理的文件数包括移入 failed/ 的文件，为 0 时暂存区已空；只看写入的记录数会在
+    一整批都无法解析时误以为暂存区已空。记录的 upload_time 使用服务器接收请求的时间，而不是入库的时间。
+    数据库不可用等错误（DatabaseError）时，已认领的文件放回 incoming/ 并重新抛出异常，下次重试；
+    个别记录违反数据库约束或入库时抛出其他异常时逐条写入，失败的记录移入 failed/，
+    不会因为一个有问题的文件让后台进程反复重启、每次都卡在同一个文件上。
+    """
+    batch_size = batch_size or settings.INGEST_BATCH_SIZE
+    _ensure_dirs()
+    paths = _claim(batch_size)
+    if not paths:
+        return 0, 0
+
+    loaded = []
+    for path in paths:
+        try:
+            loaded.append((path, *_load(path)))
+        except (ValueError, KeyError, TypeError) as e:
+            _move_to_failed(path, e)
+
+    try:
+        try:
+            save_records([record for _, record, _ in loaded], received_at=[t for _, _, t in loaded])
+        except (DataError, IntegrityError):
+            return len(paths), _save_one_by_one(loaded)
+        except DatabaseError:
+            raise
+        except Exception:
+            logger.exception('暂存记录批量入库失败，改为逐条写入')
+            return len(paths), _save_one_by_one(loaded)
+    except DatabaseError:
+        # 数据库不可用：放回 incoming/ 等待下次重试
+        for path in paths:
+            if path.exists():
+                os.replace(path, _spool_path(INCOMING, path.name))
+        raise
+
+    for path, _, _ in loaded:
+        path.unlink()
+    return len(paths), len(loaded)
+
+
+def _save_one_by_one(loaded):
+    """逐条写入，无法写入的记录移入 failed/，返回写入的记录数；数据库不可用时抛出 DatabaseError"""
+    saved = 0
+    for path, record, received_at in loaded:
+        try:
+            save_records([record], received_at=[received_at])
+        except (DataError, IntegrityError) as e:
+            _move_to_failed(path, e)
+        except DatabaseError:
+            raise
+        except Exception as e:
+            logger.exception('暂存记录入库失败: %s', path.name)
+            _move_to_failed(path, e)
+        else:
+            path.unlink()
+            saved += 1
+    return saved
+
+
+def spool_status():
+    """暂存区各目录的文件数，以及最早一条待入库记录已等待的秒数"""
+    _ensure_dirs()
+    status = {}
+    for name in (INCOMING, PROCESSING, FAILED):
+        status[name] = sum(1 for entry in os.scandir(_spool_path(name)) if entry.name.endswith('.json'))
+
+    oldest = min(
+        (entry.name for entry in os.scandir(_spool_path(INCOMING)) if entry.name.endswith('.json')),
+        default=None,
+    )
+    status['oldest_age_seconds'] = (
+        round((time.time_ns() - int(oldest.split('-', 1)[0])) / 1e9, 1) if oldest else 0
+    )
+    return status
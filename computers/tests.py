@@ -0,0 +1,133 @@
+"""
+computers 应用的测试（python manage.py test computers）
+
+- django_auth_ldap 兼容性：computers.ldap_backend 覆盖了私有类 _LDAPUser 的方法并读写其内部属性，
+  升级 django-auth-ldap 后这些签名或属性变化时，这里的检查会失败
+- 热点查询的执行计划（仅 PostgreSQL）：在合成数据上执行 check_query_plans 的检查
+"""
+import inspect
+from unittest import mock, skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django_auth_ldap import backend as upstream
+
+from computers.ldap_backend import PooledLDAPBackend, _PooledLDAPUser
+from computers.models import Computer
+from computers.query_plans import check_plans, hot_queries, seed_synthetic
+from computers.search import _trigram_available
+
+# _PooledLDAPUser 覆盖或调用的 _LDAPUser 方法及其签名
+LDAP_USER_SIGNATURES = {
+    '__init__': '(self, backend, username=None, user=None, request=None)',
+    'authenticate': '(self, password)',
+    'populate_user': '(self)',
+    'get_group_permissions': '(self)',
+    '_get_connection': '(self)',
+    '_bind': '(self)',
+    '_bind_as': '(self, bind_dn, bind_password, sticky=False)',
+    '_search_for_user_dn': '(self)',
+    '_authenticate_user_dn': '(self, password)',
+    '_get_or_create_user': '(self, force_populate=False)',
+    '_populate_user': '(self)',
+}
+
+# _PooledLDAPUser 读写的 _LDAPUser 实例属性
+LDAP_USER_ATTRIBUTES = (
+    'backend', 'settings', '_username', '_request', '_user', '_user_dn', '_user_attrs',
+    '_connection', '_connection_bound',
+)
+
+
+class DjangoAuthLdapCompatibilityTests(SimpleTestCase):
+    def test_overridden_method_signatures(self):
+        for name, expected in LDAP_USER_SIGNATURES.items():
+            with self.subTest(name):
+                self.assertEqual(str(inspect.signature(getattr(upstream._LDAPUser, name))), expected)
+
+    def test_backend_signatures(self):
+        self.assertEqual(
+            str(inspect.signature(upstream.LDAPBackend.get_or_build_user)), '(self, username, ldap_user)'
+        )
+        self.assertEqual(
+            str(inspect.signature(upstream._report_error)), '(sender, context, user, request, exception)'
+        )
+        self.assertTrue(hasattr(upstream._LDAPUser, 'AuthenticationFailed'))
+        self.assertIsInstance(inspect.getattr_static(upstream._LDAPUser, 'connection'), property)
+
+    def test_instance_attributes(self):
+        ldap_user = _PooledLDAPUser(PooledLDAPBackend(), username='zhangsan')
+        for name in LDAP_USER_ATTRIBUTES:
+            with self.subTest(name):
+                self.assertTrue(hasattr(ldap_user, name))
+
+
+class SaveChangedFieldsTests(TestCase):
+    """_get_or_create_user 同步属性后只保存有变化的字段"""
+
+    def _sync(self, **values):
+        def populate(ldap_user):
+            for name, value in values.items():
+                setattr(ldap_user._user, name, value)
+
+        ldap_user = _PooledLDAPUser(PooledLDAPBackend(), username='zhangsan')
+        with mock.patch.object(_PooledLDAPUser, '_populate_user', populate), \
+                CaptureQueriesContext(connection) as queries:
+            ldap_user._get_or_create_user(force_populate=True)
+        return ldap_user._user, [query['sql'] for query in queries if query['sql'].startswith('UPDATE')]
+
+    def test_unchanged_user_is_not_saved(self):
+        get_user_model().objects.create(username='zhangsan', first_name='三')
+        user, updates = self._sync(first_name='三')
+        self.assertEqual(updates, [])
+        self.assertNotIn('save', user.__dict__)
+
+    def test_only_changed_fields_are_saved(self):
+        get_user_model().objects.create(username='zhangsan', first_name='三', email='old@example.com')
+        user, updates = self._sync(first_name='三', email='new@example.com')
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"email"', updates[0])
+        self.assertNotIn('"first_name"', updates[0])
+        self.assertEqual(get_user_model().objects.get(username='zhangsan').email, 'new@example.com')
+        self.assertNotIn('save', user.__dict__)
+
+    def test_new_user_is_saved(self):
+        user, _ = self._sync(first_name='三')
+        self.assertIsNotNone(user.pk)
+
+
+@skipUnless(connection.vendor == 'postgresql', '执行计划检查只支持 PostgreSQL')
+class QueryPlanTests(TestCase):
+    # compact_history 每批读取 100 台计算机的历史，只占合成数据的 1%，应当走索引；
+    # 比例太大时（例如 2 万条记录、5000 台）顺序扫描本来就更便宜
+    SEED_ROWS = 50000
+    SEED_ASSETS = 10000
+
+    # 0017 的组合索引：{查询名称: 必须使用的索引}
+    EXPECTED_INDEXES = {
+        '列表页：有错误': 'computer_errors_upload_idx',
+        '列表 API：单台计算机的历史': 'computer_asset_upload_id_idx',
+        'compact_history：逐台读取历史': 'computer_asset_upload_id_idx',
+    }
+
+    def setUp(self):
+        seed_synthetic(self.SEED_ROWS, self.SEED_ASSETS)
+
+    def test_hot_queries_use_indexes(self):
+        results = {name: (indexes, problems) for name, elapsed, indexes, problems in check_plans(500.0, 10000)}
+        self.assertEqual(list(results), [name for name, queryset in hot_queries()])
+        self.assertEqual('搜索' in results, _trigram_available())
+        for name, (indexes, problems) in results.items():
+            with self.subTest(name):
+                self.assertEqual(problems, [])
+                if name in self.EXPECTED_INDEXES:
+                    self.assertIn(self.EXPECTED_INDEXES[name], indexes)
+
+    def test_search_requires_trgm_index(self):
+        # 搜索没有使用 *_trgm 索引时必须报告问题（不依赖 pg_trgm 是否安装）
+        queryset = Computer.objects.filter(pk__gt=0)[:20]
+        with mock.patch('computers.query_plans.hot_queries', return_value=[('搜索', queryset)]):
+            [(name, elapsed, indexes, problems)] = check_plans(500.0, 10000)
+        self.assertIn('没有使用 *_trgm 索引', problems)
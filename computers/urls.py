@@ -6,8 +6,12 @@ app_name = 'computers'
 urlpatterns = [
     path('', views.computer_list, name='computer_list'),
     path('search/', views.search, name='search'),
+    path('rollups/', views.fleet_dashboard, name='fleet_dashboard'),
     path('<int:pk>/', views.computer_detail, name='computer_detail'),
     path('login/', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
     path('health/', views.health_check, name='health_check'),
+    path('health/live/', views.liveness_check, name='liveness_check'),
+    path('health/ready/', views.readiness_check, name='readiness_check'),
+    path('metrics/', views.metrics_view, name='metrics'),
 ]
@@ -1,55 +1,63 @@
+import hmac
+from datetime import timedelta
+
 from django.shortcuts import render, get_object_or_404, redirect
-from django.core.paginator import Paginator
-from django.db.models import Q
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from .models import Computer
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from . import health, metrics
+from .changes import CHANGE_FIELDS
+from .facets import get_facets
+from .filters import filter_computers
+from .pagination import paginate_computers
+from .models import Computer, FacetCount
+from .rollups import ROLLUP_DIMENSIONS, rollup_report
+
+
+def _field_label(field):
+    return Computer._meta.get_field(field).verbose_name
 
 
 @login_required
 def computer_list(request):
     """计算机列表页"""
-    computers = Computer.objects.all()
-    
-    # 搜索功能
+    # 记录范围、搜索、设备类型、错误状态筛选
+    computers = filter_computers(Computer.objects.all(), request.GET)
     search_query = request.GET.get('search', '')
-    if search_query:
-        computers = computers.filter(
-            Q(asset_code__icontains=search_query) |
-            Q(user_name__icontains=search_query) |
-            Q(computer_name__icontains=search_query) |
-            Q(model__icontains=search_query) |
-            Q(sn_code__icontains=search_query)
-        )
-    
-    # 设备类型筛选
     device_type = request.GET.get('device_type')
-    if device_type:
-        computers = computers.filter(device_type=device_type)
-    
-    # 错误状态筛选
     has_errors = request.GET.get('has_errors')
-    if has_errors:
-        if has_errors == 'true':
-            computers = computers.filter(has_errors=True)
-        elif has_errors == 'false':
-            computers = computers.filter(has_errors=False)
+    scope = request.GET.get('scope', '')
     
-    # 分页
-    paginator = Paginator(computers, 20)  # 每页显示20条
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # 分页链接需要保留的筛选参数
+    filter_query = request.GET.copy()
+    for key in ('page', 'after', 'before'):
+        filter_query.pop(key, None)
     
-    # 获取筛选选项 - 使用set去重，因为PostgreSQL的distinct对TEXT字段可能不按预期工作
-    device_types = list(set(Computer.objects.values_list('device_type', flat=True)))
+    # 分页（每页显示20条；总数使用估算值或缓存，深分页改用游标）
+    pagination = paginate_computers(request, computers, per_page=20)
+    
+    # 筛选选项及各取值的记录数，读取入库时维护的筛选项计数表，不再扫描 Computer
+    facets = get_facets(FacetCount.SCOPE_CURRENT if scope == 'current' else FacetCount.SCOPE_HISTORY)
     
     context = {
-        'page_obj': page_obj,
+        **pagination,
         'search_query': search_query,
-        'device_types': device_types,
+        'device_types': facets['device_type'],
+        'os_versions': facets['os_version'],
+        'models': facets['model'],
+        'error_counts': dict(facets['has_errors']),
         'selected_device_type': device_type,
+        'selected_os_version': request.GET.get('os_version'),
+        'selected_model': request.GET.get('model'),
         'selected_has_errors': has_errors,
+        'selected_scope': scope,
+        'selected_upload_from': request.GET.get('upload_from', ''),
+        'selected_upload_to': request.GET.get('upload_to', ''),
+        'change_fields': [(field, _field_label(field)) for field in CHANGE_FIELDS],
+        'selected_changed_field': request.GET.get('changed_field', ''),
+        'filter_query': filter_query.urlencode(),
     }
     
     return render(request, 'computers/computer_list.html', context)
@@ -59,9 +67,15 @@ def computer_list(request):
 def computer_detail(request, pk):
     """计算机详情页"""
     computer = get_object_or_404(Computer, pk=pk)
+    # 与该计算机上一条记录相比的变化（入库时生成，见 computers.changes）
+    changes = [
+        (_field_label(event.field), event.old_value, event.new_value)
+        for event in computer.changes.order_by('id')
+    ]
     
     context = {
         'computer': computer,
+        'changes': changes,
     }
     
     return render(request, 'computers/computer_detail.html', context)
@@ -86,18 +100,56 @@ def search(request):
         computers = computers.filter(asset_code__icontains=search_params['asset_code'])
     
     # 分页
-    paginator = Paginator(computers, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    pagination = paginate_computers(request, computers, per_page=20)
+    filter_query = request.GET.copy()
+    for key in ('page', 'after', 'before'):
+        filter_query.pop(key, None)
     
     context = {
-        'page_obj': page_obj,
+        **pagination,
         'search_params': search_params,
+        'filter_query': filter_query.urlencode(),
     }
     
     return render(request, 'computers/search.html', context)
 
 
+def _parse_day(value):
+    try:
+        return parse_date(value or '')
+    except ValueError:
+        return None
+
+
+@login_required
+def fleet_dashboard(request):
+    """机队分布看板 - 操作系统内部版本、CPU、内存、型号的分布和各型号的错误率（读取每日汇总表）"""
+    day = _parse_day(request.GET.get('date')) or timezone.localdate()
+    compare_day = _parse_day(request.GET.get('compare')) or day - timedelta(days=7)
+    report = rollup_report(ROLLUP_DIMENSIONS, day, compare_day)
+    
+    sections = []
+    for dimension in ROLLUP_DIMENSIONS:
+        section = report[dimension]
+        sections.append({
+            **section,
+            'dimension': dimension,
+            'label': _field_label(dimension),
+            # 占比条按该维度台数最多的取值缩放
+            'top': max((row['machines'] for row in section['values']), default=0),
+        })
+    
+    context = {
+        'sections': sections,
+        'day': day,
+        'compare_day': compare_day,
+        'total': report[ROLLUP_DIMENSIONS[0]]['total'],
+        'total_with_errors': report[ROLLUP_DIMENSIONS[0]]['with_errors'],
+    }
+    
+    return render(request, 'computers/rollups.html', context)
+
+
 def login_view(request):
     """用户登录视图"""
     # 如果用户已登录，重定向到首页
@@ -136,23 +188,49 @@ def logout_view(request):
     return redirect('login')
 
 
+def metrics_view(request):
+    """运行指标端点 - Prometheus 文本格式，汇总所有 worker 进程的数据
+
+    默认关闭：没有配置 METRICS_TOKEN 时返回 404，配置后需要带 Authorization: Bearer <METRICS_TOKEN>。
+    """
+    from django.conf import settings
+    from django.http import HttpResponse
+    
+    if not settings.METRICS_TOKEN:
+        return HttpResponse(status=404)
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+    if not hmac.compare_digest(authorization.encode(), f'Bearer {settings.METRICS_TOKEN}'.encode()):
+        return HttpResponse(status=401)
+    return HttpResponse(metrics.render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def liveness_check(request):
+    """存活检查端点 - 不访问数据库，进程能响应即可"""
+    from django.http import JsonResponse
+    
+    return JsonResponse({'status': 'alive'})
+
+
+def readiness_check(request):
+    """就绪检查端点 - 数据库、迁移、目录等依赖的检查结果（缓存 HEALTH_CHECK_TTL 秒，见 computers.health）"""
+    from django.http import JsonResponse
+    
+    result = health.readiness()
+    return JsonResponse(result, status=200 if result['status'] == 'ready' else 503)
+
+
 def health_check(request):
-    """健康检查端点 - 用于 Docker 容器监控"""
+    """健康检查端点（兼容旧版本）- 与就绪检查共用缓存的结果"""
     from django.http import JsonResponse
-    from django.db import connection
     
-    try:
-        # 检查数据库连接
-        with connection.cursor() as cursor:
-            cursor.execute("SELECT 1")
-        
+    database = health.readiness()['checks']['database']
+    if database['ok']:
         return JsonResponse({
             'status': 'healthy',
             'database': 'connected'
         })
-    except Exception as e:
-        return JsonResponse({
-            'status': 'unhealthy',
-            'database': 'disconnected',
-            'error': str(e)
-        }, status=503)
\ No newline at end of file
+    return JsonResponse({
+        'status': 'unhealthy',
+        'database': 'disconnected',
+        'error': database['error']
+    }, status=503)
\ No newline at end of file
@@ -0,0 +1,34 @@
+"""
+gunicorn 配置（docker-compose.yml 和 benchmarks/run_local.sh 使用）
+
+    gunicorn -c docker/gunicorn.conf.py
+
+- SERVER_MODE=wsgi（默认）：同步 worker 运行 pc_info_record.wsgi，每个 worker 同时处理一个请求
+- SERVER_MODE=asgi：uvicorn worker 运行 pc_info_record.asgi，API 使用异步视图（API_ASYNC），
+  每个 worker 可以同时接收大量上传，同时访问数据库的请求数由 API_ASYNC_DB_CONCURRENCY 限制。
+  需要安装 uvicorn 和 uvicorn-worker（见 requirements.txt）
+
+其他环境变量：GUNICORN_BIND（默认 0.0.0.0:8000）、GUNICORN_WORKERS（默认 4）、GUNICORN_TIMEOUT（默认 120）
+"""
+import os
+
+server_mode = os.getenv('SERVER_MODE', 'wsgi').lower()
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', '4'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+accesslog = '-'
+errorlog = '-'
+
+if server_mode == 'asgi':
+    wsgi_app = 'pc_info_record.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    wsgi_app = 'pc_info_record.wsgi:application'
+
+
+def worker_exit(server, worker):
+    # worker 退出前写入最后一段时间内的运行指标
+    from computers import metrics
+
+    metrics.flush_on_exit()
@@ -0,0 +1,116 @@
+"""
+日志 handler
+
+请求线程只把日志记录放进内存队列（QueuedHandler），由每个进程中的后台线程
+（QueueListener）写入文件或控制台，磁盘变慢时不会拖住请求。
+写文件使用 ProcessSafeRotatingFileHandler，多个 gunicorn worker 写同一个文件时也能安全轮转。
+"""
+import atexit
+import os
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from django.utils.module_loading import import_string
+
+try:
+    import fcntl
+except ImportError:  # Windows 开发环境没有 fcntl，单进程运行不需要文件锁
+    fcntl = None
+
+
+class ProcessSafeRotatingFileHandler(RotatingFileHandler):
+    """
+    可被多个进程同时写入的按大小轮转的日志文件
+
+    轮转时持有文件锁，只有一个进程真正执行改名；其他进程发现文件已被轮转
+    （路径指向的 inode 与自己打开的不同）后重新打开新文件，而不是再轮转一次。
+    """
+
+    def __init__(self, filename, *args, **kwargs):
+        os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+        super().__init__(filename, *args, **kwargs)
+        self.lock_filename = f'{self.baseFilename}.lock'
+
+    def _rotated_by_other_process(self):
+        if self.stream is None:
+            return False
+        try:
+            return os.stat(self.baseFilename).st_ino != os.fstat(self.stream.fileno()).st_ino
+        except FileNotFoundError:
+            return True
+
+    def _reopen(self):
+        if self.stream is not None:
+            self.stream.close()
+        self.stream = self._open()
+
+    def emit(self, record):
+        if self._rotated_by_other_process():
+            self._reopen()
+        super().emit(record)
+
+    def doRollover(self):
+        if fcntl is None:
+            return super().doRollover()
+        with open(self.lock_filename, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                if self._rotated_by_other_process():
+                    self._reopen()
+                else:
+                    super().doRollover()
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class QueuedHandler(QueueHandler):
+    """
+    把日志记录放入有界内存队列，由后台线程交给 target 指定的 handler 输出
+
+    - target: handler 类的导入路径，其余关键字参数原样传给该类
+    - queue_size: 队列长度；队列满时丢弃日志（计入 dropped），不阻塞请求线程
+
+    后台线程在本进程第一次写日志时启动，因此 gunicorn --preload 先加载再 fork 也能正常工作。
+    """
+
+    def __init__(self, target='logging.StreamHandler', queue_size=10000, **target_kwargs):
+        super().__init__(queue.Queue(maxsize=queue_size))
+        self.target = import_string(target)(**target_kwargs)
+        self.dropped = 0
+        self._listener = None
+        self._listener_pid = None
+        self._listener_lock = threading.Lock()
+
+    def _ensure_listener(self):
+        if self._listener_pid == os.getpid():
+            return
+        with self._listener_lock:
+            if self._listener_pid == os.getpid():
+                return
+            self._listener = QueueListener(self.queue, self.target, respect_handler_level=True)
+            self._listener.start()
+            self._listener_pid = os.getpid()
+        # 进程退出前把队列中剩余的日志写完
+        atexit.register(self._stop_listener)
+
+    def _stop_listener(self):
+        if self._listener is not None and self._listener_pid == os.getpid():
+            self._listener.stop()
+            self._listener_pid = None
+
+    def enqueue(self, record):
+        self._ensure_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def setLevel(self, level):
+        super().setLevel(level)
+        self.target.setLevel(level)
+
+    def close(self):
+        self._stop_listener()
+        self.target.close()
+        super().close()
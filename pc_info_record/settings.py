@@ -3,6 +3,7 @@ Django settings for pc_info_record project.
 """
 
 import os
+import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -37,6 +38,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'computers.middleware.MetricsMiddleware',
+    'computers.middleware.RequestDecompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -78,6 +81,15 @@ DATABASES = {
     }
 }
 
+# DB_ENGINE=sqlite 时使用 SQLite 文件（DB_NAME 为文件路径），仅用于本地调试和基准测试（见 benchmarks/）
+if os.getenv('DB_ENGINE', 'postgresql') == 'sqlite':
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.getenv('DB_NAME', str(BASE_DIR / 'db.sqlite3')),
+        # 写事务开始时即获取写锁，并发写入时排队等待，而不是直接报 database is locked
+        'OPTIONS': {'timeout': 30, 'transaction_mode': 'IMMEDIATE'},
+    }
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -129,7 +141,104 @@ REST_FRAMEWORK = {
     ],
 }
 
+# 列表 API 分页配置（游标分页，每页条数有上限以保证响应时间和内存可控）
+API_PAGE_SIZE = int(os.getenv('API_PAGE_SIZE', '100'))
+API_MAX_PAGE_SIZE = int(os.getenv('API_MAX_PAGE_SIZE', '500'))
+
+# 列表、详情 API 已渲染响应的缓存时间（秒），0 表示不缓存（仍支持 ETag 条件请求）；
+# 缓存按数据版本区分，入库写入新记录后旧的缓存项不再使用
+API_RESPONSE_CACHE_TTL = int(os.getenv('API_RESPONSE_CACHE_TTL', '300'))
+
+# 列表 API 使用快速输出路径（直接由查询结果生成 JSON，输出与 ComputerSerializer 相同，见 api.fast_read）；
+# 设为 False 时改回 DRF 序列化器
+API_FAST_READ = os.getenv('API_FAST_READ', 'True').lower() == 'true'
+
+# 部署方式：wsgi（gunicorn 同步 worker，默认）或 asgi（gunicorn + uvicorn worker，见 docker/gunicorn.conf.py）
+SERVER_MODE = os.getenv('SERVER_MODE', 'wsgi').lower()
+
+# API 使用异步视图（见 api.async_views），默认在 asgi 部署时启用
+API_ASYNC = os.getenv('API_ASYNC', str(SERVER_MODE == 'asgi')).lower() == 'true'
+
+# 异步视图中每个 worker 进程同时执行的数据库操作数上限（其余请求在事件循环中排队），
+# 即每个 worker 最多占用的数据库连接数，worker 数乘以该值应小于 PostgreSQL 的 max_connections
+API_ASYNC_DB_CONCURRENCY = int(os.getenv('API_ASYNC_DB_CONCURRENCY', '16'))
+
+# 批量提交配置：单次请求最多记录数、每次 INSERT 的记录数
+API_BATCH_MAX_RECORDS = int(os.getenv('API_BATCH_MAX_RECORDS', '5000'))
+INGEST_BATCH_SIZE = int(os.getenv('INGEST_BATCH_SIZE', '500'))
+
+# 未变化的提交去重：与该计算机上一次状态相同（快照指纹一致、没有错误日志）时，
+# 不写入新的历史记录，只更新当前状态的最后上报时间和上报次数
+INGEST_DEDUP_ENABLED = os.getenv('INGEST_DEDUP_ENABLED', 'True').lower() == 'true'
+
+# 历史记录保留策略（compact_history 命令）：每一次变化都保留，最近 N 天每天保留一条、
+# 更早的每月保留一条；上传时间早于 N 天的记录删除执行日志（0 表示不删除）
+HISTORY_DAILY_DAYS = int(os.getenv('HISTORY_DAILY_DAYS', '30'))
+HISTORY_LOG_RETENTION_DAYS = int(os.getenv('HISTORY_LOG_RETENTION_DAYS', '180'))
+
+# Computer 表按 upload_time 按月分区（仅 PostgreSQL，见 computers.partitioning）：
+# - COMPUTER_PARTITIONING：为 True 时迁移 0014 把表转换为分区表（已迁移的系统用 manage_partitions --convert）
+# - COMPUTER_PARTITION_AHEAD_MONTHS：manage_partitions 提前创建的月份数
+# - COMPUTER_PARTITION_RETENTION_MONTHS：超过 N 个月的分区由 manage_partitions 卸载归档，0 表示不卸载
+COMPUTER_PARTITIONING = os.getenv('COMPUTER_PARTITIONING', 'False').lower() == 'true'
+COMPUTER_PARTITION_AHEAD_MONTHS = int(os.getenv('COMPUTER_PARTITION_AHEAD_MONTHS', '3'))
+COMPUTER_PARTITION_RETENTION_MONTHS = int(os.getenv('COMPUTER_PARTITION_RETENTION_MONTHS', '0'))
+
+# 客户端可以用 Content-Encoding: gzip / zstd 压缩提交的请求体，解压后的大小上限（字节）
+REQUEST_MAX_DECOMPRESSED_SIZE = int(os.getenv('REQUEST_MAX_DECOMPRESSED_SIZE', str(64 * 1024 * 1024)))
+
+# 入库模式：
+# - sync（默认）：create_computer 在请求内直接写入数据库，返回 201
+# - spool：校验后写入本地暂存目录并返回 202，由 drain_ingest_spool 命令在后台批量入库
+INGEST_MODE = os.getenv('INGEST_MODE', 'sync')
+INGEST_SPOOL_DIR = os.getenv('INGEST_SPOOL_DIR', str(BASE_DIR / 'spool'))
+
+# 执行日志压缩编码：zlib（默认）或 zstd（需要安装 zstandard）
+LOG_BLOB_CODEC = os.getenv('LOG_BLOB_CODEC', 'zlib')
+
+# 导出时每次从数据库游标读取（以及每次向客户端发送）的记录数
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', '2000'))
+
+# 缓存配置（默认进程内存缓存；多 worker 部署时可改为 Redis / Memcached 等共享缓存）
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'pc-info-record'),
+    }
+}
+
+# 网页列表分页配置
+# - 无筛选条件且表行数超过阈值时，总数使用 PostgreSQL 统计信息估算，不再执行 COUNT(*)
+# - 有筛选条件时的精确总数缓存一段时间（秒）
+# - 超过最大页码后改用游标翻页，避免深 OFFSET 查询
+PAGINATION_EXACT_COUNT_THRESHOLD = int(os.getenv('PAGINATION_EXACT_COUNT_THRESHOLD', '10000'))
+PAGINATION_COUNT_CACHE_TTL = int(os.getenv('PAGINATION_COUNT_CACHE_TTL', '60'))
+PAGINATION_MAX_PAGES = int(os.getenv('PAGINATION_MAX_PAGES', '50'))
+
+# 运行指标（/metrics/，Prometheus 文本格式）
+# 每个进程把指标定期写入 METRICS_DIR 下自己的文件，读取时合并，多个 gunicorn worker 的数据能正确汇总；
+# 访问 /metrics/ 需要带 Authorization: Bearer <METRICS_TOKEN>；METRICS_TOKEN 为空（默认）时 /metrics/ 返回 404
+METRICS_DIR = os.getenv('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'pc_info_record_metrics'))
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '1'))
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# 就绪检查（/health/ready/，见 computers.health）
+# - HEALTH_CHECK_TTL：检查结果在每个进程内缓存的秒数，期间的探测不访问数据库
+# - HEALTH_CHECK_LDAP：为 True 时就绪检查还包括能否连接 LDAP 服务器
+HEALTH_CHECK_TTL = float(os.getenv('HEALTH_CHECK_TTL', '10'))
+HEALTH_CHECK_LDAP = os.getenv('HEALTH_CHECK_LDAP', 'False').lower() == 'true'
+
 # 日志配置
+# 日志记录先放入内存队列，由每个进程的后台线程写出（见 pc_info_record.log_handlers），
+# 写日志不会阻塞请求线程；日志文件按大小轮转，多个 gunicorn worker 共用同一个文件
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOG_FILE_MAX_BYTES = int(os.getenv('LOG_FILE_MAX_BYTES', str(50 * 1024 * 1024)))
+LOG_FILE_BACKUP_COUNT = int(os.getenv('LOG_FILE_BACKUP_COUNT', '5'))
+LOG_HANDLERS = ['console'] if os.getenv('DOCKER_CONTAINER') else ['file']
+
+# 入库请求的逐字段详情日志（DEBUG 级别）的抽样比例，0 表示不记录，1 表示全部记录
+INGEST_LOG_SAMPLE_RATE = float(os.getenv('INGEST_LOG_SAMPLE_RATE', '0.01'))
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -141,35 +250,41 @@ LOGGING = {
     },
     'handlers': {
         'console': {
-            'class': 'logging.StreamHandler',
+            '()': 'pc_info_record.log_handlers.QueuedHandler',
+            'target': 'logging.StreamHandler',
             'formatter': 'verbose',
         },
         'file': {
-            'level': 'INFO',
-            'class': 'logging.FileHandler',
-            'filename': BASE_DIR / 'logs' / 'django.log',
+            '()': 'pc_info_record.log_handlers.QueuedHandler',
+            'target': 'pc_info_record.log_handlers.ProcessSafeRotatingFileHandler',
+            'level': LOG_LEVEL,
+            'filename': str(BASE_DIR / 'logs' / 'django.log'),
+            'maxBytes': LOG_FILE_MAX_BYTES,
+            'backupCount': LOG_FILE_BACKUP_COUNT,
+            'encoding': 'utf-8',
+            'delay': True,
             'formatter': 'verbose',
         },
     },
     'loggers': {
         'django': {
-            'handlers': ['console'] if os.getenv('DOCKER_CONTAINER') else ['file'],
+            'handlers': LOG_HANDLERS,
             'level': 'INFO',
             'propagate': True,
         },
         'django_auth_ldap': {
-            'handlers': ['console'] if os.getenv('DOCKER_CONTAINER') else ['file'],
+            'handlers': LOG_HANDLERS,
             'level': 'DEBUG',
             'propagate': True,
         },
         'api': {
-            'handlers': ['console'] if os.getenv('DOCKER_CONTAINER') else ['file'],
-            'level': 'DEBUG',
+            'handlers': LOG_HANDLERS,
+            'level': LOG_LEVEL,
             'propagate': True,
         },
         'computers': {
-            'handlers': ['console'] if os.getenv('DOCKER_CONTAINER') else ['file'],
-            'level': 'DEBUG',
+            'handlers': LOG_HANDLERS,
+            'level': LOG_LEVEL,
             'propagate': True,
         },
     },
@@ -184,7 +299,7 @@ from django_auth_ldap.config import LDAPSearch
 
 # 启用LDAP认证后端
 AUTHENTICATION_BACKENDS = [
-    'django_auth_ldap.backend.LDAPBackend',  # LDAP/AD认证
+    'computers.ldap_backend.PooledLDAPBackend',  # LDAP/AD认证（带连接池和缓存的 LDAPBackend）
     'django.contrib.auth.backends.ModelBackend',  # Django默认认证（用于超级用户）
 ]
 
@@ -200,7 +315,8 @@ AUTH_LDAP_BIND_PASSWORD = os.getenv('LDAP_BIND_PASSWORD', '')
 AUTH_LDAP_USER_SEARCH = LDAPSearch(
     os.getenv('LDAP_USER_BASE_DN', 'OU=myse,DC=dltornado2,DC=com'),
     ldap.SCOPE_SUBTREE,
-    "(sAMAccountName=%(user)s)"  # 使用Windows登录名搜索
+    # 默认使用Windows登录名搜索；用 OpenLDAP（slapd）测试时可改为 (uid=%(user)s)
+    os.getenv('LDAP_USER_FILTER', '(sAMAccountName=%(user)s)')
 )
 
 # 用户属性映射：将AD属性映射到Django用户模型
@@ -228,13 +344,23 @@ AUTH_LDAP_ALWAYS_UPDATE_USER = True
 # 允许创建新用户
 AUTH_LDAP_NO_NEW_USERS = False
 
-# 缓存LDAP查询结果（3600秒 = 1小时）
-AUTH_LDAP_CACHE_TIMEOUT = 3600
+# 缓存LDAP查询结果（3600秒 = 1小时）：用户的 DN 和映射的属性，缓存命中时登录只需要一次用户绑定
+AUTH_LDAP_CACHE_TIMEOUT = int(os.getenv('LDAP_CACHE_TIMEOUT', '3600'))
+
+# LDAP超时（秒）：连接超时和每次绑定 / 搜索的超时，AD 响应慢时登录最多等待这么久
+LDAP_CONNECT_TIMEOUT = float(os.getenv('LDAP_CONNECT_TIMEOUT', '3'))
+LDAP_TIMEOUT = float(os.getenv('LDAP_TIMEOUT', '5'))
+
+# LDAP连接池：每个进程保留的空闲连接数，以及空闲连接的最长保留时间（秒，应小于 AD 的 MaxConnIdleTime，默认 900 秒）
+LDAP_POOL_SIZE = int(os.getenv('LDAP_POOL_SIZE', '4'))
+LDAP_POOL_MAX_IDLE = int(os.getenv('LDAP_POOL_MAX_IDLE', '300'))
 
 # LDAP连接选项
 AUTH_LDAP_CONNECTION_OPTIONS = {
     ldap.OPT_DEBUG_LEVEL: 0,
     ldap.OPT_REFERRALS: 0,  # 不跟随引用
+    ldap.OPT_NETWORK_TIMEOUT: LDAP_CONNECT_TIMEOUT,
+    ldap.OPT_TIMEOUT: LDAP_TIMEOUT,
 }
 
 # 登录和登出URL配置
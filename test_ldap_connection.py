@@ -2,10 +2,16 @@
 """
 LDAP/Active Directory连接测试脚本
 用于验证LDAP配置是否正确
+
+也可以不进入交互菜单，直接测试连接池和缓存（例如对着本机的 slapd，
+设置 LDAP_SERVER_URI=ldap://127.0.0.1:389 和 LDAP_USER_FILTER='(uid=%(user)s)'）：
+
+    python test_ldap_connection.py --pool-test 用户名 密码 --rounds 5
 """
 
 import os
 import sys
+import time
 import django
 
 # 设置Django环境
@@ -13,10 +19,15 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pc_info_record.settings')
 django.setup()
 
 from django.contrib.auth import authenticate
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django_auth_ldap.backend import LDAPBackend
 from django.conf import settings
 import ldap
 
+from computers.ldap_backend import get_pool
+
 
 def print_header(text):
     """打印带格式的标题"""
@@ -34,6 +45,9 @@ def test_ldap_settings():
     print(f"✓ 用户搜索基准DN: {settings.AUTH_LDAP_USER_SEARCH.base_dn}")
     print(f"✓ 搜索过滤器: {settings.AUTH_LDAP_USER_SEARCH.filterstr}")
     print(f"✓ 认证后端: {settings.AUTHENTICATION_BACKENDS}")
+    print(f"✓ 超时: 连接 {settings.LDAP_CONNECT_TIMEOUT} 秒，绑定/搜索 {settings.LDAP_TIMEOUT} 秒")
+    print(f"✓ 连接池: 最多 {settings.LDAP_POOL_SIZE} 条空闲连接，空闲 {settings.LDAP_POOL_MAX_IDLE} 秒后丢弃")
+    print(f"✓ DN 和属性缓存: {settings.AUTH_LDAP_CACHE_TIMEOUT} 秒")
 
 
 def test_ldap_connection():
@@ -44,7 +58,8 @@ def test_ldap_connection():
         # 创建LDAP连接
         conn = ldap.initialize(settings.AUTH_LDAP_SERVER_URI)
         conn.set_option(ldap.OPT_REFERRALS, 0)
-        conn.set_option(ldap.OPT_NETWORK_TIMEOUT, 10.0)
+        conn.set_option(ldap.OPT_NETWORK_TIMEOUT, settings.LDAP_CONNECT_TIMEOUT)
+        conn.timeout = settings.LDAP_TIMEOUT
         
         print(f"✓ 连接到LDAP服务器: {settings.AUTH_LDAP_SERVER_URI}")
         
@@ -164,6 +179,47 @@ def test_authentication(username, password):
         return False
 
 
+def test_pooled_login(username, password, rounds=5):
+    """连续登录多次，检查连接复用、DN/属性缓存和用户保存"""
+    print_header(f"测试连接池和缓存: {username}（{rounds} 次登录）")
+
+    # 第一次登录从空缓存开始：搜索用户并同步属性
+    cache.delete_many([
+        f'pc_info_record.ldap_user.{username.lower()}',
+        f'django_auth_ldap.user_dn.{username}',
+    ])
+    ok = True
+    for index in range(rounds):
+        before = get_pool().stats()
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as queries:
+            user = authenticate(username=username, password=password)
+        elapsed = (time.perf_counter() - started) * 1000
+        after = get_pool().stats()
+        writes = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith(('UPDATE "auth_user"', 'INSERT INTO "auth_user"'))
+        ]
+
+        if user is None:
+            print(f"✗ 第 {index + 1} 次: 认证失败（{elapsed:.1f}ms）")
+            return False
+        reused = after['reused'] > before['reused']
+        print(
+            f"{'✓' if index == 0 or (reused and not writes) else '✗'} 第 {index + 1} 次: {elapsed:.1f}ms，"
+            f"{'复用连接' if reused else '新建连接'}，写入用户表 {len(writes)} 次"
+        )
+        # 第二次起应该复用连接，属性没有变化时不保存用户
+        if index > 0 and (not reused or writes):
+            ok = False
+
+    if elapsed > settings.LDAP_TIMEOUT * 1000:
+        print(f"✗ 登录耗时超过 LDAP_TIMEOUT（{settings.LDAP_TIMEOUT} 秒）")
+        ok = False
+    print(f"\n  连接池: {get_pool().stats()}")
+    return ok
+
+
 def main():
     """主函数"""
     print("\n" + "🔧" * 35)
@@ -189,9 +245,10 @@ def main():
         print("\n选择操作:")
         print("1. 搜索用户")
         print("2. 测试用户登录")
-        print("3. 退出")
+        print("3. 测试连接池和缓存（连续登录多次）")
+        print("4. 退出")
         
-        choice = input("\n请选择 (1-3): ").strip()
+        choice = input("\n请选择 (1-4): ").strip()
         
         if choice == '1':
             username = input("请输入用户名: ").strip()
@@ -205,6 +262,12 @@ def main():
                 test_authentication(username, password)
         
         elif choice == '3':
+            username = input("请输入用户名: ").strip()
+            password = input("请输入密码: ").strip()
+            if username and password:
+                test_pooled_login(username, password)
+        
+        elif choice == '4':
             print("\n👋 再见!")
             break
         
@@ -213,6 +276,12 @@ def main():
 
 
 if __name__ == '__main__':
+    if '--pool-test' in sys.argv:
+        # 非交互模式: --pool-test 用户名 密码 [--rounds N]，失败时以状态码 1 退出
+        args = sys.argv[sys.argv.index('--pool-test') + 1:]
+        rounds = int(args[args.index('--rounds') + 1]) if '--rounds' in args else 5
+        test_ldap_settings()
+        sys.exit(0 if test_pooled_login(args[0], args[1], rounds) else 1)
     try:
         main()
     except KeyboardInterrupt: